@@ -0,0 +1,331 @@
+"""
+Async HTTP API over the analysis services, for dashboards and other programs.
+
+    uvicorn app.api:app --host 0.0.0.0 --port 8000
+
+Deterministic endpoints (identity, latest filing, ratios, sections) are cached with ETags.
+Ratios, sections, insights and peer comparison are computed by background jobs: the first request
+starts (or joins) a job and gets `202`, and polling its `result` link returns the result when ready.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import numpy as np
+from pydantic import BaseModel
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.config import settings
+from app.services.analyzer_pipeline import NotFoundError
+from app.services.job_queue import JOB_ACTIVE_STATUSES, AnalysisJob, AnalysisJobQueue, make_job_key
+from app.services.sec_client import SECClient
+from app.utils.response_cache import ResponseCache
+from app.utils.singleflight import SingleFlight
+
+
+FORMS = ("10-K", "10-Q")
+PEER_MODES = ("sic", "nearest")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Mapping):
+        # Section views over memory-mapped filing text.
+        return dict(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+class AnalysisService:
+    """
+    Async facade over the blocking service modules. SEC lookups run on a bounded thread pool and
+    identical concurrent calls share one execution (single-flight). Analyses run on the job
+    queue, where identical requests share one job, so a burst of requests for one ticker costs
+    one SEC round trip and one analysis.
+    """
+
+    def __init__(
+        self,
+        sec_client=None,
+        job_queue: Optional[AnalysisJobQueue] = None,
+        limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.sec_client = sec_client or SECClient()
+        self._job_queue = job_queue
+        limits = limits or {"sec": settings.api_sec_concurrency}
+        self.executors = {
+            name: ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix=f"api-{name}")
+            for name, size in limits.items()
+        }
+        self.flights = SingleFlight()
+
+    @property
+    def job_queue(self) -> AnalysisJobQueue:
+        # Created on first use: it starts a process pool, which read-only endpoints never need.
+        if self._job_queue is None:
+            self._job_queue = AnalysisJobQueue()
+        return self._job_queue
+
+    async def _run(self, dependency: str, key: tuple, fn: Callable[[], Any]) -> Any:
+        return await self.flights.do_async((dependency,) + key, fn, executor=self.executors[dependency])
+
+    async def identity(self, ticker: str):
+        identity = await self._run("sec", ("identity", ticker), lambda: self.sec_client.ticker_to_identity(ticker))
+        if identity is None:
+            raise NotFoundError(f"Ticker not found: {ticker}")
+        return identity
+
+    async def latest_filing(self, ticker: str, form: str):
+        identity = await self.identity(ticker)
+        filing = await self._run(
+            "sec",
+            ("filing", identity.cik_10, form),
+            lambda: self.sec_client.get_latest_filing(identity.cik_10, preferred_form=form),
+        )
+        if filing is None:
+            raise NotFoundError(f"No {form} filing found for {ticker}")
+        return identity, filing
+
+    def submit_job(self, ticker: str, form: str, **options) -> AnalysisJob:
+        return self.job_queue.submit(ticker, form, **options)
+
+    def request_job(self, ticker: str, form: str, job_id: Optional[str] = None, **options) -> AnalysisJob:
+        """
+        Without `job_id`, joins the live job for this request or starts one. With it, only looks
+        the job up, so polling never starts a second analysis or piles up subscribers.
+        """
+        if job_id is None:
+            return self.job_queue.find(ticker, form, **options) or self.submit_job(ticker, form, **options)
+        job = self.job_queue.get(job_id)
+        if job is None or job.key != make_job_key(ticker, form, options):
+            raise HTTPException(404, "Unknown or expired job")
+        return job
+
+    def shutdown(self) -> None:
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._job_queue is not None:
+            self._job_queue.shutdown()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Exact match against the comma-separated If-None-Match list (weak tags compare weakly)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+def _ticker(request: Request) -> str:
+    return request.path_params["ticker"].strip().upper()
+
+
+def _form(request: Request) -> str:
+    form = request.query_params.get("form", "10-K").upper()
+    if form not in FORMS:
+        raise HTTPException(400, f"form must be one of {', '.join(FORMS)}")
+    return form
+
+
+def _job_links(job: AnalysisJob) -> Dict:
+    return {"job_id": job.job_id, "status": job.status, "poll": f"/analyses/{job.job_id}", "events": f"/analyses/{job.job_id}/events"}
+
+
+def create_app(service: Optional[AnalysisService] = None, cache: Optional[ResponseCache] = None) -> Starlette:
+    service = service or AnalysisService()
+    cache = cache or ResponseCache(settings.api_cache_ttl_seconds, settings.api_cache_max_entries)
+
+    def respond_cached(request: Request, etag: str, body: bytes) -> Response:
+        headers = {"ETag": etag, "Cache-Control": f"max-age={int(cache.ttl_seconds)}"}
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def cached(request: Request, key: tuple, compute: Callable[[], Awaitable[Any]]) -> Response:
+        entry = cache.get(key)
+        if entry is None:
+            body = dumps(await compute())
+            etag = cache.put(key, body)
+        else:
+            etag, body = entry
+        return respond_cached(request, etag, body)
+
+    def job_for(request: Request, options: Dict) -> AnalysisJob:
+        job = service.request_job(_ticker(request), _form(request), request.query_params.get("job_id"), **options)
+        if job.status == "cancelled":
+            raise HTTPException(404, "Job was cancelled after nobody polled it")
+        if job.status == "failed" and job.exception is not None:
+            # Unknown tickers stay 404s; anything else is a server error.
+            raise job.exception
+        return job
+
+    def accepted(request: Request, job: AnalysisJob) -> Response:
+        query = urlencode({**request.query_params, "job_id": job.job_id})
+        payload = {**_job_links(job), "result": f"{request.url.path}?{query}"}
+        return Response(dumps(payload), status_code=202, media_type="application/json")
+
+    def analysis_result(request: Request, key: tuple, build: Callable[[Dict], Dict]) -> Response:
+        entry = cache.get(key)
+        if entry is None:
+            job = job_for(request, {})
+            if job.status in JOB_ACTIVE_STATUSES:
+                return accepted(request, job)
+            body = dumps(build(job.results["analysis"]))
+            entry = cache.put(key, body), body
+        return respond_cached(request, *entry)
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok"})
+
+    async def metrics(request: Request) -> Response:
+        return JSONResponse(
+            {"response_cache": cache.stats(), "coalescing": service.flights.stats(), "sec_requests": SECClient.request_metrics()}
+        )
+
+    async def identity(request: Request) -> Response:
+        ticker = _ticker(request)
+        return await cached(request, ("identity", ticker), lambda: service.identity(ticker))
+
+    async def latest_filing(request: Request) -> Response:
+        ticker, form = _ticker(request), _form(request)
+
+        async def compute() -> Dict:
+            identity, filing = await service.latest_filing(ticker, form)
+            return {"identity": identity, "filing": filing}
+
+        return await cached(request, ("filing", ticker, form), compute)
+
+    async def ratios(request: Request) -> Response:
+        def build(analysis: Dict) -> Dict:
+            return {
+                "identity": analysis["identity"],
+                "filing": analysis["filing"],
+                "financials": analysis["financials"],
+                "financials_source": analysis["financials_source"],
+                "ratios": analysis["ratios"],
+            }
+
+        return analysis_result(request, ("ratios", _ticker(request), _form(request)), build)
+
+    async def sections(request: Request) -> Response:
+        def build(analysis: Dict) -> Dict:
+            return {"filing": analysis["filing"], "sections": analysis["section_records"]}
+
+        return analysis_result(request, ("sections", _ticker(request), _form(request)), build)
+
+    def job_result(request: Request, result_key: str, options: Dict) -> Response:
+        job = job_for(request, options)
+        if job.status in JOB_ACTIVE_STATUSES:
+            return accepted(request, job)
+        snapshot = job.snapshot()
+        payload = {**_job_links(job), result_key: snapshot["results"].get(result_key), "error": snapshot["errors"].get(result_key)}
+        return Response(dumps(payload), media_type="application/json")
+
+    async def insights(request: Request) -> Response:
+        return job_result(request, "insights", {"run_ai": True})
+
+    async def peers(request: Request) -> Response:
+        mode = request.query_params.get("mode", "sic")
+        if mode not in PEER_MODES:
+            raise HTTPException(400, f"mode must be one of {', '.join(PEER_MODES)}")
+        return job_result(request, "peer", {"run_peer": True, "peer_mode": mode})
+
+    async def submit_analysis(request: Request) -> Response:
+        try:
+            body = await request.json()
+        except ValueError as exc:
+            raise HTTPException(400, "Body must be JSON") from exc
+        ticker = str(body.get("ticker", "")).strip().upper()
+        form = str(body.get("form", "10-K")).upper()
+        if not ticker or form not in FORMS:
+            raise HTTPException(400, "ticker is required and form must be 10-K or 10-Q")
+        options = {flag: bool(body.get(flag, False)) for flag in ("run_ai", "run_diff", "run_forensic", "run_peer")}
+        if options["run_peer"]:
+            options["peer_mode"] = body.get("peer_mode", "sic")
+        job = service.submit_job(ticker, form, **options)
+        return Response(dumps(_job_links(job)), status_code=202, media_type="application/json")
+
+    def _job(request: Request) -> AnalysisJob:
+        job = service.job_queue.get(request.path_params["job_id"])
+        if job is None:
+            raise HTTPException(404, "Unknown job")
+        return job
+
+    async def job_status(request: Request) -> Response:
+        return Response(dumps(_job(request).snapshot()), media_type="application/json")
+
+    async def job_events(request: Request) -> Response:
+        job = _job(request)
+
+        async def stream():
+            sent = 0
+            while True:
+                # Looking the job up again keeps it alive while the stream is open.
+                service.job_queue.get(job.job_id)
+                snapshot = job.snapshot()
+                for stage in snapshot["completed_stages"][sent:]:
+                    payload = {"stage": stage, "result": snapshot["results"].get(stage), "error": snapshot["errors"].get(stage)}
+                    yield f"event: stage\ndata: {dumps(payload).decode('utf-8')}\n\n"
+                sent = len(snapshot["completed_stages"])
+                if snapshot["status"] not in JOB_ACTIVE_STATUSES:
+                    payload = {"status": snapshot["status"], "errors": snapshot["errors"]}
+                    yield f"event: done\ndata: {dumps(payload).decode('utf-8')}\n\n"
+                    return
+                await asyncio.sleep(settings.api_event_poll_seconds)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def not_found(request: Request, exc: NotFoundError) -> Response:
+        return JSONResponse({"error": str(exc)}, status_code=404)
+
+    async def http_error(request: Request, exc: HTTPException) -> Response:
+        return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+    routes = [
+        Route("/health", health),
+        Route("/metrics", metrics),
+        Route("/companies/{ticker}", identity),
+        Route("/companies/{ticker}/filings/latest", latest_filing),
+        Route("/companies/{ticker}/ratios", ratios),
+        Route("/companies/{ticker}/sections", sections),
+        Route("/companies/{ticker}/insights", insights),
+        Route("/companies/{ticker}/peers", peers),
+        Route("/analyses", submit_analysis, methods=["POST"]),
+        Route("/analyses/{job_id}", job_status),
+        Route("/analyses/{job_id}/events", job_events),
+    ]
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        yield
+        service.shutdown()
+
+    app = Starlette(
+        routes=routes,
+        exception_handlers={NotFoundError: not_found, HTTPException: http_error},
+        lifespan=lifespan,
+    )
+    app.state.service = service
+    app.state.cache = cache
+    return app
+
+
+app = create_app()
@@ -12,12 +12,55 @@ class Settings:
     sec_user_agent: str = os.getenv("SEC_USER_AGENT", "YourName your_email@example.com")
     sec_rate_limit_per_sec: float = float(os.getenv("SEC_RATE_LIMIT_PER_SEC", "5.0"))
     sec_timeout_seconds: int = int(os.getenv("SEC_TIMEOUT_SECONDS", "20"))
+    sec_www_base_url: str = os.getenv("SEC_WWW_BASE_URL", "https://www.sec.gov")
+    sec_data_base_url: str = os.getenv("SEC_DATA_BASE_URL", "https://data.sec.gov")
     ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     ollama_model: str = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
     ollama_timeout_seconds: int = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "90"))
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
     llm_max_section_chars: int = int(os.getenv("LLM_MAX_SECTION_CHARS", "12000"))
+    llm_backend: str = os.getenv("LLM_BACKEND", "ollama")
+    llm_batch_size: int = int(os.getenv("LLM_BATCH_SIZE", "4"))
+    llamacpp_model_path: str = os.getenv("LLAMACPP_MODEL_PATH", "")
+    llamacpp_n_ctx: int = int(os.getenv("LLAMACPP_N_CTX", "8192"))
+    llamacpp_n_threads: int = int(os.getenv("LLAMACPP_N_THREADS", "0"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+    llm_reserved_interactive_slots: int = int(os.getenv("LLM_RESERVED_INTERACTIVE_SLOTS", "1"))
+    llm_interactive_deadline_seconds: float = float(os.getenv("LLM_INTERACTIVE_DEADLINE_SECONDS", "120"))
+    llm_batch_deadline_seconds: float = float(os.getenv("LLM_BATCH_DEADLINE_SECONDS", "3600"))
     peer_max_workers: int = int(os.getenv("PEER_MAX_WORKERS", "4"))
+    peer_sketch_path: str = os.getenv("PEER_SKETCH_PATH", "data/processed/peer_sketches.json")
+    peer_sketch_k: int = int(os.getenv("PEER_SKETCH_K", "200"))
+    peer_sketch_min_companies: int = int(os.getenv("PEER_SKETCH_MIN_COMPANIES", "20"))
+    peer_index_path: str = os.getenv("PEER_INDEX_PATH", "data/processed/peer_index.npz")
+    peer_index_sic_weight: float = float(os.getenv("PEER_INDEX_SIC_WEIGHT", "1.0"))
+    universe_snapshot_path: str = os.getenv("UNIVERSE_SNAPSHOT_PATH", "data/processed/universe_snapshot.json")
+    job_max_workers: int = int(os.getenv("JOB_MAX_WORKERS", "2"))
+    job_result_ttl_seconds: int = int(os.getenv("JOB_RESULT_TTL_SECONDS", "1800"))
+    job_max_finished: int = int(os.getenv("JOB_MAX_FINISHED", "256"))
+    job_abandon_seconds: float = float(os.getenv("JOB_ABANDON_SECONDS", "30"))
+    filing_text_dir: str = os.getenv("FILING_TEXT_DIR", "data/processed/filings")
+    concept_plan_dir: str = os.getenv("CONCEPT_PLAN_DIR", "data/processed/concept_plans")
+    asof_store_path: str = os.getenv("ASOF_STORE_PATH", "data/processed/asof_facts.npz")
+    asof_snapshot_dir: str = os.getenv("ASOF_SNAPSHOT_DIR", "data/processed/asof_snapshots")
+    artifact_cache_dir: str = os.getenv("ARTIFACT_CACHE_DIR", "data/processed/artifacts")
+    boilerplate_index_path: str = os.getenv("BOILERPLATE_INDEX_PATH", "data/processed/boilerplate_index.sqlite")
+    boilerplate_min_companies: int = int(os.getenv("BOILERPLATE_MIN_COMPANIES", "3"))
+    llm_skip_boilerplate: bool = os.getenv("LLM_SKIP_BOILERPLATE", "true").lower() == "true"
+    parse_max_workers: int = int(os.getenv("PARSE_MAX_WORKERS", "0"))
+    parse_max_tasks_per_child: int = int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "50"))
+    filing_spool_dir: str = os.getenv("FILING_SPOOL_DIR", "data/raw/filings")
+    api_sec_concurrency: int = int(os.getenv("API_SEC_CONCURRENCY", "4"))
+    api_cache_ttl_seconds: int = int(os.getenv("API_CACHE_TTL_SECONDS", "300"))
+    api_cache_max_entries: int = int(os.getenv("API_CACHE_MAX_ENTRIES", "4096"))
+    api_event_poll_seconds: float = float(os.getenv("API_EVENT_POLL_SECONDS", "0.5"))
+    profile_output_dir: str = os.getenv("PROFILE_OUTPUT_DIR", "data/processed/profiles")
     report_output_dir: str = os.getenv("REPORT_OUTPUT_DIR", "data/processed/reports")
+    forensic_panel_path: str = os.getenv("FORENSIC_PANEL_PATH", "data/processed/forensic_panel.npz")
+    shard_queue_path: str = os.getenv("SHARD_QUEUE_PATH", "data/processed/work_queue.sqlite")
+    shard_lease_seconds: float = float(os.getenv("SHARD_LEASE_SECONDS", "120"))
+    shard_heartbeat_seconds: float = float(os.getenv("SHARD_HEARTBEAT_SECONDS", "30"))
+    shard_max_attempts: int = int(os.getenv("SHARD_MAX_ATTEMPTS", "3"))
 
 
 settings = Settings()
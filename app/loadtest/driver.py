@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from ollama import Client
+
+from app.services import job_queue
+from app.services.job_queue import AnalysisJobQueue
+from app.services.llm_backends import OllamaBackend
+from app.services.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler
+from app.services.sec_client import RateLimiter, SECClient
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4), "max": round(max(latencies), 4)}
+
+
+_worker_limiter: Optional[RateLimiter] = None
+_worker_barrier = None
+
+
+def _init_stage_worker(edgar_url: str, sec_rate_per_worker: float, barrier) -> None:
+    """Process-pool initializer: the worker's stages fetch from the EDGAR stand-in at its budget share."""
+    global _worker_limiter, _worker_barrier
+    _worker_limiter = RateLimiter(sec_rate_per_worker)
+    _worker_barrier = barrier
+    job_queue.use_sec_base_url(edgar_url)
+    job_queue.use_node_sec_rate_limiter(_worker_limiter)
+
+
+def _worker_sec_metrics() -> Dict:
+    """
+    One worker's SEC counters: fetches executed vs. coalesced and its limiter wait. Submitted once
+    per worker after the run; the barrier holds each worker until all have taken one, so none
+    takes two (and if it breaks, results are de-duplicated by pid).
+    """
+    try:
+        _worker_barrier.wait(timeout=10)
+    except threading.BrokenBarrierError:
+        pass
+    return {
+        "pid": os.getpid(),
+        **SECClient.request_metrics(),
+        "limiter_calls": _worker_limiter.calls,
+        "limiter_wait_seconds": _worker_limiter.waited_seconds,
+    }
+
+
+def _collect_worker_sec_metrics(executor: ProcessPoolExecutor, workers: int) -> Dict:
+    futures = [executor.submit(_worker_sec_metrics) for _ in range(workers)]
+    done, _ = wait(futures, timeout=30)
+    by_pid = {}
+    for future in done:
+        if future.exception() is None:
+            by_pid[future.result()["pid"]] = future.result()
+    totals = {
+        key: sum(metrics[key] for metrics in by_pid.values())
+        for key in ("executed", "coalesced", "limiter_calls", "limiter_wait_seconds")
+    }
+    totals["limiter_wait_seconds"] = round(totals["limiter_wait_seconds"], 3)
+    return {**totals, "workers_reporting": len(by_pid)}
+
+
+def run_load_test(
+    tickers: Sequence[str],
+    edgar,
+    users: int = 4,
+    analyses_per_user: int = 5,
+    batch_jobs: int = 0,
+    form: str = "10-K",
+    ollama_url: Optional[str] = None,
+    sec_rate_limit_per_sec: float = 10.0,
+    llm_max_concurrency: int = 2,
+    workers: int = 2,
+    result_ttl_seconds: int = 0,
+) -> Dict:
+    """
+    Drives an `AnalysisJobQueue` the way the app does: `users` interactive clients and
+    `batch_jobs` batch clients each submit `analyses_per_user` jobs one after another and wait
+    for them. Stages run on the queue's process pool (`workers` processes, each with its share of
+    the SEC budget) against the `edgar` stand-in; with `ollama_url` the insight stage also runs,
+    through the queue's LLM scheduler at the client's priority.
+
+    Stages read and write the configured data directories relative to the working directory,
+    as a deployment does; run from a scratch directory for cold-cache numbers. With the default
+    `result_ttl_seconds=0` only concurrent identical requests share a job.
+    """
+    if not tickers:
+        raise ValueError("tickers must not be empty")
+    workers = max(1, workers)
+    scheduler = LLMScheduler(max_concurrency=llm_max_concurrency) if ollama_url else None
+    backend = OllamaBackend(client=Client(host=ollama_url)) if ollama_url else None
+    context = multiprocessing.get_context()
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_stage_worker,
+        initargs=(edgar.url, sec_rate_limit_per_sec / workers, context.Barrier(workers)),
+    )
+    queue = AnalysisJobQueue(
+        executor=executor,
+        result_ttl_seconds=result_ttl_seconds,
+        llm_scheduler=scheduler,
+        llm_backend=backend,
+        max_workers=workers,
+    )
+    edgar_before = dict(edgar.stats)
+
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = {"interactive": [], "batch": []}
+    errors: List[str] = []
+    job_ids = set()
+
+    def client(index: int, kind: str) -> None:
+        priority = PRIORITY_INTERACTIVE if kind == "interactive" else PRIORITY_BATCH
+        for step in range(analyses_per_user):
+            ticker = tickers[(index * analyses_per_user + step) % len(tickers)]
+            started = time.perf_counter()
+            job = queue.submit(ticker, form, run_ai=bool(ollama_url), llm_priority=priority)
+            # Poll like the UI does, so interactive jobs are not abandoned.
+            while not job.done.wait(timeout=1.0):
+                queue.get(job.job_id)
+            with lock:
+                job_ids.add(job.job_id)
+                if job.status != "done" or job.errors:
+                    errors.append(f"{ticker}: {job.status} {job.errors}")
+                    continue
+                latencies[kind].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i, "interactive"), name=f"load-user-{i}") for i in range(users)]
+    threads += [threading.Thread(target=client, args=(users + i, "batch"), name=f"load-batch-{i}") for i in range(batch_jobs)]
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        worker_sec = _collect_worker_sec_metrics(executor, workers)
+    finally:
+        queue.shutdown()
+
+    completed = len(latencies["interactive"]) + len(latencies["batch"])
+    edgar_requests = edgar.stats["requests"] - edgar_before["requests"]
+    report = {
+        "users": users,
+        "batch_jobs": batch_jobs,
+        "workers": workers,
+        "analyses": completed,
+        "jobs": len(job_ids),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "seconds": round(elapsed, 3),
+        "analyses_per_second": round(completed / elapsed, 3) if elapsed else None,
+        "latency_seconds": latency_summary(latencies["interactive"] + latencies["batch"]),
+        "latency_by_kind": {kind: latency_summary(values) for kind, values in latencies.items() if values},
+        # Counted at the EDGAR stand-in: the stages' SEC clients live in the worker processes.
+        "sec": {
+            "http_requests": edgar_requests,
+            "throttled": edgar.stats["throttled"] - edgar_before["throttled"],
+            "errors": edgar.stats["errors"] - edgar_before["errors"],
+            "requests_per_job": round(edgar_requests / len(job_ids), 2) if job_ids else None,
+            # Summed over the pool workers: fetches run vs. callers that joined an in-flight one,
+            # and time spent waiting on each worker's share of the rate limit.
+            **worker_sec,
+        },
+    }
+    if scheduler is not None:
+        report["llm"] = scheduler.stats()
+        scheduler.shutdown()
+    return report
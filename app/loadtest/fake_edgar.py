@@ -0,0 +1,214 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.services.xbrl_mapper import CONCEPT_MAP
+
+
+CONTENT_TYPES = {".json": "application/json", ".htm": "text/html", ".html": "text/html", ".txt": "text/plain"}
+
+
+class FakeEdgarServer:
+    """
+    Local EDGAR stand-in that replays recorded responses. Files under `fixture_dir` mirror the
+    SEC URL paths (`files/company_tickers.json`, `submissions/CIK##########.json`,
+    `api/xbrl/companyfacts/...`, `Archives/edgar/data/...`), so one server can serve both the
+    www and data hosts. Latency, 429s and 5xx responses can be injected at fixed rates.
+    """
+
+    def __init__(
+        self,
+        fixture_dir: str,
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.fixture_dir = Path(fixture_dir).resolve()
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "served": 0, "throttled": 0, "errors": 0, "not_found": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _decide(self) -> str:
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._rng.random()
+            delay = self.latency_seconds + self._rng.uniform(0, self.jitter_seconds)
+        outcome = "throttled" if roll < self.throttle_rate else "errors" if roll < self.throttle_rate + self.error_rate else "ok"
+        if delay > 0:
+            time.sleep(delay)
+        return outcome
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                outcome = server._decide()
+                if outcome != "ok":
+                    server._count(outcome)
+                    self.send_response(429 if outcome == "throttled" else 503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                path = (server.fixture_dir / self.path.split("?", 1)[0].lstrip("/")).resolve()
+                if server.fixture_dir not in path.parents or not path.is_file():
+                    server._count("not_found")
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body = path.read_bytes()
+                server._count("served")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPES.get(path.suffix, "application/octet-stream"))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:  # noqa: A002
+                return
+
+        return Handler
+
+    def start(self) -> "FakeEdgarServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-edgar", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeEdgarServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _write_json(path: Path, payload: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload), encoding="utf-8")
+
+
+def _archive_path(fixture_dir: Path, cik_int: int, accession_number: str, primary_doc: str) -> Path:
+    return fixture_dir / "Archives" / "edgar" / "data" / str(cik_int) / accession_number.replace("-", "") / primary_doc
+
+
+def record_fixtures(sec_client, tickers: Iterable[str], fixture_dir: str, form: str = "10-K") -> List[str]:
+    """Saves live SEC responses for `tickers` in the layout `FakeEdgarServer` replays."""
+    out_dir = Path(fixture_dir)
+    _write_json(out_dir / "files" / "company_tickers.json", sec_client._get_json(f"{sec_client.www_base_url}/files/company_tickers.json"))
+    recorded = []
+    for ticker in tickers:
+        identity = sec_client.ticker_to_identity(ticker)
+        if identity is None:
+            continue
+        _write_json(out_dir / "submissions" / f"CIK{identity.cik_10}.json", sec_client.get_submissions(identity.cik_10))
+        _write_json(
+            out_dir / "api" / "xbrl" / "companyfacts" / f"CIK{identity.cik_10}.json",
+            sec_client.get_company_facts(identity.cik_10),
+        )
+        filing = sec_client.get_latest_filing(identity.cik_10, preferred_form=form)
+        if filing is not None:
+            path = _archive_path(out_dir, filing.cik_int, filing.accession_number, filing.primary_document)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(sec_client.get_filing_text(filing.filing_url), encoding="utf-8")
+        recorded.append(identity.ticker)
+    return recorded
+
+
+_FILLER = (
+    "Revenue increased 8% compared to the prior year, driven by higher volumes. "
+    "Our credit agreement contains covenants that restrict additional borrowing. "
+    "We could be adversely affected by competition and changes in regulation. "
+)
+
+
+def write_synthetic_fixtures(fixture_dir: str, companies: int = 20, filing_kb: int = 200, seed: int = 0) -> List[str]:
+    """Generates a self-consistent fake universe (tickers, submissions, facts, filings); returns its tickers."""
+    rng = random.Random(seed)
+    out_dir = Path(fixture_dir)
+    mapping, tickers = {}, []
+    repeats = max(1, filing_kb * 1024 // (len(_FILLER) * 3))
+    for idx in range(companies):
+        cik_int = 9000000 + idx
+        cik_10 = f"{cik_int:010d}"
+        ticker = f"SYN{idx:03d}"
+        tickers.append(ticker)
+        mapping[str(idx)] = {"cik_str": cik_int, "ticker": ticker, "title": f"Synthetic Co {idx}"}
+
+        accession_number = f"{cik_10}-25-000001"
+        _write_json(
+            out_dir / "submissions" / f"CIK{cik_10}.json",
+            {
+                "cik": cik_10,
+                "sic": str(rng.choice([3571, 3674, 6021, 7372])),
+                "filings": {
+                    "recent": {
+                        "form": ["10-K"],
+                        "filingDate": ["2025-02-01"],
+                        "accessionNumber": [accession_number],
+                        "primaryDocument": ["annual.htm"],
+                    }
+                },
+            },
+        )
+
+        assets = 10 ** rng.uniform(7, 11)
+        values = {
+            "revenue": assets * rng.uniform(0.2, 1.5),
+            "net_income": assets * rng.uniform(-0.05, 0.15),
+            "assets": assets,
+            "liabilities": assets * rng.uniform(0.2, 0.9),
+            "equity": assets * rng.uniform(0.1, 0.8),
+            "current_assets": assets * rng.uniform(0.1, 0.5),
+            "current_liabilities": assets * rng.uniform(0.05, 0.4),
+            "operating_income": assets * rng.uniform(-0.02, 0.2),
+            "interest_expense": assets * rng.uniform(0.001, 0.02),
+        }
+        us_gaap = {
+            concepts[0]: {"units": {"USD": [{"end": "2024-12-31", "filed": "2025-02-01", "val": round(values.get(metric, assets * 0.1))}]}}
+            for metric, concepts in CONCEPT_MAP.items()
+        }
+        _write_json(out_dir / "api" / "xbrl" / "companyfacts" / f"CIK{cik_10}.json", {"cik": cik_int, "facts": {"us-gaap": us_gaap}})
+
+        document = (
+            "<html><body>"
+            f"<p>Item 1 Business {_FILLER * repeats}</p>"
+            f"<p>Item 1A Risk Factors {_FILLER * repeats}</p>"
+            f"<p>Item 7 Management's Discussion and Analysis {_FILLER * repeats}</p>"
+            "<p>Item 8 Financial Statements</p></body></html>"
+        )
+        path = _archive_path(out_dir, cik_int, accession_number, "annual.htm")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(document, encoding="utf-8")
+
+    _write_json(out_dir / "files" / "company_tickers.json", mapping)
+    return tickers
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+CANNED_INSIGHTS = {
+    "revenue_trends": ["Revenue increased compared to the prior year."],
+    "debt_risk_signals": ["Credit agreement covenants restrict additional borrowing."],
+    "risk_factor_highlights": ["Competition and regulation could adversely affect results."],
+    "red_flags": [],
+    "management_commentary": [],
+    "evidence_quotes": ["Revenue increased 8% compared to the prior year, driven by higher volumes."],
+    "confidence": 0.6,
+}
+
+
+class FakeOllamaServer:
+    """
+    Local stand-in for Ollama's `/api/chat`. Each reply takes completion_tokens / tokens_per_second
+    seconds, and at most `num_parallel` replies generate at once (like `OLLAMA_NUM_PARALLEL`); the
+    rest queue. Prompt tokens are estimated at four characters each.
+    """
+
+    def __init__(
+        self,
+        tokens_per_second: float = 40.0,
+        completion_tokens: int = 120,
+        num_parallel: int = 1,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self._slots = threading.BoundedSemaphore(max(1, num_parallel))
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "busy_seconds": 0.0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _generate(self, request: dict) -> dict:
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+        prompt_tokens = max(1, prompt_chars // 4)
+        limit = (request.get("options") or {}).get("num_predict")
+        completion_tokens = min(self.completion_tokens, limit) if limit else self.completion_tokens
+        with self._slots:
+            started = time.perf_counter()
+            time.sleep(completion_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0)
+            elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["busy_seconds"] += elapsed
+        return {
+            "model": request.get("model", "fake"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": json.dumps(CANNED_INSIGHTS)},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": completion_tokens,
+            "eval_duration": int(elapsed * 1e9),
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802
+                if self.path.split("?", 1)[0] != "/api/chat":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.dumps(server._generate(json.loads(self.rfile.read(length) or b"{}"))).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:  # noqa: A002
+                return
+
+        return Handler
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,4 +1,6 @@
 import sys
+import threading
+import time
 from pathlib import Path
 
 import pandas as pd
@@ -10,21 +12,28 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.services.filing_parser import extract_sections_with_spans, filing_to_text
-from app.services.llm_engine import FilingInsightEngine
-from app.services.peer_engine import PeerBenchmarkEngine, compare_company_to_peer
-from app.services.ratio_engine import compute_ratios
+from app.services.filing_store import section_text
+from app.services.job_queue import JOB_ACTIVE_STATUSES, AnalysisJobQueue
+from app.services.llm_engine import warm_up_model
 from app.services.report_store import list_recent_reports, save_markdown_report
-from app.services.sec_client import SECClient
 from app.services.summary_engine import build_investment_summary, build_markdown_report
-from app.services.xbrl_mapper import extract_latest_financials
-from app.utils.caching import (
-    get_company_facts_cached,
-    get_filing_text_cached,
-    get_identity_cached,
-    get_latest_filing_cached,
-    get_submissions_cached,
-)
+
+
+JOB_POLL_SECONDS = 1.0
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> AnalysisJobQueue:
+    # Shared across sessions so concurrent requests for the same analysis collapse onto one job.
+    return AnalysisJobQueue()
+
+
+@st.cache_resource(show_spinner=False)
+def start_llm_warm_up() -> threading.Thread:
+    # Once per server process, in the background so the first page render is not blocked.
+    thread = threading.Thread(target=warm_up_model, name="ollama-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 
 st.set_page_config(page_title="AI Financial Statement Analyzer", layout="wide")
@@ -37,181 +46,307 @@ with st.sidebar:
     ticker = st.text_input("Ticker", value="AAPL").strip().upper()
     preferred_form = st.selectbox("Preferred filing", options=["10-K", "10-Q"])
     run_ai = st.checkbox("Run local AI extraction (Ollama)", value=True)
+    run_diff = st.checkbox("Compare with prior filing (what changed)", value=False)
+    run_forensic = st.checkbox("Forensic scores (Beneish, Altman, Piotroski)", value=False)
     run_peer = st.checkbox("Run peer benchmark (slower)", value=False)
+    peer_mode = st.selectbox(
+        "Peer selection",
+        options=["sic", "nearest"],
+        format_func=lambda mode: "Same SIC code" if mode == "sic" else "Nearest by fundamentals",
+        disabled=not run_peer,
+    )
     save_report = st.checkbox("Save report to local history", value=False)
+    profile_run = st.checkbox("Profile this run (diagnostics)", value=False)
     run = st.button("Fetch latest filing")
 
 st.markdown("---")
 
+start_llm_warm_up()
+job_queue = get_job_queue()
 if run:
-    client = SECClient()
-    with st.spinner("Fetching SEC data..."):
-        identity = get_identity_cached(ticker)
-        if not identity:
-            st.error(f"Ticker '{ticker}' not found in SEC mapping.")
-            st.stop()
+    submitted = job_queue.submit(
+        ticker,
+        preferred_form,
+        run_ai=run_ai,
+        run_diff=run_diff,
+        run_forensic=run_forensic,
+        run_peer=run_peer,
+        # Only part of the job key when peers run, so toggling it doesn't redo the analysis.
+        **({"peer_mode": peer_mode} if run_peer else {}),
+        **({"profile": True} if profile_run else {}),
+    )
+    previous_job_id = st.session_state.get("analysis_job_id")
+    if previous_job_id and previous_job_id != submitted.job_id:
+        # This session no longer waits on the old job; let its queued LLM work be cancelled.
+        job_queue.release(previous_job_id)
+    st.session_state["analysis_job_id"] = submitted.job_id
 
-        filing = get_latest_filing_cached(identity.cik_10, preferred_form=preferred_form)
+job_id = st.session_state.get("analysis_job_id")
+job = job_queue.get(job_id) if job_id else None
 
-    st.subheader("Company")
-    st.write(
+if job is None:
+    st.info("Enter a ticker and click 'Fetch latest filing' to begin.")
+    st.stop()
+
+snapshot = job.snapshot()
+results = snapshot["results"]
+job_active = snapshot["status"] in JOB_ACTIVE_STATUSES
+request = job.request
+
+if job_active:
+    st.progress(
+        snapshot["progress"],
+        text=f"Analyzing {request['ticker']} - stage: {snapshot['current_stage'] or 'queued'}",
+    )
+
+analysis = results.get("analysis")
+if analysis is None:
+    if snapshot["status"] == "failed":
+        st.error(f"Analysis failed for '{request['ticker']}': {snapshot['errors']}")
+        st.stop()
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+identity = analysis["identity"]
+filing = analysis["filing"]
+section_records = analysis["section_records"]
+financials = analysis["financials"]
+ratios = analysis["ratios"]
+
+st.subheader("Company")
+st.write(
+    {
+        "ticker": identity.ticker,
+        "company_name": identity.company_name,
+        "cik_10": identity.cik_10,
+        "cik_int": identity.cik_int,
+    }
+)
+
+st.subheader("Latest Filing Metadata")
+st.write(filing.model_dump())
+st.markdown(f"[Open filing document]({filing.filing_url})")
+
+st.subheader("Section Extraction (Sprint 1)")
+if not section_records:
+    st.warning("No target sections detected yet for this filing.")
+else:
+    st.success(f"Extracted {len(section_records)} sections.")
+    for section_name, section_payload in section_records.items():
+        with st.expander(f"{section_name}"):
+            st.caption(f"Source span: start={section_payload.get('start')} end={section_payload.get('end')}")
+            st.write(section_text(section_payload, 0, 5000))
+
+st.subheader("Financial Ratios (Sprint 2)")
+if analysis.get("financials_source") == "ixbrl":
+    st.caption("Computed from inline XBRL facts in this filing (values tied to the filing's own period).")
+elif analysis.get("financials_source") == "ixbrl+companyfacts":
+    st.caption(
+        "Computed from this filing's inline XBRL facts; metrics it does not tag come from SEC companyfacts "
+        f"for the same period ({analysis.get('financials_period_end')})."
+    )
+else:
+    st.caption(
+        f"Computed from SEC companyfacts values for period ending {analysis.get('financials_period_end')} "
+        "(free EDGAR XBRL data)."
+    )
+ratio_rows = []
+for ratio_name, payload in ratios.items():
+    value = payload.get("value")
+    ratio_rows.append(
         {
-            "ticker": identity.ticker,
-            "company_name": identity.company_name,
-            "cik_10": identity.cik_10,
-            "cik_int": identity.cik_int,
+            "ratio": ratio_name,
+            "value": float(value) if isinstance(value, (int, float)) else None,
+            "quality": payload.get("quality"),
         }
     )
+ratio_df = pd.DataFrame(ratio_rows)
+st.dataframe(ratio_df, use_container_width=True, hide_index=True)
+ratio_chart_df = ratio_df[ratio_df["value"].notna()]
+if not ratio_chart_df.empty:
+    fig = px.bar(ratio_chart_df, x="ratio", y="value", color="quality", title="Company Ratios")
+    st.plotly_chart(fig, use_container_width=True)
+with st.expander("Underlying mapped financial values"):
+    st.write(financials)
+if analysis.get("profile"):
+    profile = analysis["profile"]
+    with st.expander(f"Profile: {profile['wall_seconds']}s, peak memory {profile['peak_memory_mib']} MiB"):
+        st.caption("Open the speedscope file at https://www.speedscope.app for a flame graph.")
+        st.write(profile["files"])
+        st.dataframe(pd.DataFrame(profile["top_functions"]), use_container_width=True, hide_index=True)
+        st.dataframe(pd.DataFrame(profile["top_allocations"]), use_container_width=True, hide_index=True)
 
-    st.subheader("Latest Filing Metadata")
-    if not filing:
-        st.warning("No recent 10-K/10-Q filing metadata found.")
-    else:
-        st.write(filing.model_dump())
-        st.markdown(f"[Open filing document]({filing.filing_url})")
-
-        with st.spinner("Downloading filing text and extracting sections..."):
-            raw_filing = get_filing_text_cached(filing.filing_url)
-            filing_text = filing_to_text(raw_filing)
-            section_records = extract_sections_with_spans(filing_text, filing.form)
-
-        with st.spinner("Loading company facts and computing ratios..."):
-            company_facts = get_company_facts_cached(identity.cik_10)
-            financials = extract_latest_financials(company_facts)
-            ratios = compute_ratios(financials)
-
-        st.subheader("Section Extraction (Sprint 1)")
-        if not section_records:
-            st.warning("No target sections detected yet for this filing.")
-        else:
-            st.success(f"Extracted {len(section_records)} sections.")
-            for section_name, section_payload in section_records.items():
-                with st.expander(f"{section_name}"):
-                    st.caption(
-                        f"Source span: start={section_payload.get('start')} end={section_payload.get('end')}"
-                    )
-                    st.write(section_payload.get("text", "")[:5000])
-
-        st.subheader("Financial Ratios (Sprint 2)")
-        st.caption("Computed from latest SEC companyfacts values (free EDGAR XBRL data).")
-        ratio_rows = []
-        for ratio_name, payload in ratios.items():
-            value = payload.get("value")
-            ratio_rows.append(
-                {
-                    "ratio": ratio_name,
-                    "value": float(value) if isinstance(value, (int, float)) else None,
-                    "quality": payload.get("quality"),
-                }
-            )
-        ratio_df = pd.DataFrame(ratio_rows)
-        st.dataframe(ratio_df, use_container_width=True, hide_index=True)
-        ratio_chart_df = ratio_df[ratio_df["value"].notna()]
-        if not ratio_chart_df.empty:
-            fig = px.bar(ratio_chart_df, x="ratio", y="value", color="quality", title="Company Ratios")
-            st.plotly_chart(fig, use_container_width=True)
-        with st.expander("Underlying mapped financial values"):
-            st.write(financials)
-
-        st.subheader("AI Insights (Sprint 3)")
-        insights = None
-        if not run_ai:
-            st.info("Enable 'Run local AI extraction (Ollama)' from the sidebar to generate narrative insights.")
-        elif not section_records:
-            st.warning("AI extraction skipped because no filing sections were detected.")
-        else:
-            try:
-                with st.spinner("Running local AI extraction with Ollama..."):
-                    insight_engine = FilingInsightEngine()
-                    insights = insight_engine.extract_from_section_records(
-                        form_type=filing.form,
-                        section_records=section_records,
-                    )
-                st.write(insights)
-            except Exception as exc:  # noqa: BLE001
-                st.warning(
-                    "Local AI extraction failed. Check Ollama is running and your model is available. "
-                    f"Details: {exc}"
-                )
-
-        st.subheader("Peer Benchmark (Sprint 4)")
-        peer_comparison = None
-        if not run_peer:
-            st.info("Enable 'Run peer benchmark (slower)' from the sidebar to compare against SIC peers.")
-        else:
-            with st.spinner("Building peer benchmark from SEC data..."):
-                submissions = get_submissions_cached(identity.cik_10)
-                target_sic = str(submissions.get("sic", ""))
-
-                if not target_sic:
-                    st.warning("SIC not found for this company; peer benchmark skipped.")
-                else:
-                    peer_engine = PeerBenchmarkEngine(client)
-                    peers = peer_engine.find_same_sic_peers(
-                        target_sic=target_sic,
-                        target_cik_int=identity.cik_int,
-                        max_peers=8,
-                        max_scan=100,
-                    )
-                    benchmark = peer_engine.build_peer_benchmark(peers)
-                    peer_comparison = compare_company_to_peer(ratios, benchmark["peer_medians"])
-                    st.write({"target_sic": target_sic, "peer_count_found": len(peers), "peer_count_used": benchmark["peer_count_used"]})
-                    peer_rows = []
-                    for ratio_name, payload in peer_comparison.items():
-                        peer_rows.append(
-                            {
-                                "ratio": ratio_name,
-                                "company_value": payload.get("company_value"),
-                                "peer_median": payload.get("peer_median"),
-                                "delta_vs_peer": payload.get("delta_vs_peer"),
-                                "quality": payload.get("company_quality"),
-                            }
-                        )
-                    peer_df = pd.DataFrame(peer_rows)
-                    st.dataframe(peer_df, use_container_width=True, hide_index=True)
-                    peer_chart_df = peer_df[peer_df["delta_vs_peer"].notna()]
-                    if not peer_chart_df.empty:
-                        fig_peer = px.bar(
-                            peer_chart_df,
-                            x="ratio",
-                            y="delta_vs_peer",
-                            color="quality",
-                            title="Ratio Delta vs Peer Median",
-                        )
-                        st.plotly_chart(fig_peer, use_container_width=True)
-
-        st.subheader("Investment Summary (Sprint 4)")
-        summary_text = build_investment_summary(
-            company_name=identity.company_name or identity.ticker,
-            ticker=identity.ticker,
-            filing_form=filing.form,
-            ratios=ratios,
-            insights=insights,
-            peer_comparison=peer_comparison,
+st.subheader("Forensic Scores")
+forensic = results.get("forensic")
+if not request.get("run_forensic"):
+    st.info("Enable 'Forensic scores' from the sidebar for Beneish M, Altman Z', Piotroski F and accrual scores.")
+elif "forensic" in snapshot["errors"]:
+    st.warning(f"Forensic scoring failed. Details: {snapshot['errors']['forensic']}")
+elif "forensic" not in snapshot["completed_stages"]:
+    st.info("Scoring multi-year XBRL history...")
+elif not forensic:
+    st.warning("No annual XBRL history found for this company; forensic scores skipped.")
+else:
+    st.caption(f"Fiscal year {forensic['fiscal_year']}, from SEC companyfacts annual values.")
+    st.dataframe(
+        pd.DataFrame([{"score": name, **payload} for name, payload in forensic["scores"].items()]),
+        use_container_width=True,
+        hide_index=True,
+    )
+    with st.expander("Score components and Piotroski signals"):
+        st.dataframe(
+            pd.DataFrame(
+                [{"component": name, **payload} for name, payload in {**forensic["components"], **forensic["piotroski_signals"]}.items()]
+            ),
+            use_container_width=True,
+            hide_index=True,
         )
-        st.text(summary_text)
-
-        report_md = build_markdown_report(
-            company_name=identity.company_name or identity.ticker,
-            ticker=identity.ticker,
-            filing=filing.model_dump(),
-            ratios=ratios,
-            insights=insights,
-            peer_comparison=peer_comparison,
-            summary_text=summary_text,
+
+st.subheader("Filing Changes vs Prior Filing")
+changes = results.get("changes")
+if not request.get("run_diff"):
+    st.info("Enable 'Compare with prior filing (what changed)' to diff sections against the prior comparable filing.")
+elif "changes" in snapshot["errors"]:
+    st.warning(f"Filing comparison failed. Details: {snapshot['errors']['changes']}")
+elif "changes" not in snapshot["completed_stages"]:
+    st.info("Comparing sections with the prior filing...")
+elif not changes:
+    st.info("No prior comparable filing found.")
+else:
+    st.caption(
+        f"Compared with {changes['prior_accession_number']} filed {changes['prior_filing_date']}. "
+        "Only new and modified sentences are sent to the local AI step."
+    )
+    change_rows = [
+        {"section": name, **{k: v for k, v in payload.items() if k != "new_spans"}}
+        for name, payload in changes["summary"].items()
+    ]
+    st.dataframe(pd.DataFrame(change_rows), use_container_width=True, hide_index=True)
+    for section_name, payload in changes["summary"].items():
+        record = section_records.get(section_name)
+        new_snippets = [section_text(record, start, end) for start, end in payload["new_spans"]] if record else []
+        if new_snippets:
+            with st.expander(f"New text in {section_name}"):
+                for snippet in new_snippets:
+                    st.write(f"- {snippet}")
+
+st.subheader("AI Insights (Sprint 3)")
+insights = results.get("insights")
+fast_insights = results.get("fast_insights")
+llm_done = "insights" in snapshot["completed_stages"] and insights is not None
+
+
+def render_fast_insights(note: str) -> None:
+    if fast_insights:
+        st.caption(f"Fast mode (rule-based keyword scoring). {note}")
+        st.write(fast_insights)
+
+
+if not section_records:
+    st.warning("AI extraction skipped because no filing sections were detected.")
+elif llm_done:
+    st.write(insights)
+    with st.expander("Fast-mode (rule-based) insights"):
+        st.write(fast_insights)
+elif not request.get("run_ai"):
+    render_fast_insights("Enable 'Run local AI extraction (Ollama)' from the sidebar for model-generated insights.")
+elif "insights" in snapshot["errors"]:
+    st.warning(
+        "Local AI extraction failed. Check Ollama is running and your model is available. "
+        f"Details: {snapshot['errors']['insights']}"
+    )
+    render_fast_insights("Showing rule-based insights instead.")
+else:
+    st.info("Running local AI extraction with Ollama...")
+    render_fast_insights("The AI result will replace this when ready.")
+# The summary and report use model insights when available, otherwise the fast-mode ones.
+insights = insights if llm_done else fast_insights
+
+st.subheader("Peer Benchmark (Sprint 4)")
+peer_result = results.get("peer")
+peer_comparison = peer_result.get("peer_comparison") if peer_result else None
+if not request.get("run_peer"):
+    st.info("Enable 'Run peer benchmark (slower)' from the sidebar to compare against SIC peers.")
+elif "peer" in snapshot["errors"]:
+    st.warning(f"Peer benchmark failed. Details: {snapshot['errors']['peer']}")
+elif "peer" not in snapshot["completed_stages"]:
+    st.info("Building peer benchmark from SEC data...")
+elif not peer_result["target_sic"]:
+    st.warning("SIC not found for this company; peer benchmark skipped.")
+else:
+    st.write(
+        {
+            "target_sic": peer_result["target_sic"],
+            "peer_mode": peer_result.get("peer_mode", "sic"),
+            "peer_count_found": peer_result["peer_count_found"],
+            "peer_count_used": peer_result["peer_count_used"],
+        }
+    )
+    peer_rows = []
+    for ratio_name, payload in peer_comparison.items():
+        peer_rows.append(
+            {
+                "ratio": ratio_name,
+                "company_value": payload.get("company_value"),
+                "peer_median": payload.get("peer_median"),
+                "delta_vs_peer": payload.get("delta_vs_peer"),
+                "quality": payload.get("company_quality"),
+            }
         )
-        st.download_button(
-            "Download Markdown Report",
-            data=report_md,
-            file_name=f"{identity.ticker}_{filing.form}_analysis_report.md",
-            mime="text/markdown",
+    peer_df = pd.DataFrame(peer_rows)
+    st.dataframe(peer_df, use_container_width=True, hide_index=True)
+    peer_chart_df = peer_df[peer_df["delta_vs_peer"].notna()]
+    if not peer_chart_df.empty:
+        fig_peer = px.bar(
+            peer_chart_df,
+            x="ratio",
+            y="delta_vs_peer",
+            color="quality",
+            title="Ratio Delta vs Peer Median",
         )
-        if save_report:
-            saved_path = save_markdown_report(report_md, identity.ticker, filing.form)
-            st.success(f"Saved report: {saved_path}")
-        with st.expander("Recent saved reports"):
-            for report_path in list_recent_reports(limit=8):
-                st.write(str(report_path))
+        st.plotly_chart(fig_peer, use_container_width=True)
+    if peer_result.get("peer_mode") == "sketch":
+        st.caption("Peer medians come from stored SIC quantile sketches; no peer filings were fetched.")
+    if peer_result.get("peer_mode") == "nearest":
+        st.caption("Peer medians are weighted by inverse distance in fundamentals space.")
+        st.dataframe(pd.DataFrame(peer_result.get("peers", [])), use_container_width=True, hide_index=True)
 
-else:
-    st.info("Enter a ticker and click 'Fetch latest filing' to begin.")
+if job_active:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+st.subheader("Investment Summary (Sprint 4)")
+summary_text = build_investment_summary(
+    company_name=identity.company_name or identity.ticker,
+    ticker=identity.ticker,
+    filing_form=filing.form,
+    ratios=ratios,
+    insights=insights,
+    peer_comparison=peer_comparison,
+    forensic=forensic,
+)
+st.text(summary_text)
+
+report_md = build_markdown_report(
+    company_name=identity.company_name or identity.ticker,
+    ticker=identity.ticker,
+    filing=filing.model_dump(),
+    ratios=ratios,
+    insights=insights,
+    peer_comparison=peer_comparison,
+    summary_text=summary_text,
+    forensic=forensic,
+)
+st.download_button(
+    "Download Markdown Report",
+    data=report_md,
+    file_name=f"{identity.ticker}_{filing.form}_analysis_report.md",
+    mime="text/markdown",
+)
+if save_report and st.session_state.get("saved_report_job_id") != job.job_id:
+    saved_path = save_markdown_report(report_md, identity.ticker, filing.form)
+    st.session_state["saved_report_job_id"] = job.job_id
+    st.success(f"Saved report: {saved_path}")
+with st.expander("Recent saved reports"):
+    for report_path in list_recent_reports(limit=8):
+        st.write(str(report_path))
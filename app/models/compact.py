@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class RatioQuality(IntEnum):
+    OK = 0
+    MISSING_DATA = 1
+    UNSTABLE_DENOMINATOR = 2
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def from_label(cls, label: Optional[str]) -> "RatioQuality":
+        try:
+            return cls[str(label).upper()]
+        except KeyError:
+            return cls.MISSING_DATA
+
+
+@dataclass(frozen=True)
+class RatioResult:
+    __slots__ = ("value", "quality")
+    value: Optional[float]
+    quality: RatioQuality
+
+    def to_dict(self) -> Dict:
+        return {"value": self.value, "quality": self.quality.label}
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "RatioResult":
+        value = payload.get("value")
+        return cls(
+            value=float(value) if isinstance(value, (int, float)) else None,
+            quality=RatioQuality.from_label(payload.get("quality")),
+        )
+
+
+class RatioSet:
+    """
+    Array-backed ratio results for many companies: one float64 value matrix and one uint8
+    quality matrix (company x ratio) instead of a dict of dicts per company.
+    """
+
+    __slots__ = ("ciks", "ratio_keys", "values", "quality")
+
+    def __init__(
+        self,
+        ciks: np.ndarray,
+        ratio_keys: Sequence[str],
+        values: np.ndarray,
+        quality: np.ndarray,
+    ) -> None:
+        self.ciks = ciks
+        self.ratio_keys = tuple(ratio_keys)
+        self.values = values
+        self.quality = quality
+
+    @classmethod
+    def from_ratio_maps(
+        cls,
+        ciks: Sequence[int],
+        ratio_maps: Sequence[Dict[str, Dict]],
+        ratio_keys: Sequence[str],
+    ) -> "RatioSet":
+        size = len(ratio_maps)
+        values = np.full((size, len(ratio_keys)), np.nan, dtype=np.float64)
+        quality = np.full((size, len(ratio_keys)), RatioQuality.MISSING_DATA, dtype=np.uint8)
+        for row, ratio_map in enumerate(ratio_maps):
+            for col, key in enumerate(ratio_keys):
+                payload = ratio_map.get(key)
+                if not payload:
+                    continue
+                result = RatioResult.from_dict(payload)
+                quality[row, col] = result.quality
+                if result.value is not None:
+                    values[row, col] = result.value
+        return cls(np.asarray(ciks, dtype=np.int64), ratio_keys, values, quality)
+
+    def __len__(self) -> int:
+        return int(self.ciks.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.ciks.nbytes + self.values.nbytes + self.quality.nbytes)
+
+    def ok_values(self) -> np.ndarray:
+        """Value matrix with every non-`ok` cell set to NaN."""
+        return np.where(self.quality == RatioQuality.OK, self.values, np.nan)
+
+    def result(self, row: int, key: str) -> RatioResult:
+        col = self.ratio_keys.index(key)
+        value = self.values[row, col]
+        return RatioResult(
+            value=None if np.isnan(value) else float(value),
+            quality=RatioQuality(int(self.quality[row, col])),
+        )
+
+    def ratio_map(self, row: int) -> Dict[str, Dict]:
+        return {key: self.result(row, key).to_dict() for key in self.ratio_keys}
+
+    def to_ratio_maps(self) -> List[Dict[str, Dict]]:
+        return [self.ratio_map(row) for row in range(len(self))]
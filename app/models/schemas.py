@@ -12,6 +12,7 @@ class FilingMetadata(BaseModel):
     cik_10: str = Field(description="CIK as 10-digit zero-padded string")
     cik_int: int = Field(description="CIK integer, used in EDGAR archive paths")
     filing_url: str
+    report_date: Optional[date] = Field(default=None, description="Period end the filing reports on")
 
 
 class CompanyIdentity(BaseModel):
@@ -1,26 +1,159 @@
-from typing import Dict
+from typing import Dict, Optional
 
-from app.services.filing_parser import extract_sections, filing_to_text
+from app.services.artifact_cache import ArtifactCache
+from app.services.concept_plan import (
+    ConceptPlanStore,
+    build_concept_plan,
+    facts_fingerprint,
+    filing_period_end,
+    resolve_financials_at,
+)
+from app.services.filing_parser import extract_sections_with_spans, parse_filing
+from app.services.filing_store import SectionTexts, filing_text_exists, open_section_views
+from app.services.parse_executor import ParseExecutor
 from app.services.ratio_engine import compute_ratios
 from app.services.summary_engine import build_investment_summary
-from app.services.xbrl_mapper import extract_latest_financials
+from app.utils.profiling import ProfileCapture
 
 
-def run_deterministic_analysis(sec_client, ticker: str, preferred_form: str = "10-K") -> Dict:
+class NotFoundError(ValueError):
+    """Unknown ticker or no filing of the requested form; callers may report it as "not found"."""
+
+
+def run_deterministic_analysis(
+    sec_client,
+    ticker: str,
+    preferred_form: str = "10-K",
+    artifact_cache: Optional[ArtifactCache] = None,
+    concept_plans: Optional[ConceptPlanStore] = None,
+    profile: bool = False,
+    filing_text_dir: Optional[str] = None,
+    parse_executor: Optional[ParseExecutor] = None,
+) -> Dict:
+    """
+    With `profile=True` the run is captured by `ProfileCapture` (pstats, speedscope, tracemalloc)
+    and its summary is returned under `profile`. When off, the run is not wrapped at all.
+
+    With `filing_text_dir`, normalized text is persisted once per accession and section records
+    are `SectionView`s over its memory map instead of owned strings.
+
+    With `parse_executor`, the downloaded document is parsed in its process pool (the worker
+    persists the text into the executor's `output_dir`, which becomes `filing_text_dir`).
+    """
+    if parse_executor is not None:
+        filing_text_dir = parse_executor.output_dir
+    args = (sec_client, ticker, preferred_form, artifact_cache, concept_plans, filing_text_dir, parse_executor)
+    if not profile:
+        return _run_deterministic_analysis(*args)
+    with ProfileCapture(f"{ticker.upper().strip()}-{preferred_form}") as capture:
+        result = _run_deterministic_analysis(*args)
+    return {**result, "profile": capture.summary}
+
+
+def _run_deterministic_analysis(
+    sec_client,
+    ticker: str,
+    preferred_form: str,
+    artifact_cache: Optional[ArtifactCache],
+    concept_plans: Optional[ConceptPlanStore],
+    filing_text_dir: Optional[str],
+    parse_executor: Optional[ParseExecutor],
+) -> Dict:
     identity = sec_client.ticker_to_identity(ticker)
     if not identity:
-        raise ValueError(f"Ticker not found: {ticker}")
+        raise NotFoundError(f"Ticker not found: {ticker}")
 
     filing = sec_client.get_latest_filing(identity.cik_10, preferred_form=preferred_form)
     if not filing:
-        raise ValueError("No filing metadata found")
+        raise NotFoundError("No filing metadata found")
+
+    parsed: Dict = {}
+
+    def _parse() -> Dict:
+        # Text and inline XBRL facts come from one parse pass over the downloaded document.
+        if not parsed:
+            raw_filing = sec_client.get_filing_text(filing.filing_url)
+            if parse_executor is None:
+                parsed["text"], parsed["ixbrl_financials"] = parse_filing(raw_filing, filing.form)
+            else:
+                # The worker persists the text for mapping; only small metadata comes back.
+                result = parse_executor.submit(filing.accession_number, filing.form, raw_filing=raw_filing).result()
+                parsed["text"], parsed["ixbrl_financials"] = None, result["ixbrl_financials"]
+        return parsed
+
+    def _cached_section_records() -> Dict[str, Dict]:
+        filing_text = artifact_cache.get_or_compute(filing.accession_number, "filing_text", lambda: _parse()["text"])
+        return extract_sections_with_spans(filing_text, filing.form)
+
+    if filing_text_dir is not None:
+        # The persisted text doubles as the sections cache: a known accession is not re-parsed
+        # for its text (only for inline XBRL facts, when those are not cached either).
+        if parse_executor is not None and not filing_text_exists(filing.accession_number, output_dir=filing_text_dir):
+            _parse()
+        section_records = open_section_views(
+            filing.accession_number, filing.form, lambda: _parse()["text"], output_dir=filing_text_dir
+        )
+    elif artifact_cache is None:
+        section_records = extract_sections_with_spans(_parse()["text"], filing.form)
+    else:
+        # A cached `sections` artifact skips the filing download and parse entirely.
+        section_records = artifact_cache.get_or_compute(filing.accession_number, "sections", _cached_section_records)
+
+    if artifact_cache is None:
+        ixbrl_financials = _parse()["ixbrl_financials"]
+    else:
+        ixbrl_financials = artifact_cache.get_or_compute(
+            filing.accession_number,
+            "ixbrl_financials",
+            lambda: _parse()["ixbrl_financials"],
+        )
+
+    # Values from the filing's own inline XBRL are tied to its period, so they win. Metrics it does
+    # not tag are filled from companyfacts points for that same period end only (one more
+    # download); a metric the company did not report for the period stays None, so its ratios are
+    # flagged as missing data instead of mixing in a later quarter's value.
+    missing = [metric for metric, value in ixbrl_financials.items() if value is None]
+    financials_period_end = filing.report_date.isoformat() if filing.report_date else None
+    if not missing:
+        financials = ixbrl_financials
+        financials_source = "ixbrl"
+    else:
+        company_facts = sec_client.get_company_facts(identity.cik_10)
+        plan = (
+            concept_plans.get_or_build(identity.cik_int, company_facts)
+            if concept_plans is not None
+            else build_concept_plan(company_facts)
+        )
+        financials_period_end = financials_period_end or filing_period_end(company_facts, filing.accession_number)
+        if financials_period_end is None and len(missing) == len(ixbrl_financials):
+            # Nothing ties the filing to a period: use the newest one, still a single period.
+            latest_ends = [m["latest"]["end"] for m in plan["metrics"].values() if m["latest"]]
+            financials_period_end = max(latest_ends) if latest_ends else None
+
+        def _resolve() -> Dict:
+            return resolve_financials_at(company_facts, plan, financials_period_end, filing.form)
 
-    raw_filing = sec_client.get_filing_text(filing.filing_url)
-    filing_text = filing_to_text(raw_filing)
-    sections = extract_sections(filing_text, filing.form)
+        if financials_period_end is None:
+            companyfacts_financials = {}
+        elif artifact_cache is None:
+            companyfacts_financials = _resolve()
+        else:
+            companyfacts_financials = artifact_cache.get_or_compute(
+                f"{identity.cik_int}:{financials_period_end}:{filing.form}:{facts_fingerprint(company_facts)}",
+                "financials",
+                _resolve,
+            )
+        financials = {
+            metric: value if value is not None else companyfacts_financials.get(metric)
+            for metric, value in ixbrl_financials.items()
+        }
+        filled = [metric for metric in missing if financials[metric] is not None]
+        if len(missing) == len(ixbrl_financials):
+            financials_source = "companyfacts"
+        else:
+            financials_source = "ixbrl+companyfacts" if filled else "ixbrl"
+    sections = SectionTexts(section_records)
 
-    company_facts = sec_client.get_company_facts(identity.cik_10)
-    financials = extract_latest_financials(company_facts)
     ratios = compute_ratios(financials)
 
     summary = build_investment_summary(
@@ -36,7 +169,10 @@ def run_deterministic_analysis(sec_client, ticker: str, preferred_form: str = "1
         "identity": identity,
         "filing": filing,
         "sections": sections,
+        "section_records": section_records,
         "financials": financials,
+        "financials_source": financials_source,
+        "financials_period_end": financials_period_end,
         "ratios": ratios,
         "summary": summary,
     }
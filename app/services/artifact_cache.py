@@ -0,0 +1,82 @@
+import hashlib
+import json
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.utils.atomic_write import atomic_write_bytes
+
+
+# Bump a stage's version when its output format or logic changes; downstream stages
+# include upstream versions in their key, so they are invalidated too.
+STAGE_VERSIONS: Dict[str, int] = {
+    "filing_text": 1,
+    "sections": 1,
+    "financials": 2,
+    "ixbrl_financials": 1,
+    "section_insights": 1,
+}
+
+STAGE_DEPENDENCIES: Dict[str, List[str]] = {
+    "filing_text": [],
+    "sections": ["filing_text"],
+    "financials": [],
+    "ixbrl_financials": [],
+    "section_insights": ["sections"],
+}
+
+
+def stage_lineage(stage: str) -> List[str]:
+    lineage: List[str] = []
+    for upstream in STAGE_DEPENDENCIES.get(stage, []):
+        for name in stage_lineage(upstream):
+            if name not in lineage:
+                lineage.append(name)
+    lineage.append(stage)
+    return lineage
+
+
+def stage_fingerprint(stage: str) -> str:
+    return "+".join(f"{name}@v{STAGE_VERSIONS[name]}" for name in stage_lineage(stage))
+
+
+class ArtifactCache:
+    """
+    Stage-level cache of derived artifacts keyed by (input key, stage, stage lineage versions).
+    Values are stored as zlib-compressed JSON, one file per artifact.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self.cache_dir = Path(cache_dir or settings.artifact_cache_dir)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _path(self, input_key: str, stage: str) -> Path:
+        digest = hashlib.sha256(f"{input_key}|{stage_fingerprint(stage)}".encode("utf-8")).hexdigest()
+        return self.cache_dir / stage / f"{digest}.json.zz"
+
+    def get(self, input_key: str, stage: str) -> Optional[Any]:
+        path = self._path(input_key, stage)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(zlib.decompress(path.read_bytes()).decode("utf-8"))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def put(self, input_key: str, stage: str, value: Any) -> Path:
+        # Two workers may cache the same accession at once; each writes its own temp file.
+        return atomic_write_bytes(
+            self._path(input_key, stage),
+            zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8")),
+        )
+
+    def get_or_compute(self, input_key: str, stage: str, compute: Callable[[], Any]) -> Any:
+        cached = self.get(input_key, stage)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+        self.stats["misses"] += 1
+        value = compute()
+        self.put(input_key, stage, value)
+        return value
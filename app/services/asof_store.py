@@ -0,0 +1,175 @@
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.compact import RatioSet
+from app.services.ratio_engine import RATIO_KEYS, SNAPSHOT_PLAN
+from app.services.xbrl_mapper import CONCEPT_MAP
+
+
+CONCEPTS: List[str] = list(dict.fromkeys(concept for concepts in CONCEPT_MAP.values() for concept in concepts))
+_CONCEPT_CODES = {concept: code for code, concept in enumerate(CONCEPTS)}
+
+
+def _day(value) -> int:
+    return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+
+
+def month_ends(start: date, end: date) -> List[date]:
+    months = np.arange(np.datetime64(start, "M"), np.datetime64(end, "M") + 1)
+    days = (months + 1).astype("datetime64[D]") - 1
+    return [d.item() for d in days if start <= d.item() <= end]
+
+
+class AsOfFactStore:
+    """
+    Point-in-time store of companyfacts values for the `CONCEPT_MAP` concepts, as columnar arrays
+    sorted by (cik, concept, period end, filed date). An as-of query sees only points filed on or
+    before the date, so later restatements never leak into a backtest.
+    """
+
+    def __init__(
+        self,
+        ciks: np.ndarray,
+        concepts: np.ndarray,
+        ends: np.ndarray,
+        filed: np.ndarray,
+        values: np.ndarray,
+    ) -> None:
+        order = np.lexsort((filed, ends, concepts, ciks))
+        self.ciks = ciks[order]
+        self.concepts = concepts[order]
+        self.ends = ends[order]
+        self.filed = filed[order]
+        self.values = values[order]
+        group_change = np.ones(len(self.ciks), dtype=bool)
+        group_change[1:] = (self.ciks[1:] != self.ciks[:-1]) | (self.concepts[1:] != self.concepts[:-1])
+        self._group_starts = np.flatnonzero(group_change)
+        self.universe = np.unique(self.ciks)
+
+    @classmethod
+    def from_company_facts(cls, company_facts_iter: Iterable[Dict]) -> "AsOfFactStore":
+        rows: List[Tuple[int, int, int, int, float]] = []
+        for company_facts in company_facts_iter:
+            cik = int(company_facts.get("cik", 0))
+            us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+            for concept, code in _CONCEPT_CODES.items():
+                for point in us_gaap.get(concept, {}).get("units", {}).get("USD", []):
+                    try:
+                        value = float(point.get("val"))
+                        rows.append((cik, code, _day(point["end"]), _day(point["filed"]), value))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return cls(
+            columns[:, 0].astype(np.int64),
+            columns[:, 1].astype(np.int16),
+            columns[:, 2].astype(np.int32),
+            columns[:, 3].astype(np.int32),
+            columns[:, 4],
+        )
+
+    def __len__(self) -> int:
+        return int(self.ciks.shape[0])
+
+    def save(self, path: Optional[str] = None) -> Path:
+        out_path = Path(path or settings.asof_store_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with out_path.open("wb") as handle:
+            np.savez(
+                handle,
+                ciks=self.ciks,
+                concepts=self.concepts,
+                ends=self.ends,
+                filed=self.filed,
+                values=self.values,
+                concept_names=np.array(CONCEPTS),
+            )
+        return out_path
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "AsOfFactStore":
+        with np.load(Path(path or settings.asof_store_path)) as payload:
+            if list(payload["concept_names"]) != CONCEPTS:
+                raise ValueError("As-of store was built with a different CONCEPT_MAP; rebuild it")
+            return cls(payload["ciks"], payload["concepts"], payload["ends"], payload["filed"], payload["values"])
+
+    def _asof_rows(self, as_of: date, max_age_days: Optional[int]) -> np.ndarray:
+        """Per (cik, concept) group: row index of the newest period end known on `as_of`, or -1."""
+        day = _day(as_of)
+        visible = self.filed <= day
+        if max_age_days is not None:
+            visible &= self.ends >= day - max_age_days
+        # Rows are sorted by end then filed within a group, so the last visible row wins.
+        candidates = np.where(visible, np.arange(len(self)), -1)
+        if len(self) == 0:
+            return candidates
+        return np.maximum.reduceat(candidates, self._group_starts)
+
+    def financials_as_of(self, as_of: date, max_age_days: Optional[int] = 400) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Universe-wide point-in-time financials: (ciks, {metric: values}) with NaN where nothing was
+        known. Among a metric's fallback concepts the newest period end wins, then concept order.
+        """
+        ciks = self.universe
+        rows = self._asof_rows(as_of, max_age_days)
+        rows = rows[rows >= 0]
+        company_idx = np.searchsorted(ciks, self.ciks[rows])
+        row_concepts = self.concepts[rows]
+        financials: Dict[str, np.ndarray] = {}
+        for metric, concepts in CONCEPT_MAP.items():
+            best_score = np.full(len(ciks), -1, dtype=np.int64)
+            values = np.full(len(ciks), np.nan)
+            for priority, concept in enumerate(concepts):
+                mask = row_concepts == _CONCEPT_CODES[concept]
+                selected, target = rows[mask], company_idx[mask]
+                score = self.ends[selected].astype(np.int64) * len(concepts) + (len(concepts) - 1 - priority)
+                better = score > best_score[target]
+                best_score[target[better]] = score[better]
+                values[target[better]] = self.values[selected[better]]
+            financials[metric] = values
+        return ciks, financials
+
+    def ratio_set_as_of(self, as_of: date, max_age_days: Optional[int] = 400) -> RatioSet:
+        ciks, financials = self.financials_as_of(as_of, max_age_days=max_age_days)
+        values, quality = SNAPSHOT_PLAN.evaluate(financials)
+        return RatioSet(ciks, RATIO_KEYS, np.ascontiguousarray(values[:, 0, :]), np.ascontiguousarray(quality[:, 0, :]))
+
+    def value_as_of(self, cik: int, concept: str, as_of: date) -> Optional[float]:
+        """Single lookup by binary search over the sorted (cik, concept) block."""
+        code = _CONCEPT_CODES[concept]
+        lo = np.searchsorted(self.ciks, cik, side="left")
+        hi = np.searchsorted(self.ciks, cik, side="right")
+        lo += np.searchsorted(self.concepts[lo:hi], code, side="left")
+        hi = lo + np.searchsorted(self.concepts[lo:hi], code, side="right")
+        visible = np.flatnonzero(self.filed[lo:hi] <= _day(as_of))
+        return float(self.values[lo + visible[-1]]) if visible.size else None
+
+
+def build_month_end_snapshots(
+    store: AsOfFactStore,
+    start: date,
+    end: date,
+    output_dir: Optional[str] = None,
+    max_age_days: Optional[int] = 400,
+) -> List[Path]:
+    """Writes one `.npz` of point-in-time financials per month-end so backtests just load a file."""
+    out_dir = Path(output_dir or settings.asof_snapshot_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for month_end in month_ends(start, end):
+        ciks, financials = store.financials_as_of(month_end, max_age_days=max_age_days)
+        path = out_dir / f"{month_end.isoformat()}.npz"
+        with path.open("wb") as handle:
+            np.savez(handle, ciks=ciks, **financials)
+        paths.append(path)
+    return paths
+
+
+def load_month_end_snapshot(month_end: date, output_dir: Optional[str] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    path = Path(output_dir or settings.asof_snapshot_dir) / f"{month_end.isoformat()}.npz"
+    with np.load(path) as payload:
+        return payload["ciks"], {metric: payload[metric] for metric in CONCEPT_MAP}
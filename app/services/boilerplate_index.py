@@ -0,0 +1,213 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.filing_diff import split_units
+from app.utils.minhash import NUM_PERM, estimate_jaccard, minhash_signature
+
+
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+CLUSTER_THRESHOLD = 0.7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clusters (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    members INTEGER NOT NULL DEFAULT 0,
+    companies INTEGER NOT NULL DEFAULT 0,
+    insight TEXT
+);
+CREATE TABLE IF NOT EXISTS cluster_ciks (
+    cluster_id INTEGER NOT NULL,
+    cik INTEGER NOT NULL,
+    PRIMARY KEY (cluster_id, cik)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bands (
+    band_key TEXT NOT NULL,
+    cluster_id INTEGER NOT NULL,
+    PRIMARY KEY (band_key, cluster_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS filings (
+    accession_number TEXT PRIMARY KEY
+);
+"""
+
+
+class BoilerplateIndex:
+    """
+    Corpus-wide MinHash-LSH index over filing sentences, built incrementally as filings are
+    parsed. Near-duplicate sentences share a cluster; a cluster seen in `min_companies` or more
+    companies is boilerplate and keeps one shared cached LLM insight.
+
+    Stored in one SQLite file shared by batch threads and job processes. Recording a filing is
+    one transaction that looks up only the LSH bands of its sentences and writes only the
+    clusters they touch, so the cost per filing does not grow with the corpus. Clusters are
+    append-only, so cluster ids agree across writers.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_companies: Optional[int] = None) -> None:
+        self.path = Path(path or settings.boilerplate_index_path)
+        self.min_companies = min_companies or settings.boilerplate_min_companies
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._pending_insights: Dict[int, Dict] = {}
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit mode with explicit write transactions.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, sql_fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = sql_fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def record_filing(self, cik: int, accession_number: str, section_records: Dict[str, Dict]) -> bool:
+        """Adds one filing's sentences to the shared index; a filing already recorded is skipped."""
+
+        def apply(conn: sqlite3.Connection) -> bool:
+            inserted = conn.execute("INSERT OR IGNORE INTO filings (accession_number) VALUES (?)", (accession_number,))
+            if inserted.rowcount != 1:
+                return False
+            self._add_section_records(conn, cik, section_records)
+            return True
+
+        return self._transaction(apply)
+
+    def has_filing(self, accession_number: str) -> bool:
+        row = self._conn().execute("SELECT 1 FROM filings WHERE accession_number = ?", (accession_number,)).fetchone()
+        return row is not None
+
+    def publish_cluster_insights(self) -> None:
+        """Writes cluster insights computed since the last publish; insights already stored win."""
+        with self._pending_lock:
+            pending, self._pending_insights = self._pending_insights, {}
+        if not pending:
+            return
+
+        def apply(conn: sqlite3.Connection) -> None:
+            conn.executemany(
+                "UPDATE clusters SET insight = ? WHERE id = ? AND insight IS NULL",
+                [(json.dumps(insight), cluster_id) for cluster_id, insight in pending.items()],
+            )
+
+        self._transaction(apply)
+
+    @staticmethod
+    def _band_keys(signature: np.ndarray) -> List[str]:
+        return [
+            f"{band}:{signature[band * LSH_ROWS : (band + 1) * LSH_ROWS].tobytes().hex()}"
+            for band in range(LSH_BANDS)
+        ]
+
+    def _best_cluster(self, conn: sqlite3.Connection, signature: np.ndarray) -> Optional[Tuple[int, int]]:
+        """(cluster id, company count) of the closest cluster sharing an LSH band, if close enough."""
+        keys = self._band_keys(signature)
+        rows = conn.execute(
+            f"""
+            SELECT DISTINCT clusters.id, clusters.signature, clusters.companies FROM bands
+            JOIN clusters ON clusters.id = bands.cluster_id
+            WHERE bands.band_key IN ({", ".join("?" * len(keys))})
+            """,
+            keys,
+        ).fetchall()
+        best, best_score = None, CLUSTER_THRESHOLD
+        for cluster_id, blob, companies in rows:
+            score = estimate_jaccard(signature, np.frombuffer(blob, dtype=np.uint64))
+            if score >= best_score:
+                best, best_score = (cluster_id, companies), score
+        return best
+
+    def _add_unit(self, conn: sqlite3.Connection, cik: int, text: str) -> int:
+        signature = minhash_signature(text)
+        best = self._best_cluster(conn, signature)
+        if best is None:
+            cluster_id = conn.execute(
+                "INSERT INTO clusters (text, signature) VALUES (?, ?)", (text, signature.astype(np.uint64).tobytes())
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO bands (band_key, cluster_id) VALUES (?, ?)",
+                [(key, cluster_id) for key in self._band_keys(signature)],
+            )
+        else:
+            cluster_id = best[0]
+        new_company = conn.execute(
+            "INSERT OR IGNORE INTO cluster_ciks (cluster_id, cik) VALUES (?, ?)", (cluster_id, int(cik))
+        ).rowcount
+        conn.execute(
+            "UPDATE clusters SET members = members + 1, companies = companies + ? WHERE id = ?", (new_company, cluster_id)
+        )
+        return cluster_id
+
+    def _add_section_records(self, conn: sqlite3.Connection, cik: int, section_records: Dict[str, Dict]) -> None:
+        for record in section_records.values():
+            text = record.get("text", "")
+            for start, end in split_units(text):
+                self._add_unit(conn, cik, text[start:end])
+
+    def add_unit(self, cik: int, text: str) -> int:
+        return self._transaction(lambda conn: self._add_unit(conn, cik, text))
+
+    def add_section_records(self, cik: int, section_records: Dict[str, Dict]) -> None:
+        self._transaction(lambda conn: self._add_section_records(conn, cik, section_records))
+
+    def commonness(self, text: str) -> int:
+        """Number of distinct companies whose filings contain a near-duplicate of `text`."""
+        best = self._best_cluster(self._conn(), minhash_signature(text))
+        return best[1] if best is not None else 0
+
+    def company_count(self, cluster_id: int) -> int:
+        row = self._conn().execute("SELECT companies FROM clusters WHERE id = ?", (cluster_id,)).fetchone()
+        return row[0] if row else 0
+
+    def cluster_text(self, cluster_id: int) -> str:
+        return self._conn().execute("SELECT text FROM clusters WHERE id = ?", (cluster_id,)).fetchone()[0]
+
+    def is_boilerplate(self, cluster_id: Optional[int]) -> bool:
+        return cluster_id is not None and self.company_count(cluster_id) >= self.min_companies
+
+    def split_section(self, text: str) -> Dict:
+        """Separates company-specific sentences from boilerplate clusters for one section."""
+        conn = self._conn()
+        specific, boilerplate_clusters = [], []
+        for start, end in split_units(text):
+            unit_text = text[start:end]
+            best = self._best_cluster(conn, minhash_signature(unit_text))
+            if best is not None and best[1] >= self.min_companies:
+                if best[0] not in boilerplate_clusters:
+                    boilerplate_clusters.append(best[0])
+            else:
+                specific.append(unit_text)
+        return {"specific_text": " ".join(specific), "boilerplate_clusters": boilerplate_clusters}
+
+    def cluster_insight(self, cluster_id: int) -> Optional[Dict]:
+        with self._pending_lock:
+            if cluster_id in self._pending_insights:
+                return self._pending_insights[cluster_id]
+        row = self._conn().execute("SELECT insight FROM clusters WHERE id = ?", (cluster_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def set_cluster_insight(self, cluster_id: int, insight: Dict) -> None:
+        """Visible to this instance at once; shared with other writers by `publish_cluster_insights`."""
+        with self._pending_lock:
+            self._pending_insights[cluster_id] = insight
@@ -0,0 +1,220 @@
+import hashlib
+import json
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.xbrl_mapper import CONCEPT_MAP
+from app.utils.atomic_write import atomic_write_text
+
+
+PLAN_VERSION = 1
+STALE_AFTER_DAYS = 400
+
+
+def _usd_points(us_gaap: Dict, concept: str) -> List[Dict]:
+    return us_gaap.get(concept, {}).get("units", {}).get("USD", [])
+
+
+def _float_or_none(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def facts_fingerprint(company_facts: Dict) -> str:
+    """
+    Cheap change detector over the mapped concepts only: point count plus the last point of each
+    concept (new filings append points), so checking a stored plan never walks the full facts.
+    """
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    summary = []
+    for concepts in CONCEPT_MAP.values():
+        for concept in concepts:
+            points = _usd_points(us_gaap, concept)
+            last = points[-1] if points else {}
+            summary.append((concept, len(points), last.get("end"), last.get("filed"), last.get("val")))
+    return hashlib.sha256(json.dumps([PLAN_VERSION, summary], default=str).encode("utf-8")).hexdigest()
+
+
+def _latest_by_end(points: List[Dict]) -> Dict[str, Tuple[str, float]]:
+    """Period end -> (filed, value) of the most recently filed numeric point, in one pass."""
+    by_end: Dict[str, Tuple[str, float]] = {}
+    for point in points:
+        value = _float_or_none(point.get("val"))
+        if value is None:
+            continue
+        end, filed = str(point.get("end", "")), str(point.get("filed", ""))
+        if end and (end not in by_end or filed >= by_end[end][0]):
+            by_end[end] = (filed, value)
+    return by_end
+
+
+def build_concept_plan(company_facts: Dict) -> Dict:
+    """
+    Decides, per metric and period end, which `CONCEPT_MAP` concept supplies the value: the
+    highest-priority concept reporting that period. Consecutive periods served by the same
+    concept form a segment, so a company that switched concepts gets a spliced history.
+    """
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    metrics: Dict[str, Dict] = {}
+    for metric, concepts in CONCEPT_MAP.items():
+        concept_by_end: Dict[str, str] = {}
+        for concept in concepts:
+            for end in _latest_by_end(_usd_points(us_gaap, concept)):
+                concept_by_end.setdefault(end, concept)
+
+        segments: List[Dict] = []
+        for end in sorted(concept_by_end):
+            concept = concept_by_end[end]
+            if segments and segments[-1]["concept"] == concept:
+                segments[-1]["last_end"] = end
+                segments[-1]["periods"] += 1
+            else:
+                segments.append({"concept": concept, "first_end": end, "last_end": end, "periods": 1})
+        metrics[metric] = {
+            "segments": segments,
+            "latest": {"concept": segments[-1]["concept"], "end": segments[-1]["last_end"]} if segments else None,
+        }
+    plan = {"version": PLAN_VERSION, "fingerprint": facts_fingerprint(company_facts), "metrics": metrics}
+    plan["coverage"] = coverage_report(plan)
+    return plan
+
+
+def _value_at(us_gaap: Dict, concept: str, end: str) -> Optional[float]:
+    best: Optional[Tuple[str, float]] = None
+    for point in _usd_points(us_gaap, concept):
+        if str(point.get("end", "")) != end:
+            continue
+        value = _float_or_none(point.get("val"))
+        filed = str(point.get("filed", ""))
+        if value is not None and (best is None or filed >= best[0]):
+            best = (filed, value)
+    return best[1] if best else None
+
+
+def resolve_latest_financials(company_facts: Dict, plan: Dict) -> Dict[str, Optional[float]]:
+    """Latest value per metric by direct lookup of the planned concept and period end."""
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    result: Dict[str, Optional[float]] = {}
+    for metric in CONCEPT_MAP:
+        latest = plan["metrics"].get(metric, {}).get("latest")
+        result[metric] = _value_at(us_gaap, latest["concept"], latest["end"]) if latest else None
+    return result
+
+
+def _duration_days(point: Dict) -> int:
+    try:
+        return (date.fromisoformat(str(point["end"])) - date.fromisoformat(str(point["start"]))).days
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+def filing_period_end(company_facts: Dict, accession_number: str) -> Optional[str]:
+    """Period end of one filing from its own companyfacts points (`accn`), or None if it has none."""
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    ends = [
+        str(point["end"])
+        for concepts in CONCEPT_MAP.values()
+        for concept in concepts
+        for point in _usd_points(us_gaap, concept)
+        if point.get("accn") == accession_number and point.get("end")
+    ]
+    return max(ends) if ends else None
+
+
+def resolve_financials_at(company_facts: Dict, plan: Dict, period_end: str, form_type: str) -> Dict[str, Optional[float]]:
+    """
+    Values for exactly `period_end`, from the concept the plan uses for that period; None where the
+    company reported nothing for it. Durations prefer the annual span for 10-K and the quarter for
+    10-Q, as `ixbrl_financials` does, then the most recently filed point.
+    """
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    prefer_longest = form_type.upper().startswith("10-K")
+    result: Dict[str, Optional[float]] = {}
+    for metric in CONCEPT_MAP:
+        segments = plan["metrics"].get(metric, {}).get("segments", [])
+        concept = next((seg["concept"] for seg in segments if seg["first_end"] <= period_end <= seg["last_end"]), None)
+        candidates = [
+            point
+            for point in (_usd_points(us_gaap, concept) if concept else [])
+            if str(point.get("end", "")) == period_end and _float_or_none(point.get("val")) is not None
+        ]
+        if not candidates:
+            result[metric] = None
+            continue
+        duration = (max if prefer_longest else min)(_duration_days(point) for point in candidates)
+        best = max((point for point in candidates if _duration_days(point) == duration), key=lambda p: str(p.get("filed", "")))
+        result[metric] = _float_or_none(best["val"])
+    return result
+
+
+def spliced_series(company_facts: Dict, plan: Dict, metric: str) -> List[Dict]:
+    """Full per-period history of one metric across the plan's concept segments, oldest first."""
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    series: List[Dict] = []
+    for segment in plan["metrics"].get(metric, {}).get("segments", []):
+        by_end = _latest_by_end(_usd_points(us_gaap, segment["concept"]))
+        for end in sorted(e for e in by_end if segment["first_end"] <= e <= segment["last_end"]):
+            filed, value = by_end[end]
+            series.append({"end": end, "filed": filed, "value": value, "concept": segment["concept"]})
+    return series
+
+
+def coverage_report(plan: Dict) -> List[Dict]:
+    """One row per metric: concepts used, periods covered and whether the latest value is stale."""
+    latest_ends = [m["latest"]["end"] for m in plan["metrics"].values() if m["latest"]]
+    newest = max(latest_ends) if latest_ends else None
+    rows = []
+    for metric, payload in plan["metrics"].items():
+        segments = payload["segments"]
+        if not segments:
+            rows.append({"metric": metric, "status": "missing", "concepts": [], "periods": 0, "first_end": None, "last_end": None})
+            continue
+        last_end = segments[-1]["last_end"]
+        lag_days = (date.fromisoformat(newest) - date.fromisoformat(last_end)).days
+        rows.append(
+            {
+                "metric": metric,
+                "status": "stale" if lag_days > STALE_AFTER_DAYS else "ok",
+                "concepts": list(dict.fromkeys(segment["concept"] for segment in segments)),
+                "periods": sum(segment["periods"] for segment in segments),
+                "first_end": segments[0]["first_end"],
+                "last_end": last_end,
+            }
+        )
+    return rows
+
+
+class ConceptPlanStore:
+    """Persisted per-company plans (one JSON file per CIK), rebuilt only when the facts change."""
+
+    def __init__(self, plan_dir: Optional[str] = None) -> None:
+        self.plan_dir = Path(plan_dir or settings.concept_plan_dir)
+        self.stats = {"hits": 0, "builds": 0}
+
+    def _path(self, cik: int) -> Path:
+        return self.plan_dir / f"{int(cik)}.json"
+
+    def get_or_build(self, cik: int, company_facts: Dict) -> Dict:
+        path = self._path(cik)
+        fingerprint = facts_fingerprint(company_facts)
+        if path.exists():
+            try:
+                plan = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                plan = None
+            if plan and plan.get("fingerprint") == fingerprint:
+                self.stats["hits"] += 1
+                return plan
+
+        self.stats["builds"] += 1
+        plan = build_concept_plan(company_facts)
+        # Peer and analysis stages can resolve the same CIK at once; each writes its own temp file.
+        atomic_write_text(path, json.dumps(plan))
+        return plan
+
+    def resolve(self, cik: int, company_facts: Dict) -> Dict[str, Optional[float]]:
+        return resolve_latest_financials(company_facts, self.get_or_build(cik, company_facts))
@@ -0,0 +1,91 @@
+import re
+from typing import Dict, List, Tuple
+
+from app.services.filing_diff import split_units
+from app.services.llm_engine import _normalize_payload, attach_evidence_spans
+
+
+def _compile(terms: List[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(terms) + r")\b", flags=re.IGNORECASE)
+
+
+# (pattern, weight) per insight category; a sentence's score is the weighted hit count
+# (capped per pattern), so e.g. a revenue term alone is not enough without a direction word.
+CATEGORY_PATTERNS: Dict[str, List[Tuple[re.Pattern, float]]] = {
+    "revenue_trends": [
+        (_compile([r"(?:net )?(?:revenue|sales)s?", r"net sales"]), 1.0),
+        (_compile([r"increase[sd]?", r"decrease[sd]?", r"grew", r"growth", r"decline[sd]?", r"rose", r"fell"]), 1.0),
+        (_compile([r"year[- ]over[- ]year", r"compared (?:to|with)", r"fiscal \d{4}"]), 0.5),
+    ],
+    "debt_risk_signals": [
+        (_compile([r"debt", r"borrowings?", r"notes? payable", r"credit (?:facility|agreement)", r"term loans?", r"indebtedness"]), 1.0),
+        (_compile([r"covenants?", r"maturit(?:y|ies)", r"refinanc\w*", r"default", r"interest rates?", r"leverage"]), 1.0),
+    ],
+    "risk_factor_highlights": [
+        (_compile([r"could (?:adversely|materially|negatively)", r"may (?:adversely|materially|negatively)", r"adverse(?:ly)? affect\w*"]), 2.0),
+        (_compile([r"depend(?:s|ent|ence)? on", r"concentrat\w*", r"competition", r"regulat\w*", r"cybersecurity", r"supply chain"]), 1.0),
+    ],
+    "red_flags": [
+        (_compile([r"going concern", r"material weakness(?:es)?", r"restate\w*", r"substantial doubt", r"impairment", r"delist\w*"]), 3.0),
+        (_compile([r"investigation", r"subpoena", r"class action", r"waiver", r"breach", r"write[- ]?(?:off|down)s?"]), 1.5),
+    ],
+    "management_commentary": [
+        (_compile([r"we (?:expect|believe|anticipate|intend|plan)", r"our strategy", r"outlook", r"guidance", r"priorit\w*"]), 1.5),
+        (_compile([r"invest\w*", r"expan\w*", r"launch\w*", r"focus\w*"]), 0.5),
+    ],
+}
+
+# Sections where a category's sentences are most informative get a score boost.
+SECTION_AFFINITY: Dict[str, Dict[str, float]] = {
+    "mda": {"revenue_trends": 1.5, "management_commentary": 1.5, "debt_risk_signals": 1.2},
+    "risk_factors": {"risk_factor_highlights": 1.5, "red_flags": 1.2},
+    "business": {"management_commentary": 1.2},
+}
+
+_QUANTITY = re.compile(r"\$\s?\d|\d+(?:\.\d+)?\s?%|\b\d{1,3}(?:,\d{3})+\b")
+MIN_SCORE = 2.0
+MAX_SENTENCE_CHARS = 400
+
+
+def score_sentence(sentence: str, category: str, section_name: str = "") -> float:
+    score = 0.0
+    for pattern, weight in CATEGORY_PATTERNS[category]:
+        score += weight * min(len(pattern.findall(sentence)), 3)
+    if score and _QUANTITY.search(sentence):
+        score += 1.0
+    return score * SECTION_AFFINITY.get(section_name, {}).get(category, 1.0)
+
+
+def extract_fast_insights(section_records: Dict[str, Dict], per_category: int = 4) -> Dict:
+    """
+    Deterministic insights with the same schema as the LLM output, from keyword scoring of each
+    section's sentences. Bullets and evidence quotes are verbatim sentences, so every quote maps
+    back to an evidence span.
+    """
+    candidates: Dict[str, List[Tuple[float, str]]] = {category: [] for category in CATEGORY_PATTERNS}
+    for section_name, record in section_records.items():
+        text = record.get("text", "")
+        for start, end in split_units(text):
+            sentence = text[start:end].strip()
+            if len(sentence) < 20 or len(sentence) > MAX_SENTENCE_CHARS:
+                continue
+            for category in CATEGORY_PATTERNS:
+                score = score_sentence(sentence, category, section_name)
+                if score >= MIN_SCORE:
+                    candidates[category].append((score, sentence))
+
+    payload: Dict = {}
+    quotes: List[Tuple[float, str]] = []
+    for category, scored in candidates.items():
+        scored.sort(key=lambda item: item[0], reverse=True)
+        payload[category] = [sentence for _, sentence in scored[:per_category]]
+        quotes.extend(scored[:1])
+    quotes.sort(key=lambda item: item[0], reverse=True)
+    payload["evidence_quotes"] = list(dict.fromkeys(sentence for _, sentence in quotes))
+    # Keyword matches are weaker evidence than a model reading the text; cap confidence low.
+    filled = sum(1 for category in CATEGORY_PATTERNS if payload[category])
+    payload["confidence"] = round(0.1 * filled, 2) if filled else 0.0
+
+    insights = attach_evidence_spans(_normalize_payload(payload), section_records)
+    insights["source"] = "rules"
+    return insights
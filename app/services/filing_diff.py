@@ -0,0 +1,117 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.filing_parser import extract_sections_with_spans, filing_to_text
+from app.services.filing_store import open_section_views
+from app.utils.minhash import content_hash, minhash_signature
+
+
+NEAR_DUPLICATE_THRESHOLD = 0.5
+
+# Normalized filing text has no paragraph breaks left, so sentences are the diff unit.
+_UNIT_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"“(])")
+
+
+def split_units(text: str) -> List[Tuple[int, int]]:
+    spans = []
+    start = 0
+    for match in _UNIT_BOUNDARY.finditer(text):
+        if text[start : match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def diff_section(current_text: str, prior_text: str, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Dict:
+    """
+    Classifies each sentence unit of `current_text` as `unchanged` (same normalized hash),
+    `modified` (MinHash Jaccard >= threshold against a prior unit) or `new`.
+    Offsets are relative to `current_text`.
+    """
+    current_spans = split_units(current_text)
+    prior_spans = split_units(prior_text)
+    prior_texts = [prior_text[s:e] for s, e in prior_spans]
+    prior_hashes = {content_hash(t): idx for idx, t in enumerate(prior_texts)}
+    prior_signatures = np.array([minhash_signature(t) for t in prior_texts]) if prior_texts else None
+
+    units = []
+    matched_prior = set()
+    exact_prior = set()
+    replaced_prior = set()
+    for start, end in current_spans:
+        unit_text = current_text[start:end]
+        unit = {"start": start, "end": end, "status": "new", "similarity": 0.0}
+        exact = prior_hashes.get(content_hash(unit_text))
+        if exact is not None:
+            unit.update(status="unchanged", similarity=1.0)
+            matched_prior.add(exact)
+            exact_prior.add(exact)
+        elif prior_signatures is not None:
+            similarities = np.mean(prior_signatures == minhash_signature(unit_text), axis=1)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                unit.update(status="modified", similarity=float(similarities[best]))
+                matched_prior.add(best)
+                replaced_prior.add(best)
+        units.append(unit)
+
+    counts = {status: sum(1 for u in units if u["status"] == status) for status in ("new", "modified", "unchanged")}
+    removed = [prior_texts[idx] for idx in range(len(prior_texts)) if idx not in matched_prior]
+    # Prior wording of modified units: like removed units, insights drawn from it may be stale.
+    replaced = [prior_texts[idx] for idx in sorted(replaced_prior - exact_prior)]
+    changed_text = " ".join(current_text[u["start"] : u["end"]] for u in units if u["status"] != "unchanged")
+    return {"units": units, "counts": counts, "removed": removed, "replaced": replaced, "changed_text": changed_text}
+
+
+def diff_filings(current_records: Dict[str, Dict], prior_records: Dict[str, Dict]) -> Dict[str, Dict]:
+    diffs: Dict[str, Dict] = {}
+    for name, record in current_records.items():
+        prior_text = prior_records.get(name, {}).get("text", "")
+        diffs[name] = diff_section(record.get("text", ""), prior_text)
+    return diffs
+
+
+def summarize_changes(diffs: Dict[str, Dict], sample_limit: int = 5) -> Dict[str, Dict]:
+    """Compact "what changed" view per section for UI and reports."""
+    summary: Dict[str, Dict] = {}
+    for name, diff in diffs.items():
+        total = sum(diff["counts"].values())
+        new_samples = [diff_unit for diff_unit in diff["units"] if diff_unit["status"] == "new"][:sample_limit]
+        summary[name] = {
+            **diff["counts"],
+            "removed": len(diff["removed"]),
+            "changed_share": (total - diff["counts"]["unchanged"]) / total if total else 0.0,
+            "new_spans": [(u["start"], u["end"]) for u in new_samples],
+        }
+    return summary
+
+
+def find_prior_filing(sec_client, filing) -> Optional[object]:
+    for candidate in sec_client.get_filings(filing.cik_10, filing.form, limit=5):
+        if candidate.accession_number != filing.accession_number and candidate.filing_date < filing.filing_date:
+            return candidate
+    return None
+
+
+def fetch_prior_section_records(
+    sec_client, filing, artifact_cache=None, filing_text_dir: Optional[str] = None
+) -> Tuple[Optional[object], Dict[str, Dict]]:
+    prior = find_prior_filing(sec_client, filing)
+    if prior is None:
+        return None, {}
+
+    def _text() -> str:
+        return filing_to_text(sec_client.get_filing_text(prior.filing_url))
+
+    def _records() -> Dict[str, Dict]:
+        return extract_sections_with_spans(_text(), prior.form)
+
+    if filing_text_dir is not None:
+        return prior, open_section_views(prior.accession_number, prior.form, _text, output_dir=filing_text_dir)
+    if artifact_cache is None:
+        return prior, _records()
+    return prior, artifact_cache.get_or_compute(prior.accession_number, "sections", _records)
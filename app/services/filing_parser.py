@@ -1,8 +1,9 @@
 import re
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 from bs4 import BeautifulSoup
 
+from app.services.ixbrl_extractor import extract_ixbrl_financials
 from app.utils.text_clean import normalize_whitespace
 
 
@@ -21,19 +22,32 @@ SECTION_PATTERNS = {
 GENERIC_BOUNDARY = re.compile(r"\b(?:part\s+[ivx]+[\s,.-]*)?item\s+\d+[a-z]?\b", re.IGNORECASE)
 
 
-def filing_to_text(raw_filing: str) -> str:
-    """Converts filing body to normalized plain text."""
-    soup = BeautifulSoup(raw_filing, "lxml")
+def _soup_to_text(soup: BeautifulSoup, raw_filing: str) -> str:
     text = soup.get_text(" ", strip=True)
     if not text:
         text = raw_filing
     return normalize_whitespace(text)
 
 
-def extract_sections_with_spans(text: str, form_type: str) -> Dict[str, Dict]:
+def filing_to_text(raw_filing: str) -> str:
+    """Converts filing body to normalized plain text."""
+    return _soup_to_text(BeautifulSoup(raw_filing, "lxml"), raw_filing)
+
+
+def parse_filing(raw_filing: str, form_type: str) -> Tuple[str, Dict[str, Optional[float]]]:
     """
-    Extracts key form sections by heading starts and next item boundary.
-    Returns a map of section_name -> extracted text.
+    Single parse pass over the filing document: normalized text plus `CONCEPT_MAP` financials
+    from embedded inline XBRL (all None when the document is not inline XBRL).
+    """
+    soup = BeautifulSoup(raw_filing, "lxml")
+    financials = extract_ixbrl_financials(soup, form_type)
+    return _soup_to_text(soup, raw_filing), financials
+
+
+def extract_section_spans(text: str, form_type: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Locates key form sections by heading starts and next item boundary.
+    Returns a map of section_name -> (start, end) offsets into the normalized text.
     """
     normalized = normalize_whitespace(text)
     patterns = SECTION_PATTERNS.get(form_type.upper(), {})
@@ -50,7 +64,7 @@ def extract_sections_with_spans(text: str, form_type: str) -> Dict[str, Dict]:
         return {}
 
     boundaries = sorted({m.start() for m in GENERIC_BOUNDARY.finditer(normalized)} | {len(normalized)})
-    extracted: Dict[str, Dict] = {}
+    spans: Dict[str, Tuple[int, int]] = {}
 
     for section_name, start in sorted(target_positions.items(), key=lambda item: item[1]):
         end = len(normalized)
@@ -58,11 +72,22 @@ def extract_sections_with_spans(text: str, form_type: str) -> Dict[str, Dict]:
             if boundary > start:
                 end = boundary
                 break
-        section_text = normalize_whitespace(normalized[start:end])
-        if len(section_text) >= 20:
-            extracted[section_name] = {"text": section_text, "start": start, "end": end}
+        if len(normalized[start:end].strip()) >= 20:
+            spans[section_name] = (start, end)
+
+    return spans
+
 
-    return extracted
+def extract_sections_with_spans(text: str, form_type: str) -> Dict[str, Dict]:
+    """
+    Extracts key form sections by heading starts and next item boundary.
+    Returns a map of section_name -> {"text", "start", "end"}.
+    """
+    normalized = normalize_whitespace(text)
+    return {
+        name: {"text": normalize_whitespace(normalized[start:end]), "start": start, "end": end}
+        for name, (start, end) in extract_section_spans(normalized, form_type).items()
+    }
 
 
 def extract_sections(text: str, form_type: str) -> Dict[str, str]:
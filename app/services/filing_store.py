@@ -0,0 +1,201 @@
+import json
+import mmap
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.config import settings
+from app.services.filing_parser import extract_section_spans
+from app.utils.atomic_write import atomic_write_bytes, atomic_write_text
+from app.utils.text_clean import normalize_whitespace
+
+
+CHECKPOINT_CHARS = 1024
+
+
+def _safe_stem(accession_number: str) -> str:
+    return "".join(ch for ch in accession_number if ch.isalnum() or ch in {"_", "-"})
+
+
+def ensure_filing_text_dir(output_dir: Optional[str] = None) -> Path:
+    out_dir = Path(output_dir or settings.filing_text_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir
+
+
+def persist_filing_text(accession_number: str, text: str, form_type: str, output_dir: Optional[str] = None) -> Path:
+    """
+    Writes normalized filing text once per accession as UTF-8 plus a JSON index holding
+    char->byte checkpoints (every `CHECKPOINT_CHARS` chars) and the section spans.
+    """
+    out_dir = ensure_filing_text_dir(output_dir)
+    normalized = normalize_whitespace(text)
+    data = normalized.encode("utf-8")
+
+    checkpoints: List[int] = [0]
+    byte_pos = 0
+    for idx in range(0, len(normalized), CHECKPOINT_CHARS):
+        byte_pos += len(normalized[idx : idx + CHECKPOINT_CHARS].encode("utf-8"))
+        checkpoints.append(byte_pos)
+
+    index = {
+        "accession_number": accession_number,
+        "form": form_type,
+        "chars": len(normalized),
+        "bytes": len(data),
+        "checkpoint_chars": CHECKPOINT_CHARS,
+        "checkpoints": checkpoints,
+        "sections": {name: list(span) for name, span in extract_section_spans(normalized, form_type).items()},
+    }
+    stem = _safe_stem(accession_number)
+    # The index is written last: its presence marks the text file as complete.
+    text_path = atomic_write_bytes(out_dir / f"{stem}.txt", data)
+    atomic_write_text(out_dir / f"{stem}.idx.json", json.dumps(index))
+    return text_path
+
+
+class SectionView(Mapping):
+    """
+    Section record backed by offsets into a mapped filing. Behaves like the
+    {"text", "start", "end"} dict, but text is decoded from the page cache on each access.
+    """
+
+    __slots__ = ("source", "start", "end")
+
+    def __init__(self, source: "MappedFilingText", start: int, end: int) -> None:
+        self.source = source
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self) -> str:
+        return self.source.slice(self.start, self.end).strip()
+
+    def __getitem__(self, key: str):
+        if key == "text":
+            return self.text
+        if key == "start":
+            return self.start
+        if key == "end":
+            return self.end
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("text", "start", "end"))
+
+    def __len__(self) -> int:
+        return 3
+
+    def slice(self, start: int = 0, end: Optional[int] = None) -> str:
+        """Text between offsets relative to the section start; only that range is decoded."""
+        stop = self.end if end is None else min(self.end, self.start + end)
+        return self.source.slice(self.start + start, stop).strip()
+
+    def to_dict(self) -> Dict:
+        return {"text": self.text, "start": self.start, "end": self.end}
+
+    def __reduce__(self):
+        return (SectionView, (self.source, self.start, self.end))
+
+
+def section_text(record: Mapping, start: int = 0, end: Optional[int] = None) -> str:
+    """Section text (or a sub-range of it) from an owned record dict or a `SectionView`."""
+    if isinstance(record, SectionView):
+        return record.slice(start, end)
+    return record.get("text", "")[start:end]
+
+
+class SectionTexts(Mapping):
+    """Read-only section_name -> text mapping over section records, decoded on access."""
+
+    def __init__(self, section_records: Mapping) -> None:
+        self._records = section_records
+
+    def __getitem__(self, name: str) -> str:
+        return self._records[name]["text"]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class MappedFilingText:
+    """Read-only memory map over a persisted filing; many processes share one page-cached copy."""
+
+    def __init__(self, accession_number: str, output_dir: Optional[str] = None) -> None:
+        self.accession_number = accession_number
+        self.output_dir = str(output_dir or settings.filing_text_dir)
+        out_dir = Path(self.output_dir)
+        stem = _safe_stem(accession_number)
+        self.index = json.loads((out_dir / f"{stem}.idx.json").read_text(encoding="utf-8"))
+        self._file = open(out_dir / f"{stem}.txt", "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.index["bytes"] else None
+        self._ascii = self.index["bytes"] == self.index["chars"]
+
+    def __len__(self) -> int:
+        return int(self.index["chars"])
+
+    def __enter__(self) -> "MappedFilingText":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __reduce__(self):
+        # Pickled across process-pool boundaries as (accession, dir): the receiver maps the same
+        # page-cached file instead of receiving a copy of the text.
+        return (MappedFilingText, (self.accession_number, self.output_dir))
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def char_to_byte(self, char_offset: int) -> int:
+        char_offset = max(0, min(int(char_offset), len(self)))
+        if self._ascii:
+            return char_offset
+        step = self.index["checkpoint_chars"]
+        checkpoint = char_offset // step
+        byte_start = self.index["checkpoints"][checkpoint]
+        remainder = char_offset - checkpoint * step
+        if not remainder:
+            return byte_start
+        # At most 4 bytes per char; the partial trailing char is dropped by `ignore`.
+        window = self._map[byte_start : byte_start + remainder * 4].decode("utf-8", errors="ignore")
+        return byte_start + len(window[:remainder].encode("utf-8"))
+
+    def view(self, start: int, end: int) -> memoryview:
+        if self._map is None:
+            return memoryview(b"")
+        return memoryview(self._map)[self.char_to_byte(start) : self.char_to_byte(end)]
+
+    def slice(self, start: int, end: int) -> str:
+        view = self.view(start, end)
+        try:
+            return str(view, "utf-8")
+        finally:
+            view.release()
+
+    def sections(self) -> Dict[str, SectionView]:
+        return {name: SectionView(self, start, end) for name, (start, end) in self.index["sections"].items()}
+
+
+def filing_text_exists(accession_number: str, output_dir: Optional[str] = None) -> bool:
+    out_dir = Path(output_dir or settings.filing_text_dir)
+    return (out_dir / f"{_safe_stem(accession_number)}.idx.json").exists()
+
+
+def open_section_views(
+    accession_number: str, form_type: str, load_text, output_dir: Optional[str] = None
+) -> Dict[str, SectionView]:
+    """
+    Section views over the persisted text of one filing; `load_text()` supplies the normalized
+    text (download + parse) only when this accession has not been persisted yet.
+    """
+    if not filing_text_exists(accession_number, output_dir=output_dir):
+        persist_filing_text(accession_number, load_text(), form_type, output_dir=output_dir)
+    return MappedFilingText(accession_number, output_dir=output_dir).sections()
@@ -0,0 +1,393 @@
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+from app.config import settings
+from app.models.compact import RatioQuality, RatioResult
+from app.services.ratio_engine import RatioPlan
+from app.services.universe_snapshot import INSTANT_METRICS
+from app.services.xbrl_mapper import CONCEPT_MAP
+from app.utils.logging import get_logger
+
+
+logger = get_logger()
+
+FORENSIC_YEARS = 5
+
+# `CONCEPT_MAP` plus the line items the forensic models need. Kept separate so the snapshot
+# ratios, concept plans and as-of store are not affected by these extra concepts.
+FORENSIC_CONCEPT_MAP: Dict[str, List[str]] = {
+    **CONCEPT_MAP,
+    "receivables": ["AccountsReceivableNetCurrent", "ReceivablesNetCurrent"],
+    "cost_of_revenue": ["CostOfRevenue", "CostOfGoodsAndServicesSold", "CostOfGoodsSold"],
+    "gross_profit": ["GrossProfit"],
+    "sga": ["SellingGeneralAndAdministrativeExpense"],
+    "depreciation": ["DepreciationDepletionAndAmortization", "DepreciationAndAmortization", "Depreciation"],
+    "ppe_net": ["PropertyPlantAndEquipmentNet"],
+    "cash_from_operations": ["NetCashProvidedByUsedInOperatingActivities"],
+    "retained_earnings": ["RetainedEarningsAccumulatedDeficit"],
+    "long_term_debt": ["LongTermDebtNoncurrent", "LongTermDebt"],
+    "current_debt": ["LongTermDebtCurrent", "DebtCurrent"],
+    "cash": ["CashAndCashEquivalentsAtCarryingValue"],
+    "shares_outstanding": ["CommonStockSharesOutstanding"],
+}
+FORENSIC_INSTANT_METRICS = INSTANT_METRICS | {
+    "receivables", "ppe_net", "retained_earnings", "long_term_debt", "current_debt", "cash", "shares_outstanding",
+}
+METRIC_UNITS = {"shares_outstanding": "shares"}
+
+# Component ratios over a company x fiscal-year panel; lag() is the prior year.
+COMPONENT_DEFINITIONS: Dict[str, Tuple[str, str]] = {
+    # Beneish (1999) eight-variable M-score indices.
+    "dsri": ("receivables / revenue", "lag(receivables) / lag(revenue)"),
+    "gmi": ("lag(gross_profit) / lag(revenue)", "gross_profit / revenue"),
+    "aqi": ("(assets - current_assets - ppe_net) / assets", "(lag(assets) - lag(current_assets) - lag(ppe_net)) / lag(assets)"),
+    "sgi": ("revenue", "lag(revenue)"),
+    "depi": ("lag(depreciation) / (lag(depreciation) + lag(ppe_net))", "depreciation / (depreciation + ppe_net)"),
+    "sgai": ("sga / revenue", "lag(sga) / lag(revenue)"),
+    "lvgi": ("(current_liabilities + long_term_debt) / assets", "(lag(current_liabilities) + lag(long_term_debt)) / lag(assets)"),
+    "tata": ("net_income - cash_from_operations", "assets"),
+    # Altman Z' inputs. Book equity stands in for market value, which XBRL does not carry.
+    "working_capital_to_assets": ("current_assets - current_liabilities", "assets"),
+    "retained_earnings_to_assets": ("retained_earnings", "assets"),
+    "ebit_to_assets": ("operating_income", "assets"),
+    "equity_to_liabilities": ("equity", "liabilities"),
+    "sales_to_assets": ("revenue", "assets"),
+    # Piotroski F-score inputs; the signals compare these with their prior-year values.
+    "roa": ("net_income", "lag(assets)"),
+    "cfo_to_assets": ("cash_from_operations", "lag(assets)"),
+    "leverage": ("long_term_debt", "avg(assets)"),
+    "current_ratio": ("current_assets", "current_liabilities"),
+    "share_change": ("shares_outstanding", "lag(shares_outstanding)"),
+    "gross_margin": ("gross_profit", "revenue"),
+    "asset_turnover": ("revenue", "lag(assets)"),
+    # Cash-flow accruals, and Sloan (1996) balance-sheet accruals.
+    "accruals_ratio": ("net_income - cash_from_operations", "avg(assets)"),
+    "sloan_accruals": (
+        "(current_assets - lag(current_assets)) - (cash - lag(cash)) - (current_liabilities - lag(current_liabilities))"
+        " + (current_debt - lag(current_debt)) - depreciation",
+        "avg(assets)",
+    ),
+}
+COMPONENT_KEYS: List[str] = list(COMPONENT_DEFINITIONS)
+COMPONENT_PLAN = RatioPlan(COMPONENT_KEYS, definitions=COMPONENT_DEFINITIONS, derived_metrics={})
+
+BENEISH_INTERCEPT = -4.84
+BENEISH_WEIGHTS = {"dsri": 0.920, "gmi": 0.528, "aqi": 0.404, "sgi": 0.892, "depi": 0.115, "sgai": -0.172, "tata": 4.679, "lvgi": -0.327}
+ALTMAN_WEIGHTS = {
+    "working_capital_to_assets": 0.717,
+    "retained_earnings_to_assets": 0.847,
+    "ebit_to_assets": 3.107,
+    "equity_to_liabilities": 0.420,
+    "sales_to_assets": 0.998,
+}
+PIOTROSKI_SIGNALS = [
+    "roa_positive",
+    "cfo_positive",
+    "roa_improved",
+    "cfo_exceeds_roa",
+    "leverage_fell",
+    "current_ratio_rose",
+    "no_dilution",
+    "gross_margin_rose",
+    "asset_turnover_rose",
+]
+SCORE_KEYS: List[str] = ["beneish_m", "altman_z", "piotroski_f", "accruals_ratio", "sloan_accruals"]
+
+BENEISH_THRESHOLD = -1.78
+ALTMAN_DISTRESS, ALTMAN_SAFE = 1.23, 2.90
+HIGH_ACCRUALS = 0.10
+
+
+def _instant_frame(period_end: str) -> str:
+    """Calendar instant frame SEC assigns to a balance-sheet date: the nearest quarter end (e.g. CY2023Q3I)."""
+    end = date.fromisoformat(period_end)
+    quarter_ends = [date(end.year - 1, 12, 31)] + [date(end.year, month, day) for month, day in ((3, 31), (6, 30), (9, 30), (12, 31))]
+    nearest = min(quarter_ends, key=lambda quarter_end: abs((quarter_end - end).days))
+    return f"CY{nearest.year}Q{nearest.month // 3}I"
+
+
+def _frame(metric: str, year: int, fiscal_year_end: Optional[str] = None) -> str:
+    """
+    Duration metrics use the annual frame (`CY2023`, the fiscal year SEC maps to that calendar
+    year). Instants use the frame at that fiscal year's end, so a September filer's balance sheet
+    is read from `CY2023Q3I` rather than the December 10-Q; without a known end, `CY{year}Q4I`.
+    """
+    if metric not in FORENSIC_INSTANT_METRICS:
+        return f"CY{int(year)}"
+    return _instant_frame(fiscal_year_end) if fiscal_year_end else f"CY{int(year)}Q4I"
+
+
+def _fill_missing(metrics: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Gross profit from revenue less cost of revenue; no reported debt is zero debt when liabilities are known."""
+    filled = dict(metrics)
+    filled["gross_profit"] = np.where(
+        np.isnan(metrics["gross_profit"]), metrics["revenue"] - metrics["cost_of_revenue"], metrics["gross_profit"]
+    )
+    for debt, total in (("current_debt", "current_liabilities"), ("long_term_debt", "liabilities")):
+        filled[debt] = np.where(np.isnan(metrics[debt]) & ~np.isnan(metrics[total]), 0.0, metrics[debt])
+    return filled
+
+
+def panel_from_company_facts(company_facts: Dict, years: Optional[Sequence[int]] = None) -> Tuple[List[int], Dict[str, np.ndarray]]:
+    """
+    One company's (1, years) panel from companyfacts, using the points SEC aligned to calendar
+    frames (`CY2023`, `CY2023Q3I`) so it lines up with `build_universe_panel`. By default the
+    last `FORENSIC_YEARS` years that have an assets value.
+    """
+    us_gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    by_frame: Dict[str, Dict[str, float]] = {}
+    fiscal_year_ends: Dict[int, str] = {}
+    for metric, concepts in FORENSIC_CONCEPT_MAP.items():
+        values: Dict[str, float] = {}
+        for concept in concepts:
+            for point in us_gaap.get(concept, {}).get("units", {}).get(METRIC_UNITS.get(metric, "USD"), []):
+                frame = point.get("frame")
+                if not frame or frame in values:
+                    continue
+                try:
+                    values[frame] = float(point.get("val"))
+                except (TypeError, ValueError):
+                    continue
+                if metric not in FORENSIC_INSTANT_METRICS and len(frame) == 6 and point.get("end"):
+                    fiscal_year_ends.setdefault(int(frame[2:]), str(point["end"]))
+        by_frame[metric] = values
+
+    if years is None:
+        candidates = set(fiscal_year_ends) | {int(frame[2:6]) for frame in by_frame["assets"] if frame.endswith("Q4I")}
+        asset_years = [year for year in sorted(candidates) if _frame("assets", year, fiscal_year_ends.get(year)) in by_frame["assets"]]
+        years = asset_years[-FORENSIC_YEARS:]
+    years = [int(year) for year in years]
+    metrics = {
+        metric: np.array(
+            [[by_frame[metric].get(_frame(metric, year, fiscal_year_ends.get(year)), np.nan) for year in years]],
+            dtype=np.float64,
+        )
+        for metric in FORENSIC_CONCEPT_MAP
+    }
+    return years, metrics
+
+
+def build_universe_panel(sec_client, years: Sequence[int]) -> Tuple[np.ndarray, List[int], Dict[str, np.ndarray]]:
+    """
+    (ciks, years, {metric: (companies, years)}) for every filer from SEC frames. Annual duration
+    frames are fetched first; their period ends pick each company's instant frame, so instant
+    metrics fetch only the quarter frames some company's fiscal year ends in. Fallback concepts
+    only fill cells the earlier concepts left empty.
+    """
+    years = [int(year) for year in years]
+    duration_metrics = [metric for metric in FORENSIC_CONCEPT_MAP if metric not in FORENSIC_INSTANT_METRICS]
+    instant_metrics = [metric for metric in FORENSIC_CONCEPT_MAP if metric in FORENSIC_INSTANT_METRICS]
+    fiscal_year_ends: Dict[int, Dict[int, str]] = {year: {} for year in years}
+
+    def fetch(metric: str, frame_name: str) -> List[Tuple[np.ndarray, np.ndarray, List[Dict]]]:
+        parts = []
+        for concept in FORENSIC_CONCEPT_MAP[metric]:
+            try:
+                frame = sec_client.get_frame(concept, frame_name, unit=METRIC_UNITS.get(metric, "USD"))
+            except (requests.RequestException, ValueError) as exc:
+                logger.warning("Frame %s/%s unavailable: %s", concept, frame_name, exc)
+                continue
+            data = frame.get("data", [])
+            ciks = np.fromiter((int(point.get("cik", 0)) for point in data), dtype=np.int64, count=len(data))
+            values = np.fromiter((float(point.get("val", np.nan)) for point in data), dtype=np.float64, count=len(data))
+            parts.append((ciks, values, data))
+        return parts
+
+    durations = {(metric, year): fetch(metric, _frame(metric, year)) for metric in duration_metrics for year in years}
+    for (_, year), parts in durations.items():
+        for _, _, data in parts:
+            for point in data:
+                if point.get("end"):
+                    fiscal_year_ends[year].setdefault(int(point.get("cik", 0)), str(point["end"]))
+
+    instant_frames = {
+        year: {_instant_frame(end) for end in fiscal_year_ends[year].values()} | {f"CY{year}Q4I"} for year in years
+    }
+    instants = {
+        (metric, frame_name): fetch(metric, frame_name)
+        for metric in instant_metrics
+        for frame_name in sorted(set().union(*instant_frames.values()))
+    }
+
+    all_ciks = [ciks for parts in (*durations.values(), *instants.values()) for ciks, _, _ in parts]
+    universe = np.unique(np.concatenate(all_ciks)) if all_ciks else np.empty(0, dtype=np.int64)
+    metrics = {metric: np.full((len(universe), len(years)), np.nan) for metric in FORENSIC_CONCEPT_MAP}
+
+    def fill(column: np.ndarray, parts, allowed: Optional[np.ndarray] = None) -> None:
+        for ciks, values, _ in parts:
+            rows = np.searchsorted(universe, ciks)
+            keep = np.isnan(column[rows]) if allowed is None else np.isnan(column[rows]) & allowed[rows]
+            column[rows[keep]] = values[keep]
+
+    for (metric, year), parts in durations.items():
+        fill(metrics[metric][:, years.index(year)], parts)
+    for idx, year in enumerate(years):
+        # Each company's instant frame for the year: its fiscal year end's quarter, else Q4.
+        row_frames = np.array([f"CY{year}Q4I"] * len(universe), dtype=object)
+        for cik, end in fiscal_year_ends[year].items():
+            row_frames[np.searchsorted(universe, cik)] = _instant_frame(end)
+        for frame_name in instant_frames[year]:
+            allowed = row_frames == frame_name
+            for metric in instant_metrics:
+                fill(metrics[metric][:, idx], instants[(metric, frame_name)], allowed)
+    return universe, years, metrics
+
+
+def save_panel(ciks: np.ndarray, years: Sequence[int], metrics: Dict[str, np.ndarray], path: Optional[str] = None) -> Path:
+    out_path = Path(path or settings.forensic_panel_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("wb") as handle:
+        np.savez(handle, ciks=ciks, years=np.asarray(years, dtype=np.int32), **metrics)
+    return out_path
+
+
+def load_panel(path: Optional[str] = None) -> Tuple[np.ndarray, List[int], Dict[str, np.ndarray]]:
+    with np.load(Path(path or settings.forensic_panel_path)) as payload:
+        missing = set(FORENSIC_CONCEPT_MAP) - set(payload.files)
+        if missing:
+            raise ValueError(f"Forensic panel is missing metrics {sorted(missing)}; rebuild it")
+        return payload["ciks"], [int(year) for year in payload["years"]], {metric: payload[metric] for metric in FORENSIC_CONCEPT_MAP}
+
+
+def _lag_quality(quality: np.ndarray) -> np.ndarray:
+    lagged = np.full_like(quality, int(RatioQuality.MISSING_DATA))
+    lagged[:, 1:] = quality[:, :-1]
+    return lagged
+
+
+def _combine_quality(qualities: Sequence[np.ndarray]) -> np.ndarray:
+    """MISSING_DATA if any input is missing, else UNSTABLE_DENOMINATOR if any is unstable, else OK."""
+    stacked = np.stack(qualities, axis=-1)
+    combined = np.where((stacked == RatioQuality.UNSTABLE_DENOMINATOR).any(axis=-1), int(RatioQuality.UNSTABLE_DENOMINATOR), 0)
+    combined[(stacked == RatioQuality.MISSING_DATA).any(axis=-1)] = int(RatioQuality.MISSING_DATA)
+    return combined.astype(np.uint8)
+
+
+def score_signal(score_key: str, value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    if score_key == "beneish_m":
+        return "likely manipulator" if value > BENEISH_THRESHOLD else "unlikely manipulator"
+    if score_key == "altman_z":
+        return "distress zone" if value < ALTMAN_DISTRESS else "safe zone" if value > ALTMAN_SAFE else "grey zone"
+    if score_key == "piotroski_f":
+        return "strong" if value >= 8 else "weak" if value <= 2 else "average"
+    return "high accruals" if value > HIGH_ACCRUALS else None
+
+
+class ForensicScores:
+    """
+    Forensic scores over a company x fiscal-year panel: (companies, years, scores) value and
+    `RatioQuality` arrays, plus the component ratios (and Piotroski signals) with their own
+    quality so a missing line item can be traced to the part of the score it broke.
+    """
+
+    __slots__ = ("ciks", "years", "values", "quality", "component_values", "component_quality", "signal_values", "signal_quality")
+
+    def __init__(self, ciks, years, values, quality, component_values, component_quality, signal_values, signal_quality) -> None:
+        self.ciks = np.asarray(ciks, dtype=np.int64)
+        self.years = list(years)
+        self.values = values
+        self.quality = quality
+        self.component_values = component_values
+        self.component_quality = component_quality
+        self.signal_values = signal_values
+        self.signal_quality = signal_quality
+
+    def __len__(self) -> int:
+        return int(self.ciks.shape[0])
+
+    def latest_period(self, row: int) -> int:
+        """Last year with at least one usable score, else the last year."""
+        usable = np.flatnonzero((self.quality[row] == RatioQuality.OK).any(axis=-1))
+        return int(usable[-1]) if usable.size else len(self.years) - 1
+
+    def score_map(self, row: int, period: Optional[int] = None) -> Dict:
+        period = self.latest_period(row) if period is None else period
+
+        def result(value: float, quality: int) -> Dict:
+            return RatioResult(None if np.isnan(value) else float(value), RatioQuality(int(quality))).to_dict()
+
+        scores = {}
+        for idx, key in enumerate(SCORE_KEYS):
+            payload = result(self.values[row, period, idx], self.quality[row, period, idx])
+            payload["signal"] = score_signal(key, payload["value"])
+            scores[key] = payload
+        return {
+            "fiscal_year": self.years[period] if self.years else None,
+            "scores": scores,
+            "components": {
+                key: result(self.component_values[row, period, idx], self.component_quality[row, period, idx])
+                for idx, key in enumerate(COMPONENT_KEYS)
+            },
+            "piotroski_signals": {
+                key: result(self.signal_values[row, period, idx], self.signal_quality[row, period, idx])
+                for idx, key in enumerate(PIOTROSKI_SIGNALS)
+            },
+        }
+
+
+def compute_forensic_scores(ciks: Sequence[int], years: Sequence[int], metrics: Dict[str, np.ndarray]) -> ForensicScores:
+    """Scores every company and year in one vectorized pass over (companies, years) metric arrays."""
+    metrics = {name: np.asarray(metrics.get(name, np.nan), dtype=np.float64) for name in FORENSIC_CONCEPT_MAP}
+    shape = np.broadcast_shapes(*(array.shape for array in metrics.values()))
+    if len(shape) != 2:
+        raise ValueError("metric arrays must be (companies, years)")
+    metrics = {name: np.broadcast_to(array, shape) for name, array in metrics.items()}
+    comp_values, comp_quality = COMPONENT_PLAN.evaluate(_fill_missing(metrics))
+    col = {key: idx for idx, key in enumerate(COMPONENT_KEYS)}
+
+    def weighted(weights: Dict[str, float], intercept: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        idx = [col[key] for key in weights]
+        values = intercept + comp_values[..., idx] @ np.array(list(weights.values()))
+        return values, _combine_quality([comp_quality[..., i] for i in idx])
+
+    # Piotroski: nine binary signals from the components and their prior-year values.
+    def lagged(key: str) -> Tuple[np.ndarray, np.ndarray]:
+        values = np.full(shape, np.nan)
+        values[:, 1:] = comp_values[:, :-1, col[key]]
+        return values, _lag_quality(comp_quality[..., col[key]])
+
+    def current(key: str) -> Tuple[np.ndarray, np.ndarray]:
+        return comp_values[..., col[key]], comp_quality[..., col[key]]
+
+    signal_inputs = [
+        ([current("roa")], lambda roa: roa > 0),
+        ([current("cfo_to_assets")], lambda cfo: cfo > 0),
+        ([current("roa"), lagged("roa")], lambda now, before: now > before),
+        ([current("cfo_to_assets"), current("roa")], lambda cfo, roa: cfo > roa),
+        ([current("leverage"), lagged("leverage")], lambda now, before: now < before),
+        ([current("current_ratio"), lagged("current_ratio")], lambda now, before: now > before),
+        ([current("share_change")], lambda change: change <= 1.0),
+        ([current("gross_margin"), lagged("gross_margin")], lambda now, before: now > before),
+        ([current("asset_turnover"), lagged("asset_turnover")], lambda now, before: now > before),
+    ]
+    signal_values = np.empty(shape + (len(PIOTROSKI_SIGNALS),))
+    signal_quality = np.empty(shape + (len(PIOTROSKI_SIGNALS),), dtype=np.uint8)
+    with np.errstate(invalid="ignore"):
+        for idx, (inputs, test) in enumerate(signal_inputs):
+            signal_quality[..., idx] = _combine_quality([quality for _, quality in inputs])
+            signal_values[..., idx] = np.where(signal_quality[..., idx] == RatioQuality.OK, test(*[v for v, _ in inputs]), np.nan)
+
+    values = np.empty(shape + (len(SCORE_KEYS),))
+    quality = np.empty(shape + (len(SCORE_KEYS),), dtype=np.uint8)
+    values[..., 0], quality[..., 0] = weighted(BENEISH_WEIGHTS, BENEISH_INTERCEPT)
+    values[..., 1], quality[..., 1] = weighted(ALTMAN_WEIGHTS)
+    values[..., 2] = signal_values.sum(axis=-1)
+    quality[..., 2] = _combine_quality([signal_quality[..., idx] for idx in range(len(PIOTROSKI_SIGNALS))])
+    values[..., 3], quality[..., 3] = current("accruals_ratio")
+    values[..., 4], quality[..., 4] = current("sloan_accruals")
+    np.copyto(values, np.nan, where=quality != RatioQuality.OK)
+    return ForensicScores(ciks, years, values, quality, comp_values, comp_quality, signal_values, signal_quality)
+
+
+def forensic_scores_from_company_facts(company_facts: Dict) -> Optional[Dict]:
+    """Latest-year score map for one company, or None when companyfacts has no annual history."""
+    years, metrics = panel_from_company_facts(company_facts)
+    if not years:
+        return None
+    return compute_forensic_scores([int(company_facts.get("cik", 0))], years, metrics).score_map(0)
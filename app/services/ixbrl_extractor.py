@@ -0,0 +1,132 @@
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from app.services.xbrl_mapper import CONCEPT_MAP
+
+
+_NUMBER_CHARS = re.compile(r"[^0-9.,]")
+_ZERO_FORMATS = ("fixed-zero", "zerodash", "numdotdecimal-zero")
+
+
+def _parse_contexts(soup: BeautifulSoup) -> Dict[str, Dict]:
+    contexts: Dict[str, Dict] = {}
+    for context in soup.find_all("xbrli:context"):
+        context_id = context.get("id")
+        if not context_id:
+            continue
+        instant = context.find("xbrli:instant")
+        start = context.find("xbrli:startdate")
+        end = context.find("xbrli:enddate")
+        contexts[context_id] = {
+            "start": start.get_text(strip=True) if start else None,
+            "end": (instant or end).get_text(strip=True) if (instant or end) else None,
+            "instant": instant is not None,
+            # Dimensional contexts (segments) are breakdowns, not the consolidated value.
+            "dimensional": context.find("xbrli:segment") is not None,
+        }
+    return contexts
+
+
+def _parse_units(soup: BeautifulSoup) -> Dict[str, str]:
+    units: Dict[str, str] = {}
+    for unit in soup.find_all("xbrli:unit"):
+        measures = [m.get_text(strip=True) for m in unit.find_all("xbrli:measure")]
+        if unit.get("id") and len(measures) == 1:
+            units[unit["id"]] = measures[0].split(":")[-1].upper()
+    return units
+
+
+def _parse_number(raw_text: str, number_format: str) -> Optional[float]:
+    number_format = number_format.lower()
+    if any(token in number_format for token in _ZERO_FORMATS):
+        return 0.0
+    cleaned = _NUMBER_CHARS.sub("", raw_text)
+    if "comma-decimal" in number_format or "numcommadecimal" in number_format:
+        cleaned = cleaned.replace(".", "").replace(",", ".")
+    else:
+        cleaned = cleaned.replace(",", "")
+    if not cleaned or cleaned in {".", "-"}:
+        return 0.0 if raw_text.strip() in {"-", "—", "–"} else None
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def extract_ixbrl_facts(soup: BeautifulSoup) -> List[Dict]:
+    """Numeric inline XBRL facts with context period, unit, scale and sign resolved."""
+    contexts = _parse_contexts(soup)
+    units = _parse_units(soup)
+    facts: List[Dict] = []
+    for tag in soup.find_all("ix:nonfraction"):
+        context = contexts.get(tag.get("contextref", ""))
+        if context is None:
+            continue
+        value = _parse_number(tag.get_text(" ", strip=True), tag.get("format", ""))
+        if value is None:
+            continue
+        value *= 10 ** int(tag.get("scale", "0") or 0)
+        if tag.get("sign") == "-":
+            value = -value
+        facts.append(
+            {
+                "concept": tag.get("name", ""),
+                "value": value,
+                "unit": units.get(tag.get("unitref", ""), ""),
+                **context,
+            }
+        )
+    return facts
+
+
+def _document_period_end(soup: BeautifulSoup) -> Optional[str]:
+    tag = soup.find("ix:nonnumeric", attrs={"name": "dei:DocumentPeriodEndDate"})
+    if not tag:
+        return None
+    raw = " ".join(tag.get_text(" ", strip=True).replace(",", ", ").split())
+    for pattern in ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%d %B %Y"):
+        try:
+            return datetime.strptime(raw, pattern).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _duration_days(fact: Dict) -> int:
+    try:
+        return (date.fromisoformat(fact["end"]) - date.fromisoformat(fact["start"])).days
+    except (TypeError, ValueError):
+        return 0
+
+
+def ixbrl_financials(facts: List[Dict], form_type: str, period_end: Optional[str] = None) -> Dict[str, Optional[float]]:
+    """
+    Maps inline facts onto `CONCEPT_MAP` for the filing's own period: consolidated (non-dimensional)
+    USD facts ending on the report period end, preferring the annual duration for 10-K and the
+    quarterly duration for 10-Q. Concept fallback order matches `extract_latest_financials`.
+    """
+    usd_facts = [f for f in facts if f["unit"] == "USD" and not f["dimensional"] and f["end"]]
+    if not usd_facts:
+        return {metric: None for metric in CONCEPT_MAP}
+    period_end = period_end or max(f["end"] for f in usd_facts)
+    prefer_longest = form_type.upper().startswith("10-K")
+
+    result: Dict[str, Optional[float]] = {}
+    for metric, concepts in CONCEPT_MAP.items():
+        value: Optional[float] = None
+        for concept in concepts:
+            candidates = [f for f in usd_facts if f["concept"] == f"us-gaap:{concept}" and f["end"] == period_end]
+            if not candidates:
+                continue
+            candidates.sort(key=_duration_days, reverse=prefer_longest)
+            value = candidates[0]["value"]
+            break
+        result[metric] = value
+    return result
+
+
+def extract_ixbrl_financials(soup: BeautifulSoup, form_type: str) -> Dict[str, Optional[float]]:
+    return ixbrl_financials(extract_ixbrl_facts(soup), form_type, period_end=_document_period_end(soup))
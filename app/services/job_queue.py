@@ -0,0 +1,500 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.analyzer_pipeline import run_deterministic_analysis
+from app.services.artifact_cache import ArtifactCache
+from app.services.boilerplate_index import BoilerplateIndex
+from app.services.concept_plan import ConceptPlanStore
+from app.services.fast_insights import extract_fast_insights
+from app.services.filing_diff import diff_filings, fetch_prior_section_records, summarize_changes
+from app.services.forensic_scores import forensic_scores_from_company_facts
+from app.services.llm_backends import LLMBackend
+from app.services.llm_engine import FilingInsightEngine
+from app.services.llm_scheduler import PRIORITY_INTERACTIVE, LLMScheduler, get_llm_scheduler
+from app.services.peer_engine import PeerBenchmarkEngine, compare_company_to_peer
+from app.services.peer_index import PeerIndex
+from app.services.peer_sketch import PeerSketchStore
+from app.services.sec_client import RateLimiter, SECClient
+from app.services.universe_snapshot import load_universe_snapshot
+from app.utils.logging import get_logger
+
+
+logger = get_logger()
+
+JOB_ACTIVE_STATUSES = {"queued", "running"}
+
+# These stages run on the coordinator thread: LLM stages so all jobs in this process share one
+# LLM scheduler (priorities, dedup, cancellation), and millisecond rule-based extraction
+# because a process hop would cost more than the work.
+IN_PROCESS_STAGES = {"insights", "fast_insights"}
+
+
+def llm_deadline_at(priority: int, start: Optional[float] = None) -> float:
+    """Wall-clock time by which a job of this priority wants its LLM results."""
+    budget = settings.llm_interactive_deadline_seconds if priority == PRIORITY_INTERACTIVE else settings.llm_batch_deadline_seconds
+    return (time.time() if start is None else start) + budget
+
+
+# Set by shard workers so every stage on the node draws from the node's share of the SEC budget.
+_node_rate_limiter: Optional[RateLimiter] = None
+# Set in worker processes (pool initializer) to point stages at an EDGAR stand-in.
+_sec_base_url: Optional[str] = None
+
+
+def use_node_sec_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    global _node_rate_limiter
+    _node_rate_limiter = limiter
+
+
+def use_sec_base_url(base_url: Optional[str]) -> None:
+    global _sec_base_url
+    _sec_base_url = base_url
+
+
+def _worker_sec_client():
+    client = SECClient(www_base_url=_sec_base_url, data_base_url=_sec_base_url)
+    if _node_rate_limiter is not None:
+        client.rate_limiter = _node_rate_limiter
+    else:
+        # Each worker process has its own limiter, so split the configured budget across the pool.
+        client.rate_limiter = RateLimiter(settings.sec_rate_limit_per_sec / max(1, settings.job_max_workers))
+    return client
+
+
+def deterministic_stage(request: Dict, results: Dict) -> Dict:
+    return run_deterministic_analysis(
+        _worker_sec_client(),
+        ticker=request["ticker"],
+        preferred_form=request["preferred_form"],
+        artifact_cache=ArtifactCache(),
+        concept_plans=ConceptPlanStore(),
+        profile=bool(request.get("profile")),
+        filing_text_dir=settings.filing_text_dir,
+    )
+
+
+def changes_stage(request: Dict, results: Dict) -> Optional[Dict]:
+    analysis = results["analysis"]
+    client = _worker_sec_client()
+    prior, prior_records = fetch_prior_section_records(
+        client, analysis["filing"], artifact_cache=ArtifactCache(), filing_text_dir=settings.filing_text_dir
+    )
+    if prior is None:
+        return None
+    diffs = diff_filings(analysis["section_records"], prior_records)
+    return {
+        "prior_accession_number": prior.accession_number,
+        "prior_filing_date": str(prior.filing_date),
+        "diffs": diffs,
+        "summary": summarize_changes(diffs),
+    }
+
+
+def fast_insight_stage(request: Dict, results: Dict) -> Optional[Dict]:
+    section_records = results["analysis"]["section_records"]
+    return extract_fast_insights(section_records) if section_records else None
+
+
+def _section_insight_key(accession_number: str, section_name: str, model: str) -> str:
+    return f"{accession_number}:{section_name}:{model}"
+
+
+def insight_stage(request: Dict, results: Dict) -> Optional[Dict]:
+    analysis = results["analysis"]
+    if not analysis["section_records"]:
+        return None
+    engine = FilingInsightEngine(
+        scheduler=request.get("llm_scheduler"),
+        priority=request.get("llm_priority", PRIORITY_INTERACTIVE),
+        owner=request.get("job_id"),
+        backend=request.get("llm_backend"),
+        deadline_at=request.get("llm_deadline_at"),
+    )
+    cache = ArtifactCache()
+    accession_number = analysis["filing"].accession_number
+    changes = results.get("changes")
+
+    prior_section_insights: Dict[str, Dict] = {}
+    if changes:
+        for section_name in analysis["section_records"]:
+            key = _section_insight_key(changes["prior_accession_number"], section_name, engine.model)
+            prior = cache.get(key, "section_insights")
+            if prior is not None:
+                prior_section_insights[section_name] = prior
+
+    if prior_section_insights or not settings.llm_skip_boilerplate:
+        insights, section_insights = engine.extract_incremental(
+            form_type=analysis["filing"].form,
+            section_records=analysis["section_records"],
+            section_diffs=changes["diffs"] if changes else {},
+            prior_section_insights=prior_section_insights,
+        )
+    else:
+        # No prior insight to diff against: send only company-specific sentences and reuse the
+        # corpus-wide insight for boilerplate clusters.
+        boilerplate_index = BoilerplateIndex()
+        boilerplate_index.record_filing(analysis["identity"].cik_int, accession_number, analysis["section_records"])
+        insights, section_insights = engine.extract_without_boilerplate(
+            analysis["filing"].form, analysis["section_records"], boilerplate_index
+        )
+        boilerplate_index.publish_cluster_insights()
+    for section_name, section_insight in section_insights.items():
+        cache.put(_section_insight_key(accession_number, section_name, engine.model), "section_insights", section_insight)
+    return insights
+
+
+def forensic_stage(request: Dict, results: Dict) -> Optional[Dict]:
+    identity = results["analysis"]["identity"]
+    return forensic_scores_from_company_facts(_worker_sec_client().get_company_facts(identity.cik_10))
+
+
+def peer_stage(request: Dict, results: Dict) -> Dict:
+    analysis = results["analysis"]
+    identity = analysis["identity"]
+    client = _worker_sec_client()
+    # Built by scripts/universe_snapshot.py; None until the first refresh.
+    snapshot = load_universe_snapshot()
+    target_sic = (snapshot or {}).get("sic_by_cik", {}).get(identity.cik_int) or str(
+        client.get_submissions(identity.cik_10).get("sic", "")
+    )
+    if not target_sic:
+        return {"target_sic": "", "peer_count_found": 0, "peer_count_used": 0, "peer_comparison": None}
+
+    peer_index = PeerIndex()
+    sketch_store = PeerSketchStore()
+    peer_engine = PeerBenchmarkEngine(
+        client,
+        sketch_store=sketch_store,
+        concept_plans=ConceptPlanStore(),
+        peer_index=peer_index,
+        universe_snapshot=snapshot,
+    )
+    max_peers = 8
+    peer_mode = "sic"
+    peer_distances: Optional[Dict[int, float]] = None
+    sketched = None
+    if request.get("peer_mode") != "nearest":
+        # Enough SIC peers already sketched: no submissions scan and no peer companyfacts.
+        sketched = peer_engine.benchmark_from_sketches(target_sic, min_companies=settings.peer_sketch_min_companies)
+    if sketched is not None:
+        peer_index.upsert(identity.cik_int, analysis["financials"], target_sic)
+        peer_index.save()
+        sketch_store.update_company(identity.cik_int, target_sic, analysis["ratios"])
+        sketch_store.save()
+        return {
+            "target_sic": target_sic,
+            "peer_mode": "sketch",
+            "peer_count_found": sketched["peer_count_used"],
+            "peer_count_used": sketched["peer_count_used"],
+            "peers": [],
+            "peer_comparison": compare_company_to_peer(analysis["ratios"], sketched["peer_medians"]),
+        }
+    # Nearest-neighbour search needs a populated index; SIC scans below keep filling it.
+    if request.get("peer_mode") == "nearest" and len(peer_index) > max_peers:
+        nearest = peer_engine.find_nearest_peers(
+            identity.cik_int, analysis["financials"], target_sic=target_sic, max_peers=max_peers
+        )
+        peers = [peer for peer, _ in nearest]
+        peer_distances = {peer.cik_int: distance for peer, distance in nearest}
+        peer_mode = "nearest"
+    else:
+        peer_index.upsert(identity.cik_int, analysis["financials"], target_sic)
+        # Snapshot peers cost no SEC requests; the submissions scan is the fallback.
+        peers = peer_engine.find_snapshot_peers(
+            target_sic, identity.cik_int, analysis["financials"], max_peers=max_peers
+        ) or peer_engine.find_same_sic_peers(
+            target_sic=target_sic,
+            target_cik_int=identity.cik_int,
+            max_peers=max_peers,
+            max_scan=100,
+        )
+    # Every analysed company also feeds its own SIC group, so sketches fill up without peer fetches.
+    sketch_store.update_company(identity.cik_int, target_sic, analysis["ratios"])
+    benchmark = peer_engine.build_peer_benchmark(peers, target_sic=target_sic, peer_distances=peer_distances)
+    peer_medians = benchmark.get("peer_weighted_medians") or benchmark["peer_medians"]
+    return {
+        "target_sic": target_sic,
+        "peer_mode": peer_mode,
+        "peer_count_found": len(peers),
+        "peer_count_used": benchmark["peer_count_used"],
+        "peers": [
+            {"ticker": peer.ticker, "company_name": peer.company_name, "distance": (peer_distances or {}).get(peer.cik_int)}
+            for peer in peers
+        ],
+        "peer_comparison": compare_company_to_peer(analysis["ratios"], peer_medians),
+    }
+
+
+# (result key, stage function, request flag that enables it, required)
+DEFAULT_STAGES: List[Tuple[str, Callable, Optional[str], bool]] = [
+    ("analysis", deterministic_stage, None, True),
+    ("fast_insights", fast_insight_stage, None, False),
+    ("changes", changes_stage, "run_diff", False),
+    ("insights", insight_stage, "run_ai", False),
+    ("forensic", forensic_stage, "run_forensic", False),
+    ("peer", peer_stage, "run_peer", False),
+]
+
+
+def make_job_key(ticker: str, preferred_form: str, options: Dict) -> Tuple:
+    return (ticker.upper().strip(), preferred_form.upper(), tuple(sorted(options.items())))
+
+
+class AnalysisJob:
+    def __init__(self, key: Tuple, request: Dict, stage_names: List[str]) -> None:
+        self.job_id = uuid.uuid4().hex
+        self.key = key
+        self.request = request
+        self.stage_names = stage_names
+        self.status = "queued"
+        self.current_stage: Optional[str] = None
+        self.completed_stages: List[str] = []
+        self.results: Dict = {}
+        self.errors: Dict[str, str] = {}
+        # The exception that failed the job, so callers can re-raise it with its type.
+        self.exception: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.llm_deadline_at = llm_deadline_at(request.get("llm_priority", PRIORITY_INTERACTIVE), self.submitted_at)
+        # Refreshed whenever a subscriber submits or polls; see `AnalysisJobQueue.abandon_after_seconds`.
+        self.last_seen_at = self.submitted_at
+        self.finished_at: Optional[float] = None
+        self.subscribers = 1
+        self.cancel_requested = False
+        self.done = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        if not self.stage_names:
+            return 1.0
+        return len(self.completed_stages) / len(self.stage_names)
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "current_stage": self.current_stage,
+            "completed_stages": list(self.completed_stages),
+            "progress": self.progress,
+            "results": dict(self.results),
+            "errors": dict(self.errors),
+            "subscribers": self.subscribers,
+        }
+
+
+class AnalysisJobQueue:
+    """
+    Runs analyses off the Streamlit script thread. Each stage executes on a process pool while a
+    small coordinator thread pool sequences stages and publishes partial results. Identical
+    requests collapse onto the in-flight (or recently finished) job instead of recomputing.
+    Finished jobs are kept for `result_ttl_seconds` and at most `max_finished_jobs` of them, oldest
+    first out, so a long-running process does not hold every result it ever produced.
+
+    Interactive subscribers poll (`submit`, `get`, `find`). An interactive job nobody has polled
+    for `abandon_after_seconds` (a closed browser tab) is cancelled like a released one, and its
+    queued LLM requests are dropped. Batch jobs are never abandoned.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        stages: Optional[List[Tuple[str, Callable, Optional[str], bool]]] = None,
+        result_ttl_seconds: Optional[int] = None,
+        llm_scheduler: Optional[LLMScheduler] = None,
+        llm_backend: Optional[LLMBackend] = None,
+        max_workers: Optional[int] = None,
+        max_finished_jobs: Optional[int] = None,
+        abandon_after_seconds: Optional[float] = None,
+    ) -> None:
+        self.llm_scheduler = llm_scheduler
+        self.llm_backend = llm_backend
+        max_workers = max_workers or settings.job_max_workers
+        self.executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+        self.stages = stages or DEFAULT_STAGES
+        self.result_ttl_seconds = (
+            settings.job_result_ttl_seconds if result_ttl_seconds is None else result_ttl_seconds
+        )
+        self._coordinator = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._lock = threading.Lock()
+        self._jobs_by_key: Dict[Tuple, AnalysisJob] = {}
+        self._jobs_by_id: Dict[str, AnalysisJob] = {}
+        self.max_finished_jobs = max_finished_jobs or settings.job_max_finished
+        self._finished: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self.abandon_after_seconds = (
+            settings.job_abandon_seconds if abandon_after_seconds is None else abandon_after_seconds
+        )
+        self._stopped = threading.Event()
+        if self.abandon_after_seconds > 0:
+            threading.Thread(target=self._reap, name="analysis-job-reaper", daemon=True).start()
+
+    def _is_reusable(self, job: AnalysisJob) -> bool:
+        if job.status in JOB_ACTIVE_STATUSES:
+            return True
+        if job.status != "done" or job.finished_at is None:
+            return False
+        return time.time() - job.finished_at <= self.result_ttl_seconds
+
+    def _evict_finished(self) -> List[str]:
+        # Called with the lock held; `_finished` is in finish order, so expired jobs are at the front.
+        cutoff = time.time() - self.result_ttl_seconds
+        evicted = []
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if len(self._finished) <= self.max_finished_jobs and job.finished_at >= cutoff:
+                break
+            del self._finished[job.job_id]
+            self._jobs_by_id.pop(job.job_id, None)
+            if self._jobs_by_key.get(job.key) is job:
+                del self._jobs_by_key[job.key]
+            if "insights" in job.stage_names:
+                # A failed insight stage can leave queued LLM requests behind.
+                evicted.append(job.job_id)
+        return evicted
+
+    def _cancel(self, job: AnalysisJob) -> None:
+        # Called with the lock held: remaining stages are skipped and new requests get a new job.
+        job.subscribers = 0
+        job.cancel_requested = True
+        if self._jobs_by_key.get(job.key) is job:
+            del self._jobs_by_key[job.key]
+
+    def _abandon_idle(self) -> List[str]:
+        # Called with the lock held.
+        cutoff = time.time() - self.abandon_after_seconds
+        abandoned = []
+        for job in self._jobs_by_id.values():
+            if (
+                job.status in JOB_ACTIVE_STATUSES
+                and not job.cancel_requested
+                and job.last_seen_at < cutoff
+                and job.request.get("llm_priority", PRIORITY_INTERACTIVE) == PRIORITY_INTERACTIVE
+            ):
+                logger.info("Cancelling analysis job %s: no subscriber polled for %.0fs", job.key, self.abandon_after_seconds)
+                self._cancel(job)
+                abandoned.append(job.job_id)
+        return abandoned
+
+    def _cancel_llm_work(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        scheduler = self.llm_scheduler or get_llm_scheduler()
+        for job_id in job_ids:
+            scheduler.cancel_owner(job_id)
+
+    def _reap(self) -> None:
+        while not self._stopped.wait(min(5.0, self.abandon_after_seconds / 2)):
+            with self._lock:
+                job_ids = self._evict_finished() + self._abandon_idle()
+            self._cancel_llm_work(job_ids)
+
+    def submit(self, ticker: str, preferred_form: str = "10-K", **options) -> AnalysisJob:
+        key = make_job_key(ticker, preferred_form, options)
+        with self._lock:
+            evicted = self._evict_finished()
+            job = self._jobs_by_key.get(key)
+            if job and self._is_reusable(job):
+                job.subscribers += 1
+                job.last_seen_at = time.time()
+            else:
+                request = {"ticker": key[0], "preferred_form": key[1], **options}
+                stage_names = [name for name, _, flag, _ in self.stages if flag is None or request.get(flag)]
+                job = AnalysisJob(key, request, stage_names)
+                self._jobs_by_key[key] = job
+                self._jobs_by_id[job.job_id] = job
+                self._coordinator.submit(self._run, job)
+        self._cancel_llm_work(evicted)
+        return job
+
+    def find(self, ticker: str, preferred_form: str = "10-K", **options) -> Optional[AnalysisJob]:
+        """The in-flight or reusable job for this request, without subscribing to it."""
+        key = make_job_key(ticker, preferred_form, options)
+        with self._lock:
+            evicted = self._evict_finished()
+            job = self._jobs_by_key.get(key)
+            if job and self._is_reusable(job):
+                job.last_seen_at = time.time()
+            else:
+                job = None
+        self._cancel_llm_work(evicted)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """Looks a job up by id; this counts as a poll that keeps an interactive job alive."""
+        with self._lock:
+            evicted = self._evict_finished()
+            job = self._jobs_by_id.get(job_id)
+            if job is not None:
+                job.last_seen_at = time.time()
+        self._cancel_llm_work(evicted)
+        return job
+
+    def release(self, job_id: str) -> None:
+        """
+        Drops one subscriber (e.g. a session that moved on to another request). When nobody is
+        left waiting on an active job, its remaining stages are skipped and its queued LLM
+        requests are cancelled.
+        """
+        with self._lock:
+            job = self._jobs_by_id.get(job_id)
+            if job is None or job.status not in JOB_ACTIVE_STATUSES:
+                return
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return
+            self._cancel(job)
+        self._cancel_llm_work([job.job_id])
+
+    def _run_stage(self, job: AnalysisJob, name: str, stage_fn: Callable):
+        stage_request = {**job.request, "job_id": job.job_id, "llm_deadline_at": job.llm_deadline_at}
+        if name in IN_PROCESS_STAGES:
+            # Never pickled, so in-process stages can share this queue's LLM scheduler and backend
+            # (None falls back to the process-wide ones).
+            stage_request.update(llm_scheduler=self.llm_scheduler, llm_backend=self.llm_backend)
+            return stage_fn(stage_request, dict(job.results))
+        return self.executor.submit(stage_fn, stage_request, dict(job.results)).result()
+
+    def _run(self, job: AnalysisJob) -> None:
+        job.status = "running"
+        try:
+            for name, stage_fn, _, required in self.stages:
+                if name not in job.stage_names:
+                    continue
+                if job.cancel_requested:
+                    break
+                job.current_stage = name
+                try:
+                    result = self._run_stage(job, name, stage_fn)
+                except CancelledError:
+                    job.cancel_requested = True
+                    break
+                except Exception as exc:  # noqa: BLE001
+                    if required:
+                        raise
+                    logger.warning("Optional stage %s failed for %s: %s", name, job.key, exc)
+                    job.errors[name] = str(exc)
+                    result = None
+                job.results[name] = result
+                job.completed_stages.append(name)
+            job.status = "cancelled" if job.cancel_requested else "done"
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Analysis job %s failed: %s", job.key, exc)
+            job.errors[job.current_stage or "job"] = str(exc)
+            job.exception = exc
+            job.status = "failed"
+        finally:
+            job.current_stage = None
+            with self._lock:
+                job.finished_at = time.time()
+                self._finished[job.job_id] = job
+                evicted = self._evict_finished()
+            job.done.set()
+            self._cancel_llm_work(evicted)
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._coordinator.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ollama import Client
+
+from app.config import settings
+
+
+Messages = List[Dict[str, str]]
+
+
+class LLMBackend(ABC):
+    """
+    Chat-completion backend used by `FilingInsightEngine`. `generate_many` takes several message
+    lists and returns one result per list: {"content", "prompt_tokens", "completion_tokens"}.
+    `batch_size` is how many prompts the engine hands over per call, and `parallel` says whether
+    the backend generates them concurrently or one after another.
+    """
+
+    name = "base"
+    model = ""
+    batch_size = 1
+    parallel = False
+
+    @abstractmethod
+    def generate_many(self, messages_list: List[Messages], max_tokens: Optional[int] = None) -> List[Dict]:
+        """One result per message list, in order."""
+
+    def generate(self, messages: Messages, max_tokens: Optional[int] = None) -> Dict:
+        return self.generate_many([messages], max_tokens=max_tokens)[0]
+
+
+_client_lock = threading.Lock()
+_shared_client: Optional[Client] = None
+
+
+def get_ollama_client() -> Client:
+    """One client (and HTTP connection pool) per process instead of one per engine."""
+    global _shared_client
+    with _client_lock:
+        if _shared_client is None:
+            _shared_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout_seconds)
+        return _shared_client
+
+
+class OllamaBackend(LLMBackend):
+    """
+    Ollama HTTP server, one prompt per request. Several prompts in one call are sent concurrently,
+    so a server started with `OLLAMA_NUM_PARALLEL` > 1 decodes them together in its parallel
+    slots. The engine still sends one prompt per call (`batch_size = 1`): the scheduler already
+    keeps `LLM_MAX_CONCURRENCY` requests in flight and counts each as one slot.
+    """
+
+    name = "ollama"
+    parallel = True
+
+    def __init__(self, client: Optional[Client] = None, model: Optional[str] = None) -> None:
+        self.client = client or get_ollama_client()
+        self.model = model or settings.ollama_model
+
+    def _chat(self, messages: Messages, options: Dict) -> Dict:
+        response = self.client.chat(
+            model=self.model,
+            messages=messages,
+            options=options,
+            keep_alive=settings.ollama_keep_alive,
+        )
+        return {
+            "content": response.get("message", {}).get("content", ""),
+            "prompt_tokens": response.get("prompt_eval_count") or 0,
+            "completion_tokens": response.get("eval_count") or 0,
+        }
+
+    def generate_many(self, messages_list: List[Messages], max_tokens: Optional[int] = None) -> List[Dict]:
+        options = {"temperature": 0}
+        if max_tokens is not None:
+            options["num_predict"] = max_tokens
+        if len(messages_list) == 1:
+            return [self._chat(messages_list[0], options)]
+        with ThreadPoolExecutor(max_workers=len(messages_list), thread_name_prefix="ollama-request") as pool:
+            return list(pool.map(lambda messages: self._chat(messages, options), messages_list))
+
+
+class LlamaCppBackend(LLMBackend):
+    """
+    In-process GGUF model via `llama-cpp-python` (optional dependency), with no HTTP/JSON hop.
+    Not a batched forward pass: the high-level API decodes one sequence at a time, so the prompts
+    of a call run one after another under the context lock. What a multi-prompt call buys is that
+    consecutive prompts sharing the system prompt reuse its evaluated tokens.
+    """
+
+    name = "llamacpp"
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        n_ctx: Optional[int] = None,
+        n_threads: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> None:
+        try:
+            from llama_cpp import Llama
+        except ImportError as exc:
+            raise RuntimeError("LLM_BACKEND=llamacpp requires the llama-cpp-python package") from exc
+
+        model_path = model_path or settings.llamacpp_model_path
+        if not model_path:
+            raise ValueError("LLAMACPP_MODEL_PATH must point to a GGUF model file")
+        self.model = Path(model_path).name
+        self.batch_size = batch_size or settings.llm_batch_size
+        self._llama = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx or settings.llamacpp_n_ctx,
+            n_threads=n_threads or settings.llamacpp_n_threads or os.cpu_count(),
+            verbose=False,
+        )
+        # A llama.cpp context is not thread-safe.
+        self._lock = threading.Lock()
+
+    def generate_many(self, messages_list: List[Messages], max_tokens: Optional[int] = None) -> List[Dict]:
+        results = []
+        with self._lock:
+            for messages in messages_list:
+                response = self._llama.create_chat_completion(messages=messages, temperature=0, max_tokens=max_tokens)
+                usage = response.get("usage", {})
+                results.append(
+                    {
+                        "content": response["choices"][0]["message"]["content"] or "",
+                        "prompt_tokens": usage.get("prompt_tokens", 0),
+                        "completion_tokens": usage.get("completion_tokens", 0),
+                    }
+                )
+        return results
+
+
+_SENTENCE = re.compile(r"[^.!?]+[.!?]")
+
+
+def _fake_response(messages: Messages) -> str:
+    text = messages[-1]["content"].split("Text:\n", 1)[-1]
+    sentences = [s.strip() for s in _SENTENCE.findall(text)][:2]
+    return json.dumps({"management_commentary": sentences, "evidence_quotes": sentences[:1], "confidence": 0.5})
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic backend for tests and benchmarks: echoes leading sentences as JSON insights."""
+
+    name = "fake"
+
+    def __init__(self, responder: Optional[Callable[[Messages], str]] = None, batch_size: int = 4) -> None:
+        self.model = "fake"
+        self.batch_size = batch_size
+        self.responder = responder or _fake_response
+        self.batches: List[int] = []
+
+    def generate_many(self, messages_list: List[Messages], max_tokens: Optional[int] = None) -> List[Dict]:
+        self.batches.append(len(messages_list))
+        results = []
+        for messages in messages_list:
+            content = self.responder(messages)
+            results.append(
+                {
+                    "content": content,
+                    "prompt_tokens": sum(len(m["content"].split()) for m in messages),
+                    "completion_tokens": len(content.split()),
+                }
+            )
+        return results
+
+
+BACKENDS = {"ollama": OllamaBackend, "llamacpp": LlamaCppBackend, "fake": FakeBackend}
+
+_backend_lock = threading.Lock()
+_shared_backends: Dict[str, LLMBackend] = {}
+
+
+def get_llm_backend(name: Optional[str] = None) -> LLMBackend:
+    """Process-wide backend instance selected by `LLM_BACKEND` (models are loaded once)."""
+    name = (name or settings.llm_backend).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    with _backend_lock:
+        if name not in _shared_backends:
+            _shared_backends[name] = BACKENDS[name]()
+        return _shared_backends[name]
@@ -1,10 +1,70 @@
+import hashlib
 import json
 import re
-from typing import Dict, List, Optional
-
-from ollama import Client
+import time
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 from app.config import settings
+from app.services.filing_store import section_text
+from app.services.llm_backends import LLMBackend, get_llm_backend
+from app.services.llm_scheduler import PRIORITY_INTERACTIVE, LLMScheduler, get_llm_scheduler
+
+
+# Identical on every call and sent as its own system message, so the server can reuse the
+# prompt-prefix KV cache; only the user message (form, section, text) varies.
+SYSTEM_PROMPT = """
+You are extracting filing insights for a financial analysis app.
+Use only the provided SEC filing text. Do not infer beyond this text.
+
+Return JSON only with these exact keys:
+- revenue_trends: string[]
+- debt_risk_signals: string[]
+- risk_factor_highlights: string[]
+- red_flags: string[]
+- management_commentary: string[]
+- evidence_quotes: string[]
+- confidence: number between 0 and 1
+
+Rules:
+- If evidence is insufficient, use empty arrays.
+- Keep bullets concise.
+- Include brief quote-like snippets in evidence_quotes from the text.
+""".strip()
+
+# A section whose sentences changed at least this much is re-extracted in full instead of
+# patching the prior filing's insight.
+REEXTRACT_CHANGE_SHARE = 0.6
+# Share of an item's content words that must come from a text for the item to be grounded in it.
+_GROUNDED_SHARE = 0.6
+_WORD = re.compile(r"[a-z0-9]+")
+_LIST_KEYS = (
+    "revenue_trends",
+    "debt_risk_signals",
+    "risk_factor_highlights",
+    "red_flags",
+    "management_commentary",
+    "evidence_quotes",
+)
+
+
+def warm_up_model(backend: Optional[LLMBackend] = None) -> Dict:
+    """
+    Loads the model and primes the system-prompt prefix with a one-token request, so the
+    first real extraction does not pay model-load time. Never raises.
+    """
+    started = time.perf_counter()
+    try:
+        (backend or get_llm_backend()).generate(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": "Form: 10-K\nSection: warmup\nText:\n"},
+            ],
+            max_tokens=1,
+        )
+    except Exception as exc:  # noqa: BLE001
+        return {"ok": False, "seconds": time.perf_counter() - started, "error": str(exc)}
+    return {"ok": True, "seconds": time.perf_counter() - started, "error": None}
 
 
 def _dedupe_keep_order(items: List[str], limit: int = 6) -> List[str]:
@@ -51,14 +111,7 @@ def _normalize_payload(payload: Dict) -> Dict:
         "confidence": payload.get("confidence", 0.0),
     }
 
-    for key in [
-        "revenue_trends",
-        "debt_risk_signals",
-        "risk_factor_highlights",
-        "red_flags",
-        "management_commentary",
-        "evidence_quotes",
-    ]:
+    for key in _LIST_KEYS:
         if not isinstance(normalized[key], list):
             normalized[key] = []
         normalized[key] = [str(x) for x in normalized[key]]
@@ -96,22 +149,61 @@ def merge_insights(chunks: List[Dict]) -> Dict:
     return result
 
 
-def _find_quote_offset(section_text: str, quote: str) -> Optional[int]:
+def _content_stems(text: str) -> set:
+    # Six-letter prefixes, so "suppliers"/"supplier" and "concentrated"/"concentration" match.
+    return {word[:6] for word in _WORD.findall(text.lower()) if len(word) > 3}
+
+
+def drop_stale_items(prior: Dict, stale_units: List[str], current_text: str) -> Dict:
+    """
+    Removes prior insight items that came from removed or rewritten sentences: evidence quotes
+    no longer found in the current text, and bullets whose words come from a stale sentence
+    rather than from the current text.
+    """
+    normalized = _normalize_payload(prior)
+    current_lower = " ".join(current_text.split()).lower()
+    current_stems = _content_stems(current_text)
+    stale_stems = [_content_stems(unit) for unit in stale_units]
+
+    def grounded(stems: set, pool: set) -> bool:
+        return len(stems & pool) >= _GROUNDED_SHARE * len(stems)
+
+    def is_stale(item: str) -> bool:
+        stems = _content_stems(item)
+        if not stems or grounded(stems, current_stems):
+            return False
+        return any(grounded(stems, pool) for pool in stale_stems)
+
+    kept: Dict = {}
+    for key in _LIST_KEYS:
+        if key == "evidence_quotes":
+            kept[key] = [quote for quote in normalized[key] if " ".join(quote.split()).lower() in current_lower]
+        else:
+            kept[key] = [item for item in normalized[key] if not is_stale(item)]
+    kept["confidence"] = normalized["confidence"]
+    return kept
+
+
+def _find_quote_offset(lowered_text: str, quote: str) -> Optional[int]:
     q = " ".join(str(quote).split()).strip()
     if not q:
         return None
-    idx = section_text.lower().find(q.lower())
+    idx = lowered_text.find(q.lower())
     return idx if idx >= 0 else None
 
 
 def attach_evidence_spans(insights: Dict, section_records: Dict[str, Dict]) -> Dict:
     evidence_quotes = insights.get("evidence_quotes", [])
     evidence_spans = []
+    # Section views decode from the mapped filing on access, so each section is read (and
+    # lower-cased) at most once per call rather than once per quote.
+    lowered: Dict[str, str] = {}
     for quote in evidence_quotes:
         mapped = False
         for section_name, record in section_records.items():
-            section_text = record.get("text", "")
-            local_idx = _find_quote_offset(section_text, quote)
+            if section_name not in lowered:
+                lowered[section_name] = record.get("text", "").lower()
+            local_idx = _find_quote_offset(lowered[section_name], quote)
             if local_idx is None:
                 continue
             start = int(record.get("start", 0)) + local_idx
@@ -128,56 +220,175 @@ def attach_evidence_spans(insights: Dict, section_records: Dict[str, Dict]) -> D
 
 
 class FilingInsightEngine:
-    def __init__(self) -> None:
-        self.client = Client(host=settings.ollama_base_url)
-        self.model = settings.ollama_model
+    def __init__(
+        self,
+        scheduler: Optional[LLMScheduler] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        owner: Optional[str] = None,
+        backend: Optional[LLMBackend] = None,
+        deadline_at: Optional[float] = None,
+    ) -> None:
+        self.backend = backend or get_llm_backend()
+        self.model = self.backend.model
         self.timeout_seconds = settings.ollama_timeout_seconds
         self.max_section_chars = settings.llm_max_section_chars
+        self.scheduler = scheduler or get_llm_scheduler()
+        self.priority = priority
+        self.owner = owner
+        # Wall-clock time the caller needs results by; orders work within a priority class.
+        self.deadline_at = deadline_at
 
-    def _prompt(self, form_type: str, section_name: str, section_text: str) -> str:
-        return f"""
-You are extracting filing insights for a financial analysis app.
-Use only the provided SEC filing text. Do not infer beyond this text.
+    def _messages(self, form_type: str, section_name: str, section_text: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Form: {form_type}\nSection: {section_name}\nText:\n{section_text[: self.max_section_chars]}",
+            },
+        ]
 
-Return JSON only with these exact keys:
-- revenue_trends: string[]
-- debt_risk_signals: string[]
-- risk_factor_highlights: string[]
-- red_flags: string[]
-- management_commentary: string[]
-- evidence_quotes: string[]
-- confidence: number between 0 and 1
+    def _analyze_batch(self, form_type: str, items: List[Tuple[str, str]]) -> List[Dict]:
+        results = self.backend.generate_many([self._messages(form_type, name, text) for name, text in items])
+        return [_normalize_payload(_extract_json_block(result["content"])) for result in results]
 
-Rules:
-- If evidence is insufficient, use empty arrays.
-- Keep bullets concise.
-- Include brief quote-like snippets in evidence_quotes from the text.
+    def _analyze_section(self, form_type: str, section_name: str, section_text: str) -> Dict:
+        return self._analyze_batch(form_type, [(section_name, section_text)])[0]
 
-Form: {form_type}
-Section: {section_name}
-Text:
-{section_text[: self.max_section_chars]}
-""".strip()
+    def _request_key(self, form_type: str, items: List[Tuple[str, str]]) -> str:
+        messages = [self._messages(form_type, name, text) for name, text in items]
+        return hashlib.sha256(json.dumps([self.model, messages]).encode("utf-8")).hexdigest()
 
-    def _analyze_section(self, form_type: str, section_name: str, section_text: str) -> Dict:
-        response = self.client.chat(
-            model=self.model,
-            messages=[{"role": "user", "content": self._prompt(form_type, section_name, section_text)}],
-            options={"temperature": 0},
-        )
-        content = response.get("message", {}).get("content", "")
-        payload = _extract_json_block(content)
-        return _normalize_payload(payload)
+    def _run_chunk(self, form_type: str, chunk: List[Tuple[str, str]]) -> List[Dict]:
+        if len(chunk) == 1:
+            return [self._analyze_section(form_type, *chunk[0])]
+        return self._analyze_batch(form_type, chunk)
+
+    def _analyze_sections(self, form_type: str, items: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        Submits all (section_name, section_text) items to the scheduler at once so they share the
+        backend with other filings' sections; results come back in item order. Backends with
+        `batch_size > 1` receive chunks of that many items per call.
+        """
+        batch_size = max(1, self.backend.batch_size)
+        chunks = [items[start : start + batch_size] for start in range(0, len(items), batch_size)]
+        deadline_seconds = None if self.deadline_at is None else max(0.0, self.deadline_at - time.time())
+        futures = [
+            self.scheduler.submit(
+                self._request_key(form_type, chunk),
+                partial(self._run_chunk, form_type, chunk),
+                priority=self.priority,
+                deadline_seconds=deadline_seconds,
+                owner=self.owner,
+            )
+            for chunk in chunks
+        ]
+        # Deduplicated requests share one result object, so hand each caller its own copy.
+        return [_normalize_payload(result) for future in futures for result in future.result()]
 
     def extract_from_sections(self, form_type: str, sections: Dict[str, str]) -> Dict:
-        chunks = []
-        for section_name, section_text in sections.items():
+        items = [(name, text) for name, text in sections.items() if text.strip()]
+        return merge_insights(self._analyze_sections(form_type, items))
+
+    def extract_incremental(
+        self,
+        form_type: str,
+        section_records: Dict[str, Dict],
+        section_diffs: Dict[str, Dict],
+        prior_section_insights: Dict[str, Dict],
+    ) -> Tuple[Dict, Dict[str, Dict]]:
+        """
+        Sends only new/modified text to the model when the prior filing's section insight is known.
+        Prior items drawn from removed or rewritten sentences are dropped before the prior insight
+        is reused (unchanged sections) or merged with the fresh one (changed sections). Sections
+        that changed by `REEXTRACT_CHANGE_SHARE` or more are re-extracted without the prior.
+        Returns the merged insights (with evidence spans) and the per-section insights to persist.
+        """
+        section_insights: Dict[str, Dict] = {}
+        carried: Dict[str, Dict] = {}
+        to_analyze: List[Tuple[str, str]] = []
+        for section_name, record in section_records.items():
+            # The prompt keeps only the first `max_section_chars`, so a view decodes just those.
+            prompt_text = section_text(record, 0, self.max_section_chars)
+            if not prompt_text.strip():
+                continue
+            diff = section_diffs.get(section_name)
+            prior = prior_section_insights.get(section_name)
+            total_units = sum(diff["counts"].values()) if diff else 0
+            changed_share = 1 - diff["counts"]["unchanged"] / total_units if total_units else 0.0
+            if diff is None or prior is None or changed_share >= REEXTRACT_CHANGE_SHARE:
+                to_analyze.append((section_name, prompt_text))
+                continue
+            stale_units = diff.get("removed", []) + diff.get("replaced", [])
+            if stale_units:
+                prior = drop_stale_items(prior, stale_units, record.get("text", ""))
+            if diff["changed_text"].strip():
+                carried[section_name] = prior
+                to_analyze.append((section_name, diff["changed_text"]))
+            else:
+                section_insights[section_name] = _normalize_payload(prior)
+
+        for (section_name, _), fresh in zip(to_analyze, self._analyze_sections(form_type, to_analyze)):
+            prior = carried.get(section_name)
+            section_insights[section_name] = merge_insights([fresh, prior]) if prior is not None else fresh
+        section_insights = {name: section_insights[name] for name in section_records if name in section_insights}
+
+        merged = merge_insights(list(section_insights.values()))
+        return attach_evidence_spans(merged, section_records), section_insights
+
+    def extract_without_boilerplate(
+        self,
+        form_type: str,
+        section_records: Dict[str, Dict],
+        boilerplate_index,
+        max_new_cluster_analyses: int = 3,
+    ) -> Tuple[Dict, Dict[str, Dict]]:
+        """
+        Sends only company-specific sentences to the model. Boilerplate clusters reuse one shared
+        cached insight; at most `max_new_cluster_analyses` uncached clusters (most common first)
+        are analyzed per filing so the corpus cache fills up over a batch.
+        Returns the merged insights (with evidence spans) and the per-section insights to persist.
+        """
+        specific_items: List[Tuple[str, str]] = []
+        section_clusters: Dict[str, List[int]] = {}
+        boilerplate_clusters: List[int] = []
+        for section_name, record in section_records.items():
+            section_text = record.get("text", "")
             if not section_text.strip():
                 continue
-            chunks.append(self._analyze_section(form_type=form_type, section_name=section_name, section_text=section_text))
-        return merge_insights(chunks)
+            split = boilerplate_index.split_section(section_text)
+            if split["specific_text"].strip():
+                specific_items.append((section_name, split["specific_text"]))
+            section_clusters[section_name] = split["boilerplate_clusters"]
+            boilerplate_clusters.extend(c for c in split["boilerplate_clusters"] if c not in boilerplate_clusters)
+
+        boilerplate_clusters.sort(key=boilerplate_index.company_count, reverse=True)
+        uncached = [cid for cid in boilerplate_clusters if boilerplate_index.cluster_insight(cid) is None]
+        new_clusters = uncached[:max_new_cluster_analyses]
+        cluster_items = [("boilerplate", boilerplate_index.cluster_text(cid)) for cid in new_clusters]
+
+        results = self._analyze_sections(form_type, specific_items + cluster_items)
+        specific_results = {name: result for (name, _), result in zip(specific_items, results)}
+        for cluster_id, insight in zip(new_clusters, results[len(specific_items) :]):
+            boilerplate_index.set_cluster_insight(cluster_id, insight)
+
+        chunks = list(specific_results.values())
+        for cluster_id in boilerplate_clusters:
+            cached = boilerplate_index.cluster_insight(cluster_id)
+            if cached is not None:
+                chunks.append(cached)
+
+        section_insights: Dict[str, Dict] = {}
+        for section_name, cluster_ids in section_clusters.items():
+            parts = [specific_results[section_name]] if section_name in specific_results else []
+            parts += [boilerplate_index.cluster_insight(cid) for cid in cluster_ids if boilerplate_index.cluster_insight(cid)]
+            if parts:
+                section_insights[section_name] = merge_insights(parts)
+
+        merged = attach_evidence_spans(merge_insights(chunks), section_records)
+        merged["boilerplate_cluster_count"] = len(boilerplate_clusters)
+        return merged, section_insights
 
     def extract_from_section_records(self, form_type: str, section_records: Dict[str, Dict]) -> Dict:
-        sections = {k: v.get("text", "") for k, v in section_records.items()}
+        sections = {k: section_text(v, 0, self.max_section_chars) for k, v in section_records.items()}
         merged = self.extract_from_sections(form_type=form_type, sections=sections)
         return attach_evidence_spans(merged, section_records)
@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.config import settings
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+_WAIT_SAMPLES = 1000
+
+
+class _Request:
+    __slots__ = ("key", "fn", "future", "priority", "owners", "anonymous", "enqueued_at", "started")
+
+    def __init__(self, key: Hashable, fn: Callable[[], Any], priority: int, owner: Optional[str]) -> None:
+        self.key = key
+        self.fn = fn
+        self.future: Future = Future()
+        self.priority = priority
+        self.owners = {owner} if owner is not None else set()
+        # Requests without an owner can never be cancelled through `cancel_owner`.
+        self.anonymous = owner is None
+        self.enqueued_at = time.monotonic()
+        self.started = False
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class LLMScheduler:
+    """
+    Single queue in front of the local model server.
+
+    Requests are ordered by priority class (interactive before batch), then earliest deadline,
+    then arrival. Identical in-flight requests (same key) share one execution, and a duplicate
+    with a higher priority promotes the pending request. `max_concurrency` dispatch threads keep
+    that many calls in flight across all filings; `reserved_interactive_slots` of them never run
+    batch work, which bounds interactive latency while a batch is saturating the server.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, reserved_interactive_slots: Optional[int] = None) -> None:
+        self.max_concurrency = max_concurrency or settings.llm_max_concurrency
+        reserved = settings.llm_reserved_interactive_slots if reserved_interactive_slots is None else reserved_interactive_slots
+        self.batch_slots = max(1, self.max_concurrency - reserved)
+        self._cond = threading.Condition()
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._pending: Dict[Hashable, _Request] = {}
+        self._running = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 0}
+        self._waits = {priority: deque(maxlen=_WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+        self._stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._dispatch, name=f"llm-dispatch-{n}", daemon=True)
+            for n in range(self.max_concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _push(self, request: _Request, deadline: float) -> None:
+        heapq.heappush(self._heap, (request.priority, deadline, next(self._seq), request))
+
+    def submit(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        priority: int = PRIORITY_BATCH,
+        deadline_seconds: Optional[float] = None,
+        owner: Optional[str] = None,
+    ) -> Future:
+        if priority not in PRIORITY_NAMES:
+            raise ValueError(f"Unknown priority: {priority}")
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else float("inf")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LLM scheduler is shut down")
+            self._stats["submitted"] += 1
+            request = self._pending.get(key)
+            if request is not None:
+                self._stats["deduplicated"] += 1
+                if owner is None:
+                    request.anonymous = True
+                else:
+                    request.owners.add(owner)
+                if priority < request.priority and not request.started:
+                    # The old heap entry becomes stale and is skipped when popped.
+                    request.priority = priority
+                    self._push(request, deadline)
+                    self._cond.notify()
+                return request.future
+
+            request = _Request(key, fn, priority, owner)
+            self._pending[key] = request
+            self._push(request, deadline)
+            self._cond.notify()
+            return request.future
+
+    def _pop_eligible(self) -> Optional[_Request]:
+        while self._heap:
+            priority, _, _, request = self._heap[0]
+            if request.started or request.future.cancelled() or priority != request.priority:
+                heapq.heappop(self._heap)
+                continue
+            # Interactive entries sort first, so a batch head means no interactive work is waiting.
+            if priority == PRIORITY_BATCH and self._running[PRIORITY_BATCH] >= self.batch_slots:
+                return None
+            heapq.heappop(self._heap)
+            return request
+        return None
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                request = self._pop_eligible()
+                while request is None and not self._closed:
+                    self._cond.wait()
+                    request = self._pop_eligible()
+                if request is None:
+                    return
+                request.started = True
+                self._running[request.priority] += 1
+                self._waits[request.priority].append(time.monotonic() - request.enqueued_at)
+                priority = request.priority
+
+            if request.future.set_running_or_notify_cancel():
+                try:
+                    result = request.fn()
+                except BaseException as exc:  # noqa: BLE001
+                    request.future.set_exception(exc)
+                    outcome = "failed"
+                else:
+                    request.future.set_result(result)
+                    outcome = "completed"
+            else:
+                outcome = "cancelled"
+
+            with self._cond:
+                self._running[priority] -= 1
+                if self._pending.get(request.key) is request:
+                    del self._pending[request.key]
+                if outcome != "cancelled":
+                    self._stats[outcome] += 1
+                self._cond.notify_all()
+
+    def cancel_owner(self, owner: str) -> int:
+        """Drops `owner` from its pending requests; requests nobody else waits on are cancelled."""
+        cancelled = 0
+        with self._cond:
+            for key, request in list(self._pending.items()):
+                if request.started or owner not in request.owners:
+                    continue
+                request.owners.discard(owner)
+                if not request.owners and not request.anonymous and request.future.cancel():
+                    del self._pending[key]
+                    cancelled += 1
+            self._stats["cancelled"] += cancelled
+            self._cond.notify_all()
+        return cancelled
+
+    def stats(self) -> Dict:
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for request in self._pending.values():
+                if not request.started:
+                    depth[PRIORITY_NAMES[request.priority]] += 1
+            waits = {
+                PRIORITY_NAMES[priority]: {
+                    "p50_seconds": _percentile(list(samples), 0.5),
+                    "p95_seconds": _percentile(list(samples), 0.95),
+                    "samples": len(samples),
+                }
+                for priority, samples in self._waits.items()
+            }
+            return {
+                **self._stats,
+                "queue_depth": depth,
+                "running": {PRIORITY_NAMES[p]: n for p, n in self._running.items()},
+                "wait": waits,
+            }
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._closed = True
+            for request in self._pending.values():
+                if not request.started:
+                    request.future.cancel()
+            self._pending.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+
+_shared_scheduler: Optional[LLMScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Process-wide scheduler so every engine in this process shares one queue."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler()
+        return _shared_scheduler
@@ -0,0 +1,147 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.filing_parser import parse_filing
+from app.services.filing_store import MappedFilingText, _safe_stem, persist_filing_text
+
+
+def _parse_worker(accession_number: str, form_type: str, raw_path: str, output_dir: str, remove_raw: bool = False) -> Dict:
+    """Runs in a worker process: parse, persist text for mmap, return only small metadata."""
+    started = time.perf_counter()
+    try:
+        raw_filing = Path(raw_path).read_text(encoding="utf-8", errors="replace")
+    finally:
+        # Spool files exist only to hand the document over; the caller's own files are kept.
+        if remove_raw:
+            Path(raw_path).unlink(missing_ok=True)
+    text, ixbrl_financials = parse_filing(raw_filing, form_type)
+    persist_filing_text(accession_number, text, form_type, output_dir=output_dir)
+    return {
+        "accession_number": accession_number,
+        "form": form_type,
+        "chars": len(text),
+        "raw_bytes": len(raw_filing),
+        "ixbrl_financials": ixbrl_financials,
+        "worker_pid": os.getpid(),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+class ParseExecutor:
+    """
+    Distributes filing parsing over a process pool sized to the available cores.
+
+    Raw documents go in as spool-file paths and normalized text comes back as a memory-mapped
+    `MappedFilingText` handle, so no multi-MB strings are pickled between processes. Workers are
+    recycled after `max_tasks_per_child` tasks (Python 3.11+) to limit heap fragmentation.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+        output_dir: Optional[str] = None,
+        spool_dir: Optional[str] = None,
+    ) -> None:
+        self.max_workers = max_workers or settings.parse_max_workers or os.cpu_count() or 1
+        self.output_dir = output_dir or settings.filing_text_dir
+        self.spool_dir = Path(spool_dir or settings.filing_spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+
+        pool_kwargs = {"max_workers": self.max_workers}
+        tasks_per_child = max_tasks_per_child or settings.parse_max_tasks_per_child
+        if tasks_per_child and sys.version_info >= (3, 11):
+            pool_kwargs["max_tasks_per_child"] = tasks_per_child
+        self._pool = ProcessPoolExecutor(**pool_kwargs)
+        self._lock = Lock()
+        self._started = time.perf_counter()
+        self._worker_stats: Dict[int, Dict] = {}
+        self._pending: List[Future] = []
+
+    def __enter__(self) -> "ParseExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def _spool(self, accession_number: str, raw_filing: str) -> str:
+        # Unique per submit: the worker deletes its spool file, so two submits of one accession
+        # must not share a path.
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.spool_dir, prefix=f"{_safe_stem(accession_number)}.", suffix=".raw", delete=False
+        ) as handle:
+            handle.write(raw_filing)
+        return handle.name
+
+    def _collect_finished(self) -> None:
+        # Called with the lock held; folds completed tasks into per-worker counters and drops
+        # them, so only in-flight futures are kept.
+        still_pending = []
+        for future in self._pending:
+            if not future.done():
+                still_pending.append(future)
+                continue
+            if future.cancelled() or future.exception() is not None:
+                continue
+            result = future.result()
+            stats = self._worker_stats.setdefault(result["worker_pid"], {"tasks": 0, "raw_bytes": 0, "busy_seconds": 0.0})
+            stats["tasks"] += 1
+            stats["raw_bytes"] += result["raw_bytes"]
+            stats["busy_seconds"] += result["seconds"]
+        self._pending = still_pending
+
+    def submit(
+        self,
+        accession_number: str,
+        form_type: str,
+        raw_filing: Optional[str] = None,
+        raw_path: Optional[str] = None,
+    ) -> Future:
+        spooled = raw_path is None
+        if spooled:
+            if raw_filing is None:
+                raise ValueError("Either raw_filing or raw_path is required")
+            raw_path = self._spool(accession_number, raw_filing)
+        future = self._pool.submit(_parse_worker, accession_number, form_type, raw_path, self.output_dir, spooled)
+        with self._lock:
+            self._collect_finished()
+            self._pending.append(future)
+        return future
+
+    def parse_many(self, items: Iterable[Tuple[str, str, str]]) -> Iterator[Dict]:
+        """Parses (accession_number, form_type, raw_path) items; yields results as they finish."""
+        futures = [self.submit(accession, form, raw_path=raw_path) for accession, form, raw_path in items]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def open_text(self, accession_number: str) -> MappedFilingText:
+        return MappedFilingText(accession_number, output_dir=self.output_dir)
+
+    def throughput(self) -> Dict:
+        with self._lock:
+            self._collect_finished()
+            workers = {
+                pid: {
+                    **stats,
+                    "mb_per_second": stats["raw_bytes"] / 1e6 / stats["busy_seconds"] if stats["busy_seconds"] else 0.0,
+                }
+                for pid, stats in self._worker_stats.items()
+            }
+        elapsed = time.perf_counter() - self._started
+        total_tasks = sum(stats["tasks"] for stats in workers.values())
+        return {
+            "max_workers": self.max_workers,
+            "tasks": total_tasks,
+            "filings_per_second": total_tasks / elapsed if elapsed else 0.0,
+            "workers": workers,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
@@ -1,22 +1,17 @@
+import math
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from statistics import median
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from app.config import settings
 from app.models.schemas import CompanyIdentity
-from app.services.ratio_engine import compute_ratios
-from app.services.xbrl_mapper import extract_latest_financials
+from app.services.ratio_engine import RATIO_KEYS, compute_ratios
+from app.services.concept_plan import ConceptPlanStore, build_concept_plan, resolve_latest_financials
+from app.services.peer_index import PeerIndex
 
 
-RATIO_KEYS = [
-    "current_ratio",
-    "debt_to_equity",
-    "net_margin",
-    "roa",
-    "roe",
-    "operating_margin",
-    "interest_coverage",
-]
+# Keeps an exact fundamentals twin from taking all of the weight.
+DISTANCE_EPSILON = 0.1
 
 
 def aggregate_peer_ratio_medians(peer_ratios: List[Dict[str, Dict]]) -> Dict[str, Optional[float]]:
@@ -36,6 +31,29 @@ def aggregate_peer_ratio_medians(peer_ratios: List[Dict[str, Dict]]) -> Dict[str
     return result
 
 
+def weighted_peer_ratio_medians(peer_ratios: List[Dict[str, Dict]], weights: List[float]) -> Dict[str, Optional[float]]:
+    """Weighted medians per ratio: the first value whose cumulative weight reaches half the total."""
+    result: Dict[str, Optional[float]] = {}
+    for key in RATIO_KEYS:
+        weighted = []
+        for ratio_map, weight in zip(peer_ratios, weights):
+            payload = ratio_map.get(key, {})
+            value = payload.get("value")
+            if payload.get("quality") == "ok" and isinstance(value, (int, float)):
+                weighted.append((float(value), float(weight)))
+        if not weighted:
+            result[key] = None
+            continue
+        weighted.sort()
+        half, cumulative = sum(weight for _, weight in weighted) / 2.0, 0.0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= half:
+                result[key] = value
+                break
+    return result
+
+
 def compare_company_to_peer(company_ratios: Dict[str, Dict], peer_medians: Dict[str, Optional[float]]) -> Dict[str, Dict]:
     comparison: Dict[str, Dict] = {}
     for key in RATIO_KEYS:
@@ -57,8 +75,20 @@ def compare_company_to_peer(company_ratios: Dict[str, Dict], peer_medians: Dict[
 
 
 class PeerBenchmarkEngine:
-    def __init__(self, sec_client) -> None:
+    def __init__(
+        self,
+        sec_client,
+        sketch_store=None,
+        concept_plans: Optional[ConceptPlanStore] = None,
+        peer_index: Optional[PeerIndex] = None,
+        universe_snapshot: Optional[Dict] = None,
+    ) -> None:
         self.sec_client = sec_client
+        self.sketch_store = sketch_store
+        self.concept_plans = concept_plans
+        self.peer_index = peer_index
+        # Frames snapshot of the whole universe: peers in it need no submissions or companyfacts.
+        self.universe_snapshot = universe_snapshot
 
     @staticmethod
     def _normalize_cik(cik_int: int) -> str:
@@ -101,26 +131,137 @@ class PeerBenchmarkEngine:
             )
         return peers
 
-    def build_peer_benchmark(self, peers: List[CompanyIdentity]) -> Dict:
+    def find_snapshot_peers(
+        self,
+        target_sic: str,
+        target_cik_int: int,
+        target_financials: Optional[Dict[str, Optional[float]]] = None,
+        max_peers: int = 10,
+    ) -> List[CompanyIdentity]:
+        """Same-SIC peers from the universe snapshot, closest in total assets first. No SEC requests."""
+        snapshot = self.universe_snapshot
+        if not snapshot or not target_sic:
+            return []
+        target_assets = (target_financials or {}).get("assets")
+
+        def size_gap(cik: int) -> float:
+            assets = snapshot["financials"].get(cik, {}).get("assets")
+            if not target_assets or not assets or target_assets <= 0 or assets <= 0:
+                return math.inf
+            return abs(math.log(assets / target_assets))
+
+        candidates = [cik for cik, sic in snapshot["sic_by_cik"].items() if sic == str(target_sic) and cik != target_cik_int]
+        candidates.sort(key=lambda cik: (size_gap(cik), cik))
+        return [
+            CompanyIdentity(
+                ticker=snapshot["ticker_by_cik"].get(cik, ""),
+                cik_10=self._normalize_cik(cik),
+                cik_int=cik,
+                company_name=snapshot["entity_names"].get(cik),
+            )
+            for cik in candidates[:max_peers]
+        ]
+
+    def find_nearest_peers(
+        self,
+        target_cik_int: int,
+        target_financials: Optional[Dict[str, Optional[float]]] = None,
+        target_sic: Optional[str] = None,
+        max_peers: int = 10,
+    ) -> List[Tuple[CompanyIdentity, float]]:
+        """
+        Closest companies by fundamentals from the peer index (no submissions scan), nearest
+        first with their distances. The target is upserted first so its latest facts are used.
+        """
+        if self.peer_index is None:
+            raise ValueError("find_nearest_peers requires a peer_index")
+        if target_financials is not None:
+            self.peer_index.upsert(target_cik_int, target_financials, target_sic)
+        neighbours = self.peer_index.nearest(
+            cik=target_cik_int,
+            financials=target_financials,
+            k=max_peers,
+            sic=target_sic,
+            sic_weight=settings.peer_index_sic_weight if target_sic else 0.0,
+        )
+        rows = {int(row.get("cik_str", 0)): row for row in self.sec_client.get_ticker_mapping()}
+        peers = []
+        for neighbour in neighbours:
+            row = rows.get(neighbour["cik"], {})
+            identity = CompanyIdentity(
+                ticker=str(row.get("ticker", "")).upper(),
+                cik_10=self._normalize_cik(neighbour["cik"]),
+                cik_int=neighbour["cik"],
+                company_name=row.get("title"),
+            )
+            peers.append((identity, neighbour["distance"]))
+        return peers
+
+    def build_peer_benchmark(
+        self,
+        peers: List[CompanyIdentity],
+        target_sic: Optional[str] = None,
+        peer_distances: Optional[Dict[int, float]] = None,
+    ) -> Dict:
         def _peer_ratio(peer: CompanyIdentity):
+            if self.universe_snapshot and peer.cik_int in self.universe_snapshot["financials"]:
+                financials = self.universe_snapshot["financials"][peer.cik_int]
+                return financials, compute_ratios(financials)
             try:
                 facts = self.sec_client.get_company_facts(peer.cik_10)
-                financials = extract_latest_financials(facts)
-                return compute_ratios(financials)
+                if self.concept_plans is not None:
+                    financials = self.concept_plans.resolve(peer.cik_int, facts)
+                else:
+                    financials = resolve_latest_financials(facts, build_concept_plan(facts))
+                return financials, compute_ratios(financials)
             except Exception:  # noqa: BLE001
                 return None
 
         peer_ratio_maps: List[Dict[str, Dict]] = []
+        used_ciks: List[int] = []
         max_workers = max(1, min(settings.peer_max_workers, len(peers) or 1))
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(_peer_ratio, peer) for peer in peers]
+            futures = {executor.submit(_peer_ratio, peer): peer for peer in peers}
             for future in as_completed(futures):
                 result = future.result()
                 if result:
-                    peer_ratio_maps.append(result)
+                    financials, ratio_map = result
+                    peer = futures[future]
+                    peer_ratio_maps.append(ratio_map)
+                    used_ciks.append(peer.cik_int)
+                    # Index peers can have any SIC code, so only SIC peers feed the target's sketch.
+                    if self.sketch_store is not None and target_sic and not peer_distances:
+                        self.sketch_store.update_company(peer.cik_int, target_sic, ratio_map)
+                    if self.peer_index is not None:
+                        # SIC peers share the target's code; index peers keep the one they have.
+                        self.peer_index.upsert(peer.cik_int, financials, None if peer_distances else target_sic)
+
+        if self.sketch_store is not None and target_sic and not peer_distances:
+            self.sketch_store.save()
+        if self.peer_index is not None:
+            self.peer_index.save()
 
         peer_medians = aggregate_peer_ratio_medians(peer_ratio_maps)
-        return {
+        benchmark = {
             "peer_count_used": len(peer_ratio_maps),
             "peer_medians": peer_medians,
         }
+        if peer_distances:
+            weights = [1.0 / (peer_distances.get(cik, 0.0) + DISTANCE_EPSILON) for cik in used_ciks]
+            benchmark["peer_weighted_medians"] = weighted_peer_ratio_medians(peer_ratio_maps, weights)
+        return benchmark
+
+    def benchmark_from_sketches(self, target_sic: str, min_companies: int = 1) -> Optional[Dict]:
+        """
+        Serves peer medians from persisted sketches without fetching any peer data, or None
+        when fewer than `min_companies` companies have been sketched for the SIC code.
+        """
+        if self.sketch_store is None:
+            return None
+        count = self.sketch_store.company_count(target_sic)
+        if count == 0 or count < min_companies:
+            return None
+        return {
+            "peer_count_used": count,
+            "peer_medians": self.sketch_store.peer_medians(target_sic),
+        }
@@ -0,0 +1,258 @@
+import math
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.atomic_write import atomic_write
+from app.utils.logging import get_logger
+
+
+logger = get_logger()
+
+
+FEATURES = ["log_assets", "log_revenue", "net_margin", "operating_margin", "leverage"]
+# Per-feature weights applied after robust scaling; size and profitability count the most.
+FEATURE_WEIGHTS = np.array([1.0, 1.0, 0.8, 0.8, 0.6])
+LEAF_SIZE = 32
+
+
+def _ratio(numerator: Optional[float], denominator: Optional[float], low: float, high: float) -> float:
+    if numerator is None or denominator is None or abs(denominator) < 1e-9:
+        return math.nan
+    return min(high, max(low, numerator / denominator))
+
+
+def company_features(financials: Dict[str, Optional[float]]) -> Optional[np.ndarray]:
+    """Raw (unscaled) fundamentals vector, or None without any size measure to anchor it."""
+    assets, revenue = financials.get("assets"), financials.get("revenue")
+    log_assets = math.log10(assets) if assets and assets > 0 else math.nan
+    log_revenue = math.log10(revenue) if revenue and revenue > 0 else math.nan
+    if math.isnan(log_assets) and math.isnan(log_revenue):
+        return None
+    return np.array(
+        [
+            log_assets,
+            log_revenue,
+            _ratio(financials.get("net_income"), revenue, -1.0, 1.0),
+            _ratio(financials.get("operating_income"), revenue, -1.0, 1.0),
+            _ratio(financials.get("liabilities"), assets, 0.0, 2.0),
+        ]
+    )
+
+
+def sic_distance(a: Optional[str], b: Optional[str]) -> float:
+    """0 for the same 4-digit SIC, rising by 0.25 per lost level of the code hierarchy; 0.5 if unknown."""
+    if not a or not b:
+        return 0.5
+    a, b = str(a).zfill(4), str(b).zfill(4)
+    shared = next((i for i in range(4) if a[i] != b[i]), 4)
+    return (4 - shared) / 4.0
+
+
+class _KDTree:
+    """Bucketed KD-tree over a static point set; leaves are contiguous slices scanned with numpy."""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE) -> None:
+        order = np.arange(len(points))
+        # Node arrays: split dimension (-1 for leaves), split value, children, leaf slice bounds.
+        self.dim: List[int] = []
+        self.value: List[float] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.start: List[int] = []
+        self.end: List[int] = []
+        stack = [(self._new_node(0, len(points)), 0, len(points))]
+        while stack:
+            node, start, end = stack.pop()
+            if end - start <= leaf_size:
+                continue
+            block = points[order[start:end]]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (start + end) // 2
+            order[start:end] = order[start:end][np.argpartition(block[:, dim], mid - start)]
+            self.dim[node], self.value[node] = dim, float(points[order[mid], dim])
+            self.left[node], self.right[node] = self._new_node(start, mid), self._new_node(mid, end)
+            stack.extend([(self.left[node], start, mid), (self.right[node], mid, end)])
+        self.order = order
+        self.position = np.empty_like(order)
+        self.position[order] = np.arange(len(order))
+        self.points = np.ascontiguousarray(points[order])
+
+    def _new_node(self, start: int, end: int) -> int:
+        for column, value in ((self.dim, -1), (self.value, 0.0), (self.left, -1), (self.right, -1), (self.start, start), (self.end, end)):
+            column.append(value)
+        return len(self.dim) - 1
+
+    def query(self, x: np.ndarray, k: int, alive: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(squared distances, original row indices) of the k nearest alive points, nearest first."""
+        best_d = np.full(k, np.inf)
+        best_i = np.full(k, -1)
+        worst = 0
+
+        def visit(node: int) -> None:
+            nonlocal best_d, best_i, worst
+            if self.dim[node] < 0:
+                start, end = self.start[node], self.end[node]
+                d = ((self.points[start:end] - x) ** 2).sum(axis=1)
+                d[~alive[start:end]] = np.inf
+                if d.min() >= best_d[worst]:
+                    return
+                all_d = np.concatenate([best_d, d])
+                all_i = np.concatenate([best_i, np.arange(start, end)])
+                keep = np.argpartition(all_d, k - 1)[:k] if len(all_d) > k else np.arange(len(all_d))
+                best_d, best_i = all_d[keep], all_i[keep]
+                worst = int(np.argmax(best_d))
+                return
+            diff = x[self.dim[node]] - self.value[node]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            visit(near)
+            if diff * diff < best_d[worst]:
+                visit(far)
+
+        visit(0)
+        ranked = np.argsort(best_d)
+        found = best_i[ranked] >= 0
+        return best_d[ranked][found], self.order[best_i[ranked][found]]
+
+
+class PeerIndex:
+    """
+    Nearest-neighbour index over company fundamentals. Features are robust-scaled (median/IQR)
+    at each rebuild. Updates made since the last rebuild are masked out of the tree and scanned
+    directly, and the tree is rebuilt once they exceed `rebuild_fraction` of it.
+    """
+
+    def __init__(self, path: Optional[str] = None, rebuild_fraction: float = 0.1) -> None:
+        self.path = Path(path or settings.peer_index_path)
+        self.rebuild_fraction = rebuild_fraction
+        self.companies: Dict[int, Tuple[np.ndarray, str]] = {}
+        self.stats = {"rebuilds": 0, "upserts": 0}
+        self._pending: set = set()
+        self._tree: Optional[_KDTree] = None
+        self._tree_ciks = np.empty(0, dtype=np.int64)
+        self._tree_rows: Dict[int, int] = {}
+        self._alive = np.empty(0, dtype=bool)
+        self._center = np.zeros(len(FEATURES))
+        self._scale = np.ones(len(FEATURES))
+        if self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def _load(self) -> None:
+        try:
+            with np.load(self.path) as payload:
+                companies = {
+                    int(cik): (raw, str(sic))
+                    for cik, raw, sic in zip(payload["ciks"], payload["features"], payload["sics"])
+                }
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as exc:
+            # A bad file only costs the index; SIC scans refill it.
+            logger.warning("Ignoring unreadable peer index %s: %s", self.path, exc)
+            companies = {}
+        self.companies.update(companies)
+        self.rebuild()
+
+    def save(self) -> Path:
+        ciks = list(self.companies)
+        # Concurrent peer stages save too; each writes its own temp file and renames it into place.
+        return atomic_write(
+            self.path,
+            lambda handle: np.savez(
+                handle,
+                ciks=np.array(ciks, dtype=np.int64),
+                features=np.array([self.companies[c][0] for c in ciks]).reshape(-1, len(FEATURES)),
+                sics=np.array([self.companies[c][1] for c in ciks], dtype=str),
+            ),
+        )
+
+    def _embed(self, raw: np.ndarray) -> np.ndarray:
+        # Missing features land on the median (0 after centring) so they neither attract nor repel.
+        return np.nan_to_num((raw - self._center) / self._scale, nan=0.0) * FEATURE_WEIGHTS
+
+    def rebuild(self) -> None:
+        self._pending.clear()
+        self._tree_ciks = np.array(list(self.companies), dtype=np.int64)
+        self._tree_rows = {int(cik): row for row, cik in enumerate(self._tree_ciks)}
+        if not self.companies:
+            self._tree = None
+            self._alive = np.empty(0, dtype=bool)
+            return
+        raw = np.array([self.companies[int(cik)][0] for cik in self._tree_ciks])
+        with np.errstate(all="ignore"):
+            self._center = np.nan_to_num(np.nanmedian(raw, axis=0))
+            iqr = np.nanpercentile(raw, 75, axis=0) - np.nanpercentile(raw, 25, axis=0)
+        self._scale = np.where(np.isfinite(iqr) & (iqr > 1e-9), iqr, 1.0)
+        self._tree = _KDTree(self._embed(raw))
+        self._alive = np.ones(len(self._tree_ciks), dtype=bool)
+        self.stats["rebuilds"] += 1
+
+    def upsert(self, cik: int, financials: Dict[str, Optional[float]], sic: Optional[str] = None) -> bool:
+        """Adds or refreshes one company; returns False when nothing changed."""
+        cik = int(cik)
+        raw = company_features(financials)
+        previous = self.companies.get(cik)
+        sic = str(sic or (previous[1] if previous else ""))
+        if raw is None:
+            if previous is None:
+                return False
+            del self.companies[cik]
+        elif previous is not None and previous[1] == sic and np.array_equal(previous[0], raw, equal_nan=True):
+            return False
+        else:
+            self.companies[cik] = (raw, sic)
+
+        self.stats["upserts"] += 1
+        self._pending.add(cik)
+        if cik in self._tree_rows:
+            self._alive[self._tree.position[self._tree_rows[cik]]] = False
+        if len(self._pending) > max(16, self.rebuild_fraction * len(self._tree_ciks)):
+            self.rebuild()
+        return True
+
+    def nearest(
+        self,
+        cik: Optional[int] = None,
+        financials: Optional[Dict[str, Optional[float]]] = None,
+        k: int = 10,
+        sic: Optional[str] = None,
+        sic_weight: float = 0.0,
+    ) -> List[Dict]:
+        """
+        The k closest companies to an indexed `cik` (or to raw `financials`), nearest first, as
+        {cik, distance, sic}. With `sic_weight` > 0 a wider candidate pool is re-ranked by
+        sqrt(d^2 + sic_weight * sic_distance^2).
+        """
+        if cik is not None and int(cik) in self.companies:
+            raw, own_sic = self.companies[int(cik)]
+            sic = sic or own_sic
+        else:
+            raw = company_features(financials or {})
+            if raw is None:
+                raise ValueError("Need an indexed CIK or financials with assets or revenue")
+        x = self._embed(raw)
+        pool = k * 4 if sic_weight > 0 else k
+        exclude = int(cik) if cik is not None else None
+
+        candidates: Dict[int, float] = {}
+        if self._tree is not None:
+            tree_d, tree_rows = self._tree.query(x, pool + 1, self._alive)
+            candidates.update(zip(self._tree_ciks[tree_rows].tolist(), tree_d.tolist()))
+        pending = [c for c in self._pending if c in self.companies]
+        if pending:
+            pending_points = self._embed(np.array([self.companies[c][0] for c in pending]))
+            candidates.update(zip(pending, ((pending_points - x) ** 2).sum(axis=1).tolist()))
+        candidates.pop(exclude, None)
+
+        ranked = []
+        for peer_cik, squared in candidates.items():
+            peer_sic = self.companies[peer_cik][1]
+            if sic_weight > 0:
+                squared += sic_weight * sic_distance(sic, peer_sic) ** 2
+            ranked.append({"cik": peer_cik, "distance": math.sqrt(squared), "sic": peer_sic})
+        ranked.sort(key=lambda item: item["distance"])
+        return ranked[:k]
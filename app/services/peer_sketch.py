@@ -0,0 +1,260 @@
+import json
+import math
+import random
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.ratio_engine import RATIO_KEYS
+from app.utils.atomic_write import atomic_write_text, file_lock
+from app.utils.logging import get_logger
+
+
+logger = get_logger()
+
+
+class KLLSketch:
+    """
+    Mergeable KLL quantile sketch.
+
+    Error bound: while fewer than ~k values have been added no compaction happens and quantiles
+    are exact (linear interpolation, matching `statistics.median`). Beyond that the normalized
+    rank error is about 1.65% at 99% confidence for k=200 and shrinks roughly as 1/k; memory
+    stays O(k) regardless of how many values are added.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0) -> None:
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+        self._summary: Optional[List] = None
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        while sum(len(items) for items in self.compactors) >= self._max_size():
+            for level, items in enumerate(self.compactors):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items.sort()
+                keep_last = [items.pop()] if len(items) % 2 else []
+                offset = 1 if self._rng.random() < 0.5 else 0
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = keep_last
+                break
+
+    def update(self, value: float) -> None:
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self._summary = None
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._summary = None
+        self._compress()
+
+    def is_exact(self) -> bool:
+        return len(self.compactors) == 1
+
+    def _build_summary(self) -> List:
+        weighted = sorted(
+            (value, 2**level) for level, items in enumerate(self.compactors) for value in items
+        )
+        values, cumulative, total = [], [], 0
+        for value, weight in weighted:
+            total += weight
+            values.append(value)
+            cumulative.append(total)
+        return [values, cumulative, total]
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        q = max(0.0, min(1.0, q))
+        if self.is_exact():
+            values = sorted(self.compactors[0])
+            position = q * (len(values) - 1)
+            lower = int(math.floor(position))
+            upper = min(lower + 1, len(values) - 1)
+            return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+        if self._summary is None:
+            self._summary = self._build_summary()
+        values, cumulative, total = self._summary
+        idx = bisect_left(cumulative, q * total)
+        return values[min(idx, len(values) - 1)]
+
+    def to_dict(self) -> Dict:
+        return {"k": self.k, "seed": self.seed, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "KLLSketch":
+        sketch = cls(k=int(payload.get("k", 200)), seed=int(payload.get("seed", 0)))
+        sketch.n = int(payload.get("n", 0))
+        sketch.compactors = [list(map(float, items)) for items in payload.get("compactors", [[]])] or [[]]
+        sketch._rng = random.Random(sketch.seed + sketch.n)
+        return sketch
+
+
+def _ok_ratio_values(ratios: Dict[str, Dict]) -> Dict[str, Optional[float]]:
+    values: Dict[str, Optional[float]] = {}
+    for key in RATIO_KEYS:
+        payload = ratios.get(key, {})
+        value = payload.get("value")
+        ok = payload.get("quality") == "ok" and isinstance(value, (int, float))
+        values[key] = float(value) if ok else None
+    return values
+
+
+class PeerSketchStore:
+    """
+    Persisted per-SIC, per-ratio quantile sketches.
+
+    New companies are folded into their group's sketches incrementally. KLL sketches cannot
+    delete values, so when a known company's ratios change only the affected SIC groups are
+    rebuilt from the stored per-company ratio values (never from peer companyfacts).
+
+    Several peer stages may save at once, so `save` merges this store's updates into the file
+    on disk under a lock and replaces it atomically; an unreadable file is treated as empty.
+    """
+
+    def __init__(self, path: Optional[str] = None, k: Optional[int] = None) -> None:
+        self.path = Path(path or settings.peer_sketch_path)
+        self.k = k or settings.peer_sketch_k
+        self.companies: Dict[str, Dict] = {}
+        self.sketches: Dict[str, Dict[str, KLLSketch]] = {}
+        self._merged_cache: Dict[str, Dict[str, KLLSketch]] = {}
+        # Companies updated since load, with the SIC they had before (None if new).
+        self._dirty: Dict[str, Optional[str]] = {}
+        self._load()
+
+    def _read(self) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+            return {
+                "k": int(payload.get("k", self.k)),
+                "companies": dict(payload.get("companies", {})),
+                "sketches": {
+                    sic: {ratio: KLLSketch.from_dict(sketch) for ratio, sketch in ratio_map.items()}
+                    for sic, ratio_map in payload.get("sketches", {}).items()
+                },
+            }
+        except (OSError, ValueError, TypeError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable peer sketch file %s: %s", self.path, exc)
+            return None
+
+    def _load(self) -> None:
+        state = self._read()
+        if state is not None:
+            self.k = state["k"]
+            self.companies = state["companies"]
+            self.sketches = state["sketches"]
+
+    def save(self) -> Path:
+        with file_lock(self.path):
+            # Another process may have saved since this store was loaded: keep its companies
+            # and only re-apply ours, rebuilding the groups they touch.
+            disk = self._read()
+            if disk is not None and self._dirty:
+                companies, sketches = disk["companies"], disk["sketches"]
+                affected = set()
+                for cik_key, previous_sic in self._dirty.items():
+                    on_disk = companies.get(cik_key)
+                    companies[cik_key] = self.companies[cik_key]
+                    affected.update(sic for sic in (previous_sic, self.companies[cik_key]["sic"]) if sic)
+                    if on_disk:
+                        affected.add(on_disk["sic"])
+                self.companies, self.sketches = companies, sketches
+                for sic in affected:
+                    self._rebuild_group(sic)
+                self._merged_cache.clear()
+            elif disk is not None:
+                self.companies, self.sketches = disk["companies"], disk["sketches"]
+                self._merged_cache.clear()
+            payload = {
+                "k": self.k,
+                "companies": self.companies,
+                "sketches": {
+                    sic: {ratio: sketch.to_dict() for ratio, sketch in ratio_map.items()}
+                    for sic, ratio_map in self.sketches.items()
+                },
+            }
+            atomic_write_text(self.path, json.dumps(payload))
+        self._dirty.clear()
+        return self.path
+
+    def _new_group(self) -> Dict[str, KLLSketch]:
+        return {key: KLLSketch(k=self.k) for key in RATIO_KEYS}
+
+    def _rebuild_group(self, sic: str) -> None:
+        group = self._new_group()
+        for record in self.companies.values():
+            if record["sic"] != sic:
+                continue
+            for key, value in record["values"].items():
+                if value is not None:
+                    group[key].update(value)
+        self.sketches[sic] = group
+
+    def update_company(self, cik: int, sic: str, ratios: Dict[str, Dict]) -> None:
+        cik_key = str(int(cik))
+        sic = str(sic)
+        values = _ok_ratio_values(ratios)
+        previous = self.companies.get(cik_key)
+        if previous == {"sic": sic, "values": values}:
+            return
+
+        self.companies[cik_key] = {"sic": sic, "values": values}
+        self._dirty.setdefault(cik_key, previous["sic"] if previous else None)
+        self._merged_cache.clear()
+        if previous is None:
+            group = self.sketches.setdefault(sic, self._new_group())
+            for key, value in values.items():
+                if value is not None:
+                    group[key].update(value)
+            return
+
+        for affected_sic in {previous["sic"], sic}:
+            self._rebuild_group(affected_sic)
+
+    def group_sketches(self, sic_prefix: str) -> Dict[str, KLLSketch]:
+        """Returns the sketches for one SIC code, or a merge of every code starting with the prefix."""
+        sic_prefix = str(sic_prefix)
+        if sic_prefix in self._merged_cache:
+            return self._merged_cache[sic_prefix]
+
+        merged = self._new_group()
+        for sic, ratio_map in self.sketches.items():
+            if not sic.startswith(sic_prefix):
+                continue
+            for key, sketch in ratio_map.items():
+                merged[key].merge(sketch)
+        self._merged_cache[sic_prefix] = merged
+        return merged
+
+    def percentile(self, sic_prefix: str, ratio: str, q: float) -> Optional[float]:
+        return self.group_sketches(sic_prefix)[ratio].quantile(q)
+
+    def peer_medians(self, sic_prefix: str) -> Dict[str, Optional[float]]:
+        group = self.group_sketches(sic_prefix)
+        return {key: group[key].quantile(0.5) for key in RATIO_KEYS}
+
+    def company_count(self, sic_prefix: str) -> int:
+        return sum(1 for record in self.companies.values() if record["sic"].startswith(str(sic_prefix)))
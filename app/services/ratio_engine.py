@@ -1,44 +1,202 @@
-from typing import Dict, Optional
+import ast
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
+import numpy as np
 
-def _safe_ratio(numerator: Optional[float], denominator: Optional[float], near_zero: float = 1e-9) -> Dict:
-    if numerator is None or denominator is None:
-        return {"value": None, "quality": "missing_data"}
-    if abs(denominator) <= near_zero:
-        return {"value": None, "quality": "unstable_denominator"}
-    return {"value": numerator / denominator, "quality": "ok"}
+from app.models.compact import RatioQuality, RatioSet
 
 
-def compute_ratios(financials: Dict[str, Optional[float]]) -> Dict[str, Dict]:
-    ratios = {
-        "current_ratio": _safe_ratio(
-            financials.get("current_assets"),
-            financials.get("current_liabilities"),
-        ),
-        "debt_to_equity": _safe_ratio(
-            financials.get("liabilities"),
-            financials.get("equity"),
-        ),
-        "net_margin": _safe_ratio(
-            financials.get("net_income"),
-            financials.get("revenue"),
-        ),
-        "roa": _safe_ratio(
-            financials.get("net_income"),
-            financials.get("assets"),
-        ),
-        "roe": _safe_ratio(
-            financials.get("net_income"),
-            financials.get("equity"),
-        ),
-        "operating_margin": _safe_ratio(
-            financials.get("operating_income"),
-            financials.get("revenue"),
-        ),
-        # Interest coverage is commonly EBIT/interest expense; operating income is a reasonable free-data proxy.
-        "interest_coverage": _safe_ratio(
-            financials.get("operating_income"),
-            financials.get("interest_expense"),
-        ),
+NEAR_ZERO = 1e-9
+
+# Derived metrics, usable by name in ratio expressions. Expressions combine metric names with
+# + - * / and period functions over the period axis (fiscal quarters):
+#   lag(x, n=1)  value n periods earlier
+#   ttm(x)       sum of the last four quarters
+#   avg(x, n=1)  mean of the closing value and the opening value n periods earlier
+DERIVED_METRICS: Dict[str, str] = {
+    "ttm_revenue": "ttm(revenue)",
+    "ttm_net_income": "ttm(net_income)",
+    "ttm_operating_income": "ttm(operating_income)",
+    "avg_assets": "avg(assets, 4)",
+    "avg_equity": "avg(equity, 4)",
+}
+
+# Ratio name -> (numerator expression, denominator expression).
+RATIO_DEFINITIONS: Dict[str, Tuple[str, str]] = {
+    "current_ratio": ("current_assets", "current_liabilities"),
+    "debt_to_equity": ("liabilities", "equity"),
+    "net_margin": ("net_income", "revenue"),
+    "roa": ("net_income", "assets"),
+    "roe": ("net_income", "equity"),
+    "operating_margin": ("operating_income", "revenue"),
+    # Interest coverage is commonly EBIT/interest expense; operating income is a reasonable free-data proxy.
+    "interest_coverage": ("operating_income", "interest_expense"),
+    "ttm_net_margin": ("ttm_net_income", "ttm_revenue"),
+    "ttm_operating_margin": ("ttm_operating_income", "ttm_revenue"),
+    "roa_avg_assets": ("ttm_net_income", "avg_assets"),
+    "roe_avg_equity": ("ttm_net_income", "avg_equity"),
+    "revenue_growth_qoq": ("revenue - lag(revenue)", "lag(revenue)"),
+    "revenue_growth_yoy": ("revenue - lag(revenue, 4)", "lag(revenue, 4)"),
+    "ttm_revenue_growth": ("ttm_revenue - lag(ttm_revenue, 4)", "lag(ttm_revenue, 4)"),
+}
+
+_Node = Callable[[Dict[str, np.ndarray], Dict[str, np.ndarray]], np.ndarray]
+
+
+def _lag(values: np.ndarray, periods: int) -> np.ndarray:
+    shifted = np.full_like(values, np.nan)
+    if periods < values.shape[1]:
+        shifted[:, periods:] = values[:, : values.shape[1] - periods]
+    return shifted
+
+
+def _ttm(values: np.ndarray) -> np.ndarray:
+    result = np.full_like(values, np.nan)
+    if values.shape[1] >= 4:
+        # NaN in any of the four quarters propagates, so partial years stay missing.
+        result[:, 3:] = values[:, 3:] + values[:, 2:-1] + values[:, 1:-2] + values[:, :-3]
+    return result
+
+
+_BINARY_OPS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+class RatioPlan:
+    """
+    Ratio definitions compiled once into vectorized evaluation steps over a company x period
+    panel. Shared subexpressions (e.g. `ttm(revenue)`) are evaluated once per `evaluate` call.
+    """
+
+    def __init__(
+        self,
+        ratio_names: Optional[Sequence[str]] = None,
+        definitions: Optional[Mapping[str, Tuple[str, str]]] = None,
+        derived_metrics: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        definitions = RATIO_DEFINITIONS if definitions is None else definitions
+        self.derived_metrics = DERIVED_METRICS if derived_metrics is None else derived_metrics
+        self.ratio_names = list(ratio_names or definitions)
+        self.base_metrics: List[str] = []
+        self.uses_history = False
+        self._steps = []
+        for name in self.ratio_names:
+            if name not in definitions:
+                raise ValueError(f"Unknown ratio: {name}")
+            numerator, denominator = definitions[name]
+            self._steps.append((self._compile_expression(numerator), self._compile_expression(denominator)))
+
+    def _compile_expression(self, expression: str, seen: Tuple[str, ...] = ()) -> _Node:
+        try:
+            tree = ast.parse(expression, mode="eval").body
+        except SyntaxError as exc:
+            raise ValueError(f"Invalid ratio expression: {expression!r}") from exc
+        return self._compile_node(tree, expression, seen)
+
+    def _compile_node(self, node: ast.AST, expression: str, seen: Tuple[str, ...]) -> _Node:
+        key = ast.dump(node)
+
+        def memoized(compute: Callable[[Dict[str, np.ndarray], Dict[str, np.ndarray]], np.ndarray]) -> _Node:
+            def run(env: Dict[str, np.ndarray], cache: Dict[str, np.ndarray]) -> np.ndarray:
+                if key not in cache:
+                    cache[key] = compute(env, cache)
+                return cache[key]
+
+            return run
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in self.derived_metrics:
+                if name in seen:
+                    raise ValueError(f"Circular derived metric: {name}")
+                inner = self._compile_expression(self.derived_metrics[name], seen + (name,))
+                return memoized(inner)
+            if name not in self.base_metrics:
+                self.base_metrics.append(name)
+            return memoized(lambda env, cache: env[name])
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            op = _BINARY_OPS[type(node.op)]
+            left = self._compile_node(node.left, expression, seen)
+            right = self._compile_node(node.right, expression, seen)
+            return memoized(lambda env, cache: op(left(env, cache), right(env, cache)))
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.args:
+            func = node.func.id
+            arg = self._compile_node(node.args[0], expression, seen)
+            periods = 1
+            if len(node.args) == 2 and isinstance(node.args[1], ast.Constant) and isinstance(node.args[1].value, int):
+                periods = node.args[1].value
+            elif len(node.args) != 1:
+                raise ValueError(f"Invalid arguments to {func}() in {expression!r}")
+            self.uses_history = True
+            if func == "lag":
+                return memoized(lambda env, cache: _lag(arg(env, cache), periods))
+            if func == "avg":
+                return memoized(lambda env, cache: (arg(env, cache) + _lag(arg(env, cache), periods)) / 2.0)
+            if func == "ttm" and len(node.args) == 1:
+                return memoized(lambda env, cache: _ttm(arg(env, cache)))
+
+        raise ValueError(f"Unsupported ratio expression: {expression!r}")
+
+    def evaluate(self, metrics: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `metrics` maps base metric names to (companies, periods) arrays with NaN for missing
+        values; 1-D arrays are treated as a single period. Returns (values, quality) arrays of
+        shape (companies, periods, ratios); quality holds `RatioQuality` codes.
+        """
+        shape = None
+        env: Dict[str, np.ndarray] = {}
+        for name in self.base_metrics:
+            if name not in metrics:
+                continue
+            array = np.asarray(metrics[name], dtype=np.float64)
+            env[name] = array.reshape(-1, 1) if array.ndim == 1 else array
+            shape = env[name].shape
+        if shape is None:
+            raise ValueError("No metric arrays provided for this plan")
+        for name in self.base_metrics:
+            env.setdefault(name, np.full(shape, np.nan))
+
+        # Ratio-major buffers keep each step's writes contiguous; the result is a transposed view.
+        values = np.empty((len(self._steps),) + shape)
+        quality = np.empty((len(self._steps),) + shape, dtype=np.uint8)
+        cache: Dict[str, np.ndarray] = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for idx, (numerator_fn, denominator_fn) in enumerate(self._steps):
+                numerator = numerator_fn(env, cache)
+                denominator = denominator_fn(env, cache)
+                np.divide(numerator, denominator, out=values[idx])
+                missing = np.isnan(numerator)
+                missing |= np.isnan(denominator)
+                # OK (0) or UNSTABLE_DENOMINATOR (2), then MISSING_DATA (1) takes precedence.
+                np.multiply(np.abs(denominator) <= NEAR_ZERO, int(RatioQuality.UNSTABLE_DENOMINATOR), out=quality[idx], casting="unsafe")
+                np.copyto(quality[idx], int(RatioQuality.MISSING_DATA), where=missing)
+                np.copyto(values[idx], np.nan, where=quality[idx] != RatioQuality.OK)
+        return np.moveaxis(values, 0, -1), np.moveaxis(quality, 0, -1)
+
+
+# Ratios computable from one set of point-in-time financials (no period history).
+RATIO_KEYS: List[str] = [name for name in RATIO_DEFINITIONS if not RatioPlan([name]).uses_history]
+SNAPSHOT_PLAN = RatioPlan(RATIO_KEYS)
+
+
+def compute_ratio_set(ciks: Sequence[int], financials: Sequence[Dict[str, Optional[float]]]) -> RatioSet:
+    """Point-in-time ratios for many companies in one vectorized pass."""
+    if not financials:
+        empty = np.empty((0, len(RATIO_KEYS)))
+        return RatioSet(np.asarray(ciks, dtype=np.int64), RATIO_KEYS, empty, empty.astype(np.uint8))
+    metrics = {
+        name: np.array([f.get(name) if f.get(name) is not None else np.nan for f in financials], dtype=np.float64)
+        for name in SNAPSHOT_PLAN.base_metrics
     }
-    return ratios
+    values, quality = SNAPSHOT_PLAN.evaluate(metrics)
+    return RatioSet(
+        np.asarray(ciks, dtype=np.int64),
+        RATIO_KEYS,
+        np.ascontiguousarray(values[:, 0, :]),
+        np.ascontiguousarray(quality[:, 0, :]),
+    )
+
+
+def compute_ratios(financials: Dict[str, Optional[float]]) -> Dict[str, Dict]:
+    return compute_ratio_set([0], [financials]).ratio_map(0)
@@ -0,0 +1,174 @@
+import operator
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.ratio_engine import RATIO_KEYS, compute_ratio_set
+
+
+WINSOR_LIMITS = (0.05, 0.95)
+
+_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_CLAUSE_PATTERN = re.compile(
+    r"^(?P<ratio>[a-z_]+)\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<value>p\d{1,2}(?:\.\d+)?|-?\d+(?:\.\d+)?)"
+    r"(?:\s+within\s+sic\s+(?P<sic>\d{1,4}))?$",
+    re.IGNORECASE,
+)
+
+
+def build_ratio_frame(rows: List[Dict]) -> pd.DataFrame:
+    """
+    Builds a company x ratio matrix from rows of {"cik", "ticker", "sic", "ratios"}.
+    Ratios whose quality is not `ok` become NaN so group statistics skip them.
+    """
+    records = []
+    for row in rows:
+        ratios = row.get("ratios", {})
+        record = {
+            "cik": int(row.get("cik", 0)),
+            "ticker": str(row.get("ticker", "")).upper(),
+            "sic": str(row.get("sic", "")),
+        }
+        for key in RATIO_KEYS:
+            payload = ratios.get(key, {})
+            value = payload.get("value")
+            ok = payload.get("quality") == "ok" and isinstance(value, (int, float))
+            record[key] = float(value) if ok else np.nan
+        records.append(record)
+
+    frame = pd.DataFrame.from_records(records, columns=["cik", "ticker", "sic", *RATIO_KEYS])
+    frame[RATIO_KEYS] = frame[RATIO_KEYS].astype("float64")
+    return frame.set_index("cik")
+
+
+def ratio_set_to_frame(ratio_set, tickers: List[str], sics: List[str]) -> pd.DataFrame:
+    """Builds the same matrix as `build_ratio_frame` straight from an array-backed `RatioSet`."""
+    frame = pd.DataFrame(ratio_set.ok_values(), columns=list(ratio_set.ratio_keys))
+    frame.insert(0, "sic", [str(sic) for sic in sics])
+    frame.insert(0, "ticker", [str(ticker).upper() for ticker in tickers])
+    frame.insert(0, "cik", ratio_set.ciks)
+    return frame.set_index("cik")
+
+
+def compute_group_statistics(frame: pd.DataFrame, group_col: str = "sic") -> pd.DataFrame:
+    """
+    Adds per-group percentile (`<ratio>_pct`), z-score (`<ratio>_z`), descending rank (`<ratio>_rank`)
+    and winsorized group mean (`<ratio>_wmean`) columns for every ratio in one grouped pass.
+    """
+    values = frame[RATIO_KEYS]
+    grouped = values.groupby(frame[group_col], sort=False)
+
+    pct = grouped.rank(pct=True)
+    rank = grouped.rank(ascending=False, method="min")
+    mean = grouped.transform("mean")
+    std = grouped.transform("std", ddof=0)
+    zscore = (values - mean) / std.replace(0.0, np.nan)
+
+    lower = grouped.transform("quantile", WINSOR_LIMITS[0])
+    upper = grouped.transform("quantile", WINSOR_LIMITS[1])
+    winsorized = values.clip(lower=lower, upper=upper, axis=None)
+    wmean = winsorized.groupby(frame[group_col], sort=False).transform("mean")
+
+    stats = pd.concat(
+        [
+            pct.add_suffix("_pct"),
+            zscore.add_suffix("_z"),
+            rank.add_suffix("_rank"),
+            wmean.add_suffix("_wmean"),
+        ],
+        axis=1,
+    )
+    return frame.join(stats)
+
+
+def parse_screen_expression(expression: str) -> List[Dict]:
+    clauses = []
+    for raw_clause in re.split(r"\s+and\s+", expression.strip(), flags=re.IGNORECASE):
+        match = _CLAUSE_PATTERN.match(raw_clause.strip())
+        if not match:
+            raise ValueError(f"Invalid screen clause: {raw_clause!r}")
+        ratio = match.group("ratio").lower()
+        if ratio not in RATIO_KEYS:
+            raise ValueError(f"Unknown ratio in screen: {ratio}")
+
+        raw_value = match.group("value").lower()
+        percentile = raw_value.startswith("p")
+        clauses.append(
+            {
+                "ratio": ratio,
+                "op": match.group("op"),
+                "value": float(raw_value[1:]) / 100.0 if percentile else float(raw_value),
+                "percentile": percentile,
+                "sic": match.group("sic"),
+            }
+        )
+    return clauses
+
+
+class ScreeningEngine:
+    """Cross-sectional screens over a precomputed universe ratio matrix."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = compute_group_statistics(frame)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "ScreeningEngine":
+        return cls(build_ratio_frame(rows))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict) -> "ScreeningEngine":
+        """Screens a frames universe snapshot (`universe_snapshot`), grouped by its stored SIC codes."""
+        ciks = list(snapshot["financials"])
+        ratio_set = compute_ratio_set(ciks, [snapshot["financials"][cik] for cik in ciks])
+        tickers = [snapshot.get("ticker_by_cik", {}).get(cik, "") for cik in ciks]
+        sics = [snapshot.get("sic_by_cik", {}).get(cik, "") for cik in ciks]
+        return cls(ratio_set_to_frame(ratio_set, tickers, sics))
+
+    def query(self, expression: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Filters the universe, e.g. "net_margin > p75 within SIC 3571 and debt_to_equity < 1".
+        `pNN` compares against the company's percentile inside its own SIC group; `within SIC`
+        restricts that clause to SIC codes starting with the given prefix.
+        """
+        mask = np.ones(len(self.frame), dtype=bool)
+        for clause in parse_screen_expression(expression):
+            column = f"{clause['ratio']}_pct" if clause["percentile"] else clause["ratio"]
+            series = self.frame[column].to_numpy()
+            with np.errstate(invalid="ignore"):
+                clause_mask = _OPERATORS[clause["op"]](series, clause["value"])
+            clause_mask &= ~np.isnan(series)
+            if clause["sic"]:
+                clause_mask &= self.frame["sic"].str.startswith(clause["sic"]).to_numpy()
+            mask &= clause_mask
+
+        result = self.frame[mask]
+        if columns:
+            result = result[["ticker", "sic", *columns]]
+        return result
+
+    def group_summary(self, sic: str) -> Dict[str, Dict[str, Optional[float]]]:
+        group = self.frame[self.frame["sic"] == str(sic)]
+        summary: Dict[str, Dict[str, Optional[float]]] = {}
+        for key in RATIO_KEYS:
+            values = group[key].dropna()
+            if values.empty:
+                summary[key] = {"count": 0, "median": None, "p25": None, "p75": None, "winsorized_mean": None}
+                continue
+            summary[key] = {
+                "count": int(values.size),
+                "median": float(values.median()),
+                "p25": float(values.quantile(0.25)),
+                "p75": float(values.quantile(0.75)),
+                "winsorized_mean": float(group[f"{key}_wmean"].iloc[0]),
+            }
+        return summary
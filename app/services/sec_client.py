@@ -1,3 +1,4 @@
+import threading
 import time
 from typing import Dict, List, Optional
 
@@ -7,28 +8,57 @@ from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_ex
 from app.config import settings
 from app.models.schemas import CompanyIdentity, FilingMetadata
 from app.utils.logging import get_logger
+from app.utils.singleflight import SingleFlight
 
 
 logger = get_logger()
 
+# Process-wide so separate SECClient instances (peers, UI, jobs) share in-flight requests.
+SEC_FLIGHTS = SingleFlight()
+
+_http_lock = threading.Lock()
+_http_stats = {"http_requests": 0, "http_errors": 0, "http_throttled": 0}
+
+
+def _count_response(status_code: int) -> None:
+    with _http_lock:
+        _http_stats["http_requests"] += 1
+        if status_code >= 400:
+            _http_stats["http_errors"] += 1
+        if status_code == 429:
+            _http_stats["http_throttled"] += 1
+
 
 class RateLimiter:
-    """Simple per-process limiter to respect SEC fair access usage."""
+    """
+    Per-process limiter to respect SEC fair access usage. Thread-safe: each caller reserves the
+    next free slot, so a limiter shared by several threads still spaces all their requests.
+    """
 
     def __init__(self, max_per_second: float) -> None:
         self.min_interval = 1.0 / max_per_second if max_per_second > 0 else 0.2
-        self._last_called = 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.waited_seconds = 0.0
 
     def wait(self) -> None:
-        now = time.monotonic()
-        elapsed = now - self._last_called
-        if elapsed < self.min_interval:
-            time.sleep(self.min_interval - elapsed)
-        self._last_called = time.monotonic()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            self.calls += 1
+            self.waited_seconds += slot - now
+        if slot > now:
+            time.sleep(slot - now)
+
+    def set_rate(self, max_per_second: float) -> None:
+        with self._lock:
+            self.min_interval = 1.0 / max_per_second if max_per_second > 0 else 0.2
 
 
 class SECClient:
-    def __init__(self) -> None:
+    def __init__(self, www_base_url: Optional[str] = None, data_base_url: Optional[str] = None) -> None:
         self.session = requests.Session()
         self.session.headers.update(
             {
@@ -38,6 +68,9 @@ class SECClient:
         )
         self.timeout = settings.sec_timeout_seconds
         self.rate_limiter = RateLimiter(settings.sec_rate_limit_per_sec)
+        # Overridable so load tests can point the client at a local EDGAR stand-in.
+        self.www_base_url = (www_base_url or settings.sec_www_base_url).rstrip("/")
+        self.data_base_url = (data_base_url or settings.sec_data_base_url).rstrip("/")
 
     @retry(
         reraise=True,
@@ -45,11 +78,8 @@ class SECClient:
         wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
         retry=retry_if_exception_type((requests.RequestException, ValueError)),
     )
-    def _get_json(self, url: str) -> Dict:
-        self.rate_limiter.wait()
-        response = self.session.get(url, timeout=self.timeout)
-        response.raise_for_status()
-        return response.json()
+    def _fetch_json(self, url: str) -> Dict:
+        return self._send(url).json()
 
     @retry(
         reraise=True,
@@ -57,26 +87,58 @@ class SECClient:
         wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
         retry=retry_if_exception_type((requests.RequestException, ValueError)),
     )
-    def _get_text(self, url: str) -> str:
+    def _fetch_text(self, url: str) -> str:
+        return self._send(url).text
+
+    def _send(self, url: str):
         self.rate_limiter.wait()
         response = self.session.get(url, timeout=self.timeout)
+        _count_response(getattr(response, "status_code", 200))
         response.raise_for_status()
-        return response.text
+        return response
+
+    def _get_json(self, url: str) -> Dict:
+        return SEC_FLIGHTS.do(("json", url), lambda: self._fetch_json(url))
+
+    def _get_text(self, url: str) -> str:
+        return SEC_FLIGHTS.do(("text", url), lambda: self._fetch_text(url))
+
+    async def _get_json_async(self, url: str) -> Dict:
+        return await SEC_FLIGHTS.do_async(("json", url), lambda: self._fetch_json(url))
+
+    async def _get_text_async(self, url: str) -> str:
+        return await SEC_FLIGHTS.do_async(("text", url), lambda: self._fetch_text(url))
+
+    @staticmethod
+    def request_metrics() -> Dict[str, int]:
+        """
+        `executed` SEC fetches vs. `coalesced` callers that shared an in-flight fetch, plus HTTP
+        attempts (retries included), error responses and 429s.
+        """
+        with _http_lock:
+            http_stats = dict(_http_stats)
+        return {**SEC_FLIGHTS.stats(), **http_stats}
+
+    @staticmethod
+    def reset_request_metrics() -> None:
+        SEC_FLIGHTS.reset_stats()
+        with _http_lock:
+            for key in _http_stats:
+                _http_stats[key] = 0
 
     @staticmethod
     def _normalize_cik(cik: int) -> str:
         return f"{int(cik):010d}"
 
-    @staticmethod
-    def _build_archive_filing_url(cik_int: int, accession_number: str, primary_doc: str) -> str:
+    def _build_archive_filing_url(self, cik_int: int, accession_number: str, primary_doc: str) -> str:
         accession_no_dash = accession_number.replace("-", "")
         return (
-            f"https://www.sec.gov/Archives/edgar/data/{int(cik_int)}/"
+            f"{self.www_base_url}/Archives/edgar/data/{int(cik_int)}/"
             f"{accession_no_dash}/{primary_doc}"
         )
 
     def get_ticker_mapping(self) -> List[Dict]:
-        data = self._get_json("https://www.sec.gov/files/company_tickers.json")
+        data = self._get_json(f"{self.www_base_url}/files/company_tickers.json")
         # SEC returns numeric-string keys; values are mapping records.
         return list(data.values())
 
@@ -94,10 +156,14 @@ class SECClient:
         return None
 
     def get_submissions(self, cik_10: str) -> Dict:
-        return self._get_json(f"https://data.sec.gov/submissions/CIK{cik_10}.json")
+        return self._get_json(f"{self.data_base_url}/submissions/CIK{cik_10}.json")
 
     def get_company_facts(self, cik_10: str) -> Dict:
-        return self._get_json(f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik_10}.json")
+        return self._get_json(f"{self.data_base_url}/api/xbrl/companyfacts/CIK{cik_10}.json")
+
+    def get_frame(self, concept: str, period: str, unit: str = "USD", taxonomy: str = "us-gaap") -> Dict:
+        """One concept for every filer in one calendar period, e.g. period `CY2023` or `CY2023Q4I`."""
+        return self._get_json(f"{self.data_base_url}/api/xbrl/frames/{taxonomy}/{concept}/{unit}/{period}.json")
 
     def get_latest_filing(self, cik_10: str, preferred_form: str = "10-K") -> Optional[FilingMetadata]:
         submissions = self.get_submissions(cik_10)
@@ -107,6 +173,7 @@ class SECClient:
         filing_dates = recent.get("filingDate", [])
         accession_numbers = recent.get("accessionNumber", [])
         primary_documents = recent.get("primaryDocument", [])
+        report_dates = recent.get("reportDate", [])
 
         if not forms:
             return None
@@ -131,9 +198,38 @@ class SECClient:
                     cik_10=cik_10,
                     cik_int=cik_int,
                     filing_url=filing_url,
+                    report_date=(report_dates[idx] if idx < len(report_dates) else None) or None,
                 )
 
         return None
 
+    def get_filings(self, cik_10: str, form: str, limit: int = 5) -> List[FilingMetadata]:
+        """Recent filings of exactly `form`, newest first as listed in submissions."""
+        recent = self.get_submissions(cik_10).get("filings", {}).get("recent", {})
+        forms = recent.get("form", [])
+        report_dates = recent.get("reportDate", [])
+        filings: List[FilingMetadata] = []
+        cik_int = int(cik_10)
+        for idx, candidate_form in enumerate(forms):
+            if candidate_form != form:
+                continue
+            accession_number = recent["accessionNumber"][idx]
+            primary_doc = recent["primaryDocument"][idx]
+            filings.append(
+                FilingMetadata(
+                    form=candidate_form,
+                    filing_date=recent["filingDate"][idx],
+                    accession_number=accession_number,
+                    primary_document=primary_doc,
+                    cik_10=cik_10,
+                    cik_int=cik_int,
+                    filing_url=self._build_archive_filing_url(cik_int, accession_number, primary_doc),
+                    report_date=(report_dates[idx] if idx < len(report_dates) else None) or None,
+                )
+            )
+            if len(filings) >= limit:
+                break
+        return filings
+
     def get_filing_text(self, filing_url: str) -> str:
         return self._get_text(filing_url)
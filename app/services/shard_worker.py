@@ -0,0 +1,167 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services import job_queue
+from app.services.llm_scheduler import PRIORITY_BATCH
+from app.services.sec_client import RateLimiter
+from app.services.work_queue import WorkItem, WorkQueue, default_node_id
+from app.utils.logging import get_logger
+
+
+logger = get_logger()
+
+STAGE_NAMES = [name for name, _, _, _ in job_queue.DEFAULT_STAGES]
+
+
+def enqueue_run(
+    queue: WorkQueue, run_id: str, tickers: Sequence[str], form: str = "10-K", stages: Sequence[str] = ("analysis",)
+) -> int:
+    """Coordinator side: one work item per ticker. `analysis` always runs first, so it is implied."""
+    unknown = set(stages) - set(STAGE_NAMES)
+    if unknown:
+        raise ValueError(f"unknown stages: {sorted(unknown)}")
+    stage_list = ["analysis"] + [name for name in STAGE_NAMES if name in stages and name != "analysis"]
+    return queue.enqueue(run_id, [(ticker, form, stage_list) for ticker in tickers])
+
+
+def result_payload(results: Dict, errors: Dict[str, str]) -> Dict:
+    """JSON-safe subset of the stage results; section records and raw diffs stay on the node."""
+    analysis = results["analysis"]
+    payload = {
+        "identity": analysis["identity"].model_dump(mode="json"),
+        "filing": analysis["filing"].model_dump(mode="json"),
+        "financials": analysis["financials"],
+        "financials_source": analysis["financials_source"],
+        "ratios": analysis["ratios"],
+        "summary": analysis["summary"],
+        "errors": errors,
+    }
+    for name in ("fast_insights", "insights", "forensic", "peer"):
+        if name in results:
+            payload[name] = results[name]
+    if results.get("changes"):
+        changes = results["changes"]
+        payload["changes"] = {key: changes[key] for key in ("prior_accession_number", "prior_filing_date", "summary")}
+    return payload
+
+
+class ShardWorker:
+    """
+    One node of a sharded batch run. Leases items from the shared `WorkQueue`, heartbeats the lease
+    while the stages run, and writes the payload back to the queue's result table. Stages run
+    in-process, so the LLM stage uses this node's Ollama and scheduler and LLM throughput grows
+    with the number of nodes. SEC requests are not allowed to grow with it: every stage on this
+    node shares one limiter, set to `global_sec_rate / live nodes` and refreshed on each lease and
+    heartbeat as nodes join or leave.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        node_id: Optional[str] = None,
+        global_sec_rate: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        retry_delay_seconds: float = 30.0,
+        stages: Optional[List[Tuple[str, Callable, Optional[str], bool]]] = None,
+    ) -> None:
+        self.queue = queue
+        self.node_id = node_id or default_node_id()
+        self.global_sec_rate = global_sec_rate or settings.sec_rate_limit_per_sec
+        self.heartbeat_seconds = heartbeat_seconds or settings.shard_heartbeat_seconds
+        self.retry_delay_seconds = retry_delay_seconds
+        self.stages = stages or job_queue.DEFAULT_STAGES
+        self.rate_limiter = RateLimiter(self.global_sec_rate)
+        self.stats = {"completed": 0, "failed": 0, "lost_leases": 0}
+        self._stats_lock = threading.Lock()
+
+    def sec_rate_share(self) -> float:
+        live = set(self.queue.live_nodes()) | {self.node_id}
+        return self.global_sec_rate / len(live)
+
+    def _refresh_rate(self) -> None:
+        self.rate_limiter.set_rate(self.sec_rate_share())
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _heartbeat(self, item: WorkItem, stop: threading.Event, lost: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_seconds):
+            if not self.queue.heartbeat(item.item_id, self.node_id):
+                lost.set()
+                return
+            self._refresh_rate()
+
+    def run_item(self, item: WorkItem) -> Dict:
+        request = {
+            "ticker": item.ticker,
+            "preferred_form": item.form,
+            "llm_priority": PRIORITY_BATCH,
+            "llm_deadline_at": job_queue.llm_deadline_at(PRIORITY_BATCH),
+            "job_id": f"{item.run_id}:{item.item_id}",
+        }
+        results: Dict = {}
+        errors: Dict[str, str] = {}
+        for name, stage_fn, _, required in self.stages:
+            if name not in item.stages:
+                continue
+            try:
+                results[name] = stage_fn(request, dict(results))
+            except Exception as exc:  # noqa: BLE001
+                if required:
+                    raise
+                logger.warning("Optional stage %s failed for %s: %s", name, item.ticker, exc)
+                errors[name] = str(exc)
+                results[name] = None
+        return result_payload(results, errors)
+
+    def process(self, item: WorkItem) -> None:
+        stop, lost = threading.Event(), threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(item, stop, lost), name="shard-heartbeat", daemon=True)
+        beat.start()
+        try:
+            payload = self.run_item(item)
+        except Exception as exc:  # noqa: BLE001
+            stop.set()
+            beat.join()
+            logger.warning("Work item %s (%s) failed on %s: %s", item.item_id, item.ticker, self.node_id, exc)
+            status = self.queue.fail(item, self.node_id, str(exc), retry_delay_seconds=self.retry_delay_seconds)
+            # "lost": the item was reclaimed by another node meanwhile, so this failure was not recorded.
+            self._count("lost_leases" if status == "lost" else "failed")
+            return
+        stop.set()
+        beat.join()
+        # A lost lease means another node has taken the item over; its result wins.
+        if lost.is_set() or not self.queue.complete(item, self.node_id, payload):
+            self._count("lost_leases")
+            return
+        self._count("completed")
+
+    def run(self, run_id: Optional[str] = None, concurrency: int = 1, stop_when_idle: bool = True, idle_poll_seconds: float = 5.0) -> Dict:
+        """Processes items with `concurrency` threads until the queue is drained (or forever)."""
+        job_queue.use_node_sec_rate_limiter(self.rate_limiter)
+
+        def loop() -> None:
+            while True:
+                self._refresh_rate()
+                item = self.queue.lease(self.node_id, run_id=run_id)
+                if item is None:
+                    progress = self.queue.progress(run_id) if run_id else None
+                    if stop_when_idle and (progress is None or progress["leased"] + progress["queued"] == 0):
+                        return
+                    # Retries are delayed, and other nodes' leases may still expire or fail back into the queue.
+                    time.sleep(idle_poll_seconds)
+                    continue
+                self.process(item)
+
+        threads = [threading.Thread(target=loop, name=f"shard-worker-{i}") for i in range(max(1, concurrency))]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            job_queue.use_node_sec_rate_limiter(None)
+        return {"node_id": self.node_id, **self.stats}
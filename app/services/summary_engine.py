@@ -13,6 +13,26 @@ def _fmt_num(value: Optional[float]) -> str:
     return f"{value:.2f}"
 
 
+def _forensic_line(forensic: Dict) -> Optional[str]:
+    scores = forensic.get("scores", {})
+    parts = []
+    for key, label, fmt in (
+        ("beneish_m", "Beneish M-score", _fmt_num),
+        ("altman_z", "Altman Z'", _fmt_num),
+        ("piotroski_f", "Piotroski F-score", lambda value: f"{value:.0f}/9"),
+        ("accruals_ratio", "Accruals ratio", _fmt_pct),
+    ):
+        payload = scores.get(key, {})
+        value = payload.get("value")
+        if not isinstance(value, (int, float)):
+            continue
+        signal = payload.get("signal")
+        parts.append(f"{label} {fmt(value)}" + (f" ({signal})" if signal else ""))
+    if not parts:
+        return None
+    return f"Forensic scores (FY{forensic.get('fiscal_year', 'n/a')}): " + ", ".join(parts) + "."
+
+
 def build_investment_summary(
     company_name: str,
     ticker: str,
@@ -20,6 +40,7 @@ def build_investment_summary(
     ratios: Dict[str, Dict],
     insights: Optional[Dict] = None,
     peer_comparison: Optional[Dict[str, Dict]] = None,
+    forensic: Optional[Dict] = None,
 ) -> str:
     lines = [
         f"{company_name} ({ticker}) analysis based on latest {filing_form}.",
@@ -45,6 +66,10 @@ def build_investment_summary(
         else:
             lines.append("Peer comparison is limited due to sparse peer data.")
 
+    if forensic:
+        forensic_line = _forensic_line(forensic)
+        lines.append(forensic_line or "Forensic scores are unavailable due to sparse XBRL history.")
+
     if insights:
         red_flags = insights.get("red_flags", [])[:2]
         revenue_trends = insights.get("revenue_trends", [])[:2]
@@ -64,6 +89,7 @@ def build_markdown_report(
     insights: Optional[Dict] = None,
     peer_comparison: Optional[Dict[str, Dict]] = None,
     summary_text: str = "",
+    forensic: Optional[Dict] = None,
 ) -> str:
     lines = [
         f"# Financial Statement Analysis Report: {company_name} ({ticker})",
@@ -91,6 +117,17 @@ def build_markdown_report(
                 f"delta={payload.get('delta_vs_peer', 'n/a')}"
             )
 
+    if forensic:
+        lines.extend(["", f"## Forensic Scores (FY{forensic.get('fiscal_year', 'n/a')})"])
+        for score_name, payload in forensic.get("scores", {}).items():
+            lines.append(
+                f"- {score_name}: value={payload.get('value', 'n/a')} | quality={payload.get('quality', 'n/a')}"
+                f" | signal={payload.get('signal') or 'n/a'}"
+            )
+        weak = [name for name, payload in forensic.get("components", {}).items() if payload.get("quality") != "ok"]
+        if weak:
+            lines.append(f"- components without usable data: {', '.join(weak)}")
+
     if insights:
         lines.extend(["", "## AI Insights"])
         for key in [
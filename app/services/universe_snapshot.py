@@ -0,0 +1,153 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from app.config import settings
+from app.services.ratio_engine import compute_ratio_set
+from app.services.xbrl_mapper import CONCEPT_MAP
+from app.utils.atomic_write import atomic_write_text
+from app.utils.logging import get_logger
+
+
+logger = get_logger()
+
+# Balance-sheet metrics are point-in-time values and use instant frames (`...I`).
+INSTANT_METRICS = {"assets", "liabilities", "equity", "current_assets", "current_liabilities"}
+
+# Snapshot fields keyed by CIK; JSON turns the keys into strings, so they are converted back on load.
+CIK_KEYED_FIELDS = ("financials", "entity_names", "sic_by_cik", "ticker_by_cik")
+
+_loaded: Dict[str, Tuple[float, Dict]] = {}
+
+
+def frame_period(metric: str, fiscal_year: int, quarter: Optional[int] = None) -> str:
+    if metric in INSTANT_METRICS:
+        return f"CY{int(fiscal_year)}Q{int(quarter or 4)}I"
+    if quarter:
+        return f"CY{int(fiscal_year)}Q{int(quarter)}"
+    return f"CY{int(fiscal_year)}"
+
+
+def build_universe_snapshot(sec_client, fiscal_year: int, quarter: Optional[int] = None) -> Dict:
+    """
+    Assembles `CONCEPT_MAP` metrics for every filer in one period from SEC frames, one request
+    per concept. Fallback concepts only fill companies the earlier concepts did not cover.
+    """
+    financials: Dict[int, Dict[str, Optional[float]]] = {}
+    entity_names: Dict[int, str] = {}
+    frames_fetched = 0
+
+    for metric, concepts in CONCEPT_MAP.items():
+        period = frame_period(metric, fiscal_year, quarter)
+        for concept in concepts:
+            try:
+                frame = sec_client.get_frame(concept, period)
+            except (requests.RequestException, ValueError) as exc:
+                logger.warning("Frame %s/%s unavailable: %s", concept, period, exc)
+                continue
+            frames_fetched += 1
+
+            for point in frame.get("data", []):
+                try:
+                    cik = int(point["cik"])
+                    value = float(point["val"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                company = financials.setdefault(cik, {key: None for key in CONCEPT_MAP})
+                if company[metric] is None:
+                    company[metric] = value
+                if point.get("entityName"):
+                    entity_names.setdefault(cik, point["entityName"])
+
+    return {
+        "fiscal_year": int(fiscal_year),
+        "quarter": quarter,
+        "financials": financials,
+        "entity_names": entity_names,
+        "sic_by_cik": {},
+        "ticker_by_cik": {},
+        "frames_fetched": frames_fetched,
+    }
+
+
+def attach_company_metadata(sec_client, snapshot: Dict, prior: Optional[Dict] = None, max_workers: Optional[int] = None) -> int:
+    """
+    Adds tickers (one ticker-mapping request) and SIC codes to the snapshot. SIC codes known to
+    `prior` are reused, so only companies new to the universe cost a submissions request.
+    Returns the number of submissions requests made.
+    """
+    tickers: Dict[int, str] = {}
+    for row in sec_client.get_ticker_mapping():
+        tickers.setdefault(int(row.get("cik_str", 0)), str(row.get("ticker", "")).upper())
+
+    known = (prior or {}).get("sic_by_cik", {})
+    sic_by_cik = {cik: known[cik] for cik in snapshot["financials"] if cik in known}
+    missing = [cik for cik in snapshot["financials"] if cik not in sic_by_cik]
+
+    def fetch_sic(cik: int) -> Tuple[int, Optional[str]]:
+        try:
+            return cik, str(sec_client.get_submissions(f"{cik:010d}").get("sic", ""))
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("Submissions for CIK %s unavailable: %s", cik, exc)
+            return cik, None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or settings.peer_max_workers)) as executor:
+        for cik, sic in executor.map(fetch_sic, missing):
+            if sic is not None:
+                sic_by_cik[cik] = sic
+
+    snapshot["sic_by_cik"] = sic_by_cik
+    snapshot["ticker_by_cik"] = {cik: tickers[cik] for cik in snapshot["financials"] if cik in tickers}
+    return len(missing)
+
+
+def save_universe_snapshot(snapshot: Dict, path: Optional[str] = None) -> Path:
+    path = Path(path or settings.universe_snapshot_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return atomic_write_text(path, json.dumps(snapshot))
+
+
+def load_universe_snapshot(path: Optional[str] = None) -> Optional[Dict]:
+    """The saved snapshot, or None when none has been built. Reparsed only when the file changes."""
+    path = Path(path or settings.universe_snapshot_path)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(str(path))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    snapshot = {**raw, **{field: {int(cik): value for cik, value in raw.get(field, {}).items()} for field in CIK_KEYED_FIELDS}}
+    _loaded[str(path)] = (mtime, snapshot)
+    return snapshot
+
+
+def snapshot_ratio_maps(snapshot: Dict) -> Dict[int, Dict[str, Dict]]:
+    ciks = list(snapshot["financials"])
+    ratio_set = compute_ratio_set(ciks, [snapshot["financials"][cik] for cik in ciks])
+    return dict(zip(ciks, ratio_set.to_ratio_maps()))
+
+
+def snapshot_ratio_rows(
+    snapshot: Dict,
+    sic_by_cik: Optional[Dict[int, str]] = None,
+    ticker_by_cik: Optional[Dict[int, str]] = None,
+) -> List[Dict]:
+    """Rows in the shape `screening_engine.build_ratio_frame` expects; SIC and tickers default to the snapshot's."""
+    sic_by_cik = snapshot.get("sic_by_cik", {}) if sic_by_cik is None else sic_by_cik
+    ticker_by_cik = snapshot.get("ticker_by_cik", {}) if ticker_by_cik is None else ticker_by_cik
+    rows = []
+    for cik, ratios in snapshot_ratio_maps(snapshot).items():
+        rows.append(
+            {
+                "cik": cik,
+                "ticker": ticker_by_cik.get(cik, ""),
+                "sic": sic_by_cik.get(cik, ""),
+                "ratios": ratios,
+            }
+        )
+    return rows
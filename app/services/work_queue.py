@@ -0,0 +1,242 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    form TEXT NOT NULL,
+    stages TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    failed_nodes TEXT NOT NULL DEFAULT '[]',
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (run_id, ticker, form)
+);
+CREATE INDEX IF NOT EXISTS work_items_claim ON work_items (status, available_at);
+CREATE TABLE IF NOT EXISTS results (
+    item_id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    form TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    items_done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkItem:
+    __slots__ = ("item_id", "run_id", "ticker", "form", "stages", "attempts")
+
+    def __init__(self, item_id: int, run_id: str, ticker: str, form: str, stages: List[str], attempts: int) -> None:
+        self.item_id = item_id
+        self.run_id = run_id
+        self.ticker = ticker
+        self.form = form
+        self.stages = stages
+        self.attempts = attempts
+
+
+class WorkQueue:
+    """
+    Leased work queue in one SQLite file that every node opens (e.g. on a shared disk). A claim
+    is a single `BEGIN IMMEDIATE` transaction, so two nodes never lease the same item. Leases
+    expire unless heartbeated, and an expired item becomes claimable again; the reclaim counts as
+    an attempt. Failed items are retried with a delay, preferably by a node that has not failed
+    them yet.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path or settings.shard_queue_path)
+        self.lease_seconds = lease_seconds or settings.shard_lease_seconds
+        self.max_attempts = max_attempts or settings.shard_max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (heartbeats run on their own thread); autocommit mode with
+        # explicit transactions. Rollback journal rather than WAL, which breaks on network disks.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, sql_fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = sql_fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def enqueue(self, run_id: str, items: Iterable[Tuple[str, str, Sequence[str]]]) -> int:
+        """Adds (ticker, form, stages) items to a run; items already in the run are skipped."""
+        now = time.time()
+        rows = [(run_id, ticker.upper().strip(), form.upper(), json.dumps(list(stages)), now) for ticker, form, stages in items]
+
+        def insert(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_items (run_id, ticker, form, stages, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            return conn.total_changes - before
+
+        return self._transaction(insert)
+
+    def touch_node(self, node_id: str) -> None:
+        self._conn().execute(
+            "INSERT INTO nodes (node_id, last_seen) VALUES (?, ?) ON CONFLICT(node_id) DO UPDATE SET last_seen = excluded.last_seen",
+            (node_id, time.time()),
+        )
+
+    def live_nodes(self, within_seconds: Optional[float] = None) -> List[str]:
+        cutoff = time.time() - (within_seconds or 2 * self.lease_seconds)
+        return [row[0] for row in self._conn().execute("SELECT node_id FROM nodes WHERE last_seen >= ?", (cutoff,))]
+
+    def lease(self, node_id: str, run_id: Optional[str] = None) -> Optional[WorkItem]:
+        now = time.time()
+
+        def claim(conn: sqlite3.Connection) -> Optional[WorkItem]:
+            while True:
+                row = conn.execute(
+                    """
+                    SELECT id, run_id, ticker, form, stages, attempts, status, lease_owner, failed_nodes FROM work_items
+                    WHERE (status = 'queued' OR (status = 'leased' AND lease_expires < :now))
+                      AND available_at <= :now AND (:run_id IS NULL OR run_id = :run_id)
+                    ORDER BY instr(failed_nodes, :node_quoted) > 0, id
+                    LIMIT 1
+                    """,
+                    {"now": now, "run_id": run_id, "node_quoted": json.dumps(node_id)},
+                ).fetchone()
+                if row is None:
+                    return None
+                attempts = row[5]
+                if row[6] == "leased":
+                    # An expired lease is an attempt that never reported back (e.g. the node
+                    # crashed on this item), so it counts toward max_attempts like a failure.
+                    attempts += 1
+                    failed_nodes = json.dumps(sorted(set(json.loads(row[8])) | {row[7]}))
+                    if attempts >= self.max_attempts:
+                        conn.execute(
+                            """
+                            UPDATE work_items SET status = 'failed', attempts = ?, failed_nodes = ?, last_error = ?,
+                                lease_owner = NULL, updated_at = ? WHERE id = ?
+                            """,
+                            (attempts, failed_nodes, f"lease expired on {row[7]}", now, row[0]),
+                        )
+                        continue
+                    conn.execute("UPDATE work_items SET attempts = ?, failed_nodes = ? WHERE id = ?", (attempts, failed_nodes, row[0]))
+                conn.execute(
+                    "UPDATE work_items SET status = 'leased', lease_owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                    (node_id, now + self.lease_seconds, now, row[0]),
+                )
+                return WorkItem(row[0], row[1], row[2], row[3], json.loads(row[4]), attempts)
+
+        item = self._transaction(claim)
+        self.touch_node(node_id)
+        return item
+
+    def heartbeat(self, item_id: int, node_id: str) -> bool:
+        """Extends the lease; False means the lease was lost (expired and taken by another node)."""
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE work_items SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + self.lease_seconds, now, item_id, node_id),
+        )
+        self.touch_node(node_id)
+        return cursor.rowcount == 1
+
+    def complete(self, item: WorkItem, node_id: str, payload: Dict) -> bool:
+        now = time.time()
+
+        def finish(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "UPDATE work_items SET status = 'done', lease_owner = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (now, item.item_id, node_id),
+            )
+            if cursor.rowcount != 1:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO results (item_id, run_id, ticker, form, node_id, payload, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (item.item_id, item.run_id, item.ticker, item.form, node_id, json.dumps(payload, default=str), now),
+            )
+            conn.execute("UPDATE nodes SET items_done = items_done + 1 WHERE node_id = ?", (node_id,))
+            return True
+
+        return self._transaction(finish)
+
+    def fail(self, item: WorkItem, node_id: str, error: str, retry_delay_seconds: float = 30.0) -> str:
+        """
+        Records a failed attempt; returns the item's new status (`queued` for a retry, or `failed`),
+        or `lost` when this node no longer holds the lease and nothing was recorded.
+        """
+        now = time.time()
+
+        def record(conn: sqlite3.Connection) -> str:
+            row = conn.execute("SELECT attempts, failed_nodes FROM work_items WHERE id = ?", (item.item_id,)).fetchone()
+            attempts = row[0] + 1
+            failed_nodes = sorted(set(json.loads(row[1])) | {node_id})
+            status = "failed" if attempts >= self.max_attempts else "queued"
+            cursor = conn.execute(
+                """
+                UPDATE work_items SET status = ?, attempts = ?, failed_nodes = ?, last_error = ?, lease_owner = NULL,
+                    available_at = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (status, attempts, json.dumps(failed_nodes), error[:2000], now + retry_delay_seconds, now, item.item_id, node_id),
+            )
+            return status if cursor.rowcount == 1 else "lost"
+
+        return self._transaction(record)
+
+    def progress(self, run_id: str) -> Dict[str, int]:
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self._conn().execute(
+            "SELECT status, COUNT(*) FROM work_items WHERE run_id = ? GROUP BY status", (run_id,)
+        ):
+            counts[status] = count
+        return counts
+
+    def results(self, run_id: str) -> List[Dict]:
+        return [
+            {"ticker": ticker, "form": form, "node_id": node_id, **json.loads(payload)}
+            for ticker, form, node_id, payload in self._conn().execute(
+                "SELECT ticker, form, node_id, payload FROM results WHERE run_id = ? ORDER BY item_id", (run_id,)
+            )
+        ]
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, IO, Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks; writes stay atomic but unmerged.
+    fcntl = None
+
+
+def atomic_write(path: Union[str, Path], write: Callable[[IO[bytes]], None]) -> Path:
+    """
+    Writes through `write(handle)` into a temp file unique to this writer in the target's
+    directory, then renames it over `path`. Readers see the old file or the new one, never a torn
+    one, and concurrent writers cannot move each other's temp files (last rename wins).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    try:
+        with handle:
+            write(handle)
+        os.replace(handle.name, path)
+    except BaseException:
+        try:
+            os.unlink(handle.name)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes) -> Path:
+    return atomic_write(path, lambda handle: handle.write(data))
+
+
+def atomic_write_text(path: Union[str, Path], text: str) -> Path:
+    return atomic_write_bytes(path, text.encode("utf-8"))
+
+
+@contextmanager
+def file_lock(path: Union[str, Path]) -> Iterator[None]:
+    """Exclusive advisory lock on `<path>.lock`, held across processes for read-modify-write."""
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,49 @@
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+
+
+NUM_PERM = 64
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed so signatures are comparable across processes and persisted indexes.
+_RNG = np.random.RandomState(20260227)
+_PERM_A = _RNG.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _RNG.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_for_fingerprint(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(normalize_for_fingerprint(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[idx : idx + size]) for idx in range(len(words) - size + 1)]
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """64-permutation MinHash over word 3-shingles; the fraction of equal slots estimates Jaccard."""
+    tokens = shingles(text)
+    if not tokens:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    hashed = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little") for t in set(tokens)),
+        dtype=np.uint64,
+    )
+    permuted = (np.outer(hashed, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+def estimate_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    return float(np.mean(left == right))
@@ -0,0 +1,189 @@
+import cProfile
+import io
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+SAMPLE_INTERVAL_SECONDS = 0.005
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+TRACEMALLOC_FRAMES = 10
+
+# tracemalloc is process-global: overlapping captures share one tracing session, which is
+# stopped only when the last capture that needed it exits.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _acquire_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+        if _tracemalloc_users == 1:
+            tracemalloc.reset_peak()
+
+
+def _release_tracemalloc() -> Tuple[tracemalloc.Snapshot, int]:
+    """Snapshot and peak for the caller; stops tracing if this was the last owning capture."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+    return snapshot, peak
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a timer; the source of the speedscope flame graph."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[Dict] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        if key not in self._frame_index:
+            self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return self._frame_index[key]
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            self.samples.append(stack[::-1])
+            self.weights.append(now - last)
+            last = now
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def to_speedscope(self, name: str) -> Dict:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "ai-financial-statement-analyzer",
+            "shared": {"frames": self.frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(self.weights),
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append(
+            {
+                "function": f"{name} ({Path(filename).name}:{line})",
+                "calls": calls,
+                "own_seconds": round(own, 4),
+                "cumulative_seconds": round(cumulative, 4),
+            }
+        )
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:limit]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict]:
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+    return [
+        {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "kib": round(stat.size / 1024, 1), "blocks": stat.count}
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+class ProfileCapture:
+    """
+    Profiles one run on the current thread. cProfile gives exact per-function timings (written
+    as `.pstats`), a stack sampler gives a flame graph (`.speedscope.json`), and tracemalloc gives
+    allocation sites and peak memory. All are started only here, so nothing is paid when off.
+
+        with ProfileCapture("AAPL-10-K") as capture:
+            run()
+        capture.summary
+    """
+
+    def __init__(self, label: str, output_dir: Optional[str] = None) -> None:
+        self.label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)
+        self.output_dir = Path(output_dir or settings.profile_output_dir)
+        self.summary: Dict = {}
+        self._profiler = cProfile.Profile()
+        self._sampler = _StackSampler(threading.get_ident())
+
+    def __enter__(self) -> "ProfileCapture":
+        _acquire_tracemalloc()
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._profiler.disable()
+        elapsed = time.perf_counter() - self._started
+        self._sampler.stop()
+        snapshot, peak = _release_tracemalloc()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # The suffix keeps same-second captures of one label from overwriting each other. Names are
+        # concatenated, not `with_suffix`, which would cut a dotted label (e.g. BRK.B) at its dot.
+        stem = f"{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        pstats_path = self.output_dir / f"{stem}.pstats"
+        speedscope_path = self.output_dir / f"{stem}.speedscope.json"
+        summary_path = self.output_dir / f"{stem}.summary.json"
+        self._profiler.dump_stats(str(pstats_path))
+        speedscope_path.write_text(json.dumps(self._sampler.to_speedscope(self.label)), encoding="utf-8")
+
+        self.summary = {
+            "label": self.label,
+            "wall_seconds": round(elapsed, 4),
+            "samples": len(self._sampler.samples),
+            "peak_memory_mib": round(peak / 2**20, 2),
+            "top_functions": _top_functions(self._profiler, TOP_FUNCTIONS),
+            "top_allocations": _top_allocations(snapshot, TOP_ALLOCATIONS),
+            "files": {"pstats": str(pstats_path), "speedscope": str(speedscope_path), "summary": str(summary_path)},
+        }
+        summary_path.write_text(json.dumps(self.summary, indent=2), encoding="utf-8")
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key onto one execution.
+
+    The first caller (leader) runs the function; callers arriving while it is in flight wait for
+    and share its result or exception. Works for threads (`do`) and asyncio tasks (`do_async`),
+    which share the same in-flight table. Results are shared objects, so callers must not mutate them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    def _join_or_lead(self, key: Hashable):
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._stats["executed"] += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, fn: Callable[[], Any]) -> None:
+        try:
+            result = fn()
+        except BaseException as exc:  # noqa: BLE001
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        future, leader = self._join_or_lead(key)
+        if leader:
+            self._finish(key, future, fn)
+        return future.result()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any], executor: Optional[Executor] = None) -> Any:
+        """
+        Runs blocking `fn` in `executor` (default: the loop's) when leading; never blocks the event
+        loop. Followers only await, so a bounded executor limits executions, not waiters.
+        """
+        future, leader = self._join_or_lead(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(executor, self._finish, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._in_flight)}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"executed": 0, "coalesced": 0}
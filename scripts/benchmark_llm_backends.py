@@ -0,0 +1,91 @@
+"""
+Compare generation throughput of the configured LLM backends on the same fixture sections.
+
+    python scripts/benchmark_llm_backends.py --backends fake,ollama,llamacpp
+    python scripts/benchmark_llm_backends.py --accession 0000320193-24-000123 --repeat 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.filing_store import MappedFilingText
+from app.services.llm_backends import get_llm_backend
+from app.services.llm_engine import FilingInsightEngine
+from app.services.llm_scheduler import LLMScheduler
+
+
+FIXTURE_SECTIONS = {
+    "business": (
+        "We design and sell networking equipment to enterprise and cloud customers. "
+        "Our products are manufactured by contract manufacturers in Asia."
+    ),
+    "risk_factors": (
+        "A small number of customers account for a large share of revenue. "
+        "Our credit agreement contains covenants that restrict additional borrowing. "
+        "Component shortages could delay shipments."
+    ),
+    "mda": (
+        "Revenue increased 14% year over year driven by cloud demand. "
+        "Gross margin declined due to higher freight costs. "
+        "We repaid $200 million of term loans during the year."
+    ),
+}
+
+
+def benchmark_backend(name: str, sections: dict, form_type: str, repeat: int) -> dict:
+    backend = get_llm_backend(name)
+    engine = FilingInsightEngine(scheduler=LLMScheduler(max_concurrency=1), backend=backend)
+    items = [(section, text) for section, text in sections.items() if text.strip()]
+    batch_size = max(1, backend.batch_size)
+
+    completion_tokens = prompt_tokens = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for start in range(0, len(items), batch_size):
+            chunk = items[start : start + batch_size]
+            results = backend.generate_many([engine._messages(form_type, section, text) for section, text in chunk])
+            completion_tokens += sum(result["completion_tokens"] for result in results)
+            prompt_tokens += sum(result["prompt_tokens"] for result in results)
+    elapsed = time.perf_counter() - started
+    engine.scheduler.shutdown()
+    return {
+        "backend": name,
+        "model": backend.model,
+        "prompts_per_call": batch_size,
+        # False: the prompts of a call are generated one after another (see the backend docstrings).
+        "parallel": backend.parallel,
+        "prompts": len(items) * repeat,
+        "seconds": round(elapsed, 3),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "completion_tokens_per_sec": round(completion_tokens / elapsed, 1) if elapsed else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="fake,ollama", help="Comma-separated backend names")
+    parser.add_argument("--accession", help="Use sections of a filing persisted in FILING_TEXT_DIR")
+    parser.add_argument("--form", default="10-K")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    sections = FIXTURE_SECTIONS
+    if args.accession:
+        with MappedFilingText(args.accession) as mapped:
+            sections = {name: view["text"] for name, view in mapped.sections().items()}
+
+    for name in [n.strip() for n in args.backends.split(",") if n.strip()]:
+        try:
+            print(benchmark_backend(name, sections, args.form, args.repeat))
+        except Exception as exc:  # noqa: BLE001
+            print({"backend": name, "error": str(exc)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Load-test the analysis job queue against local EDGAR and Ollama stand-ins.
+
+    python scripts/load_test.py --synthetic 50 --users 8 --per-user 5 --workers 4
+    python scripts/load_test.py --synthetic 50 --users 4 --batch-jobs 2 --ollama --tokens-per-sec 30
+    python scripts/load_test.py --record AAPL,MSFT --fixtures data/loadtest/edgar   # one-time, live SEC
+    python scripts/load_test.py --fixtures data/loadtest/edgar --latency-ms 80 --throttle-rate 0.02
+    python scripts/load_test.py --synthetic 50 --data-dir /tmp/warm   # rerun with the same dir for warm caches
+
+Stages write their caches under --data-dir (a fresh temporary directory by default).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import settings
+from app.loadtest.driver import run_load_test
+from app.loadtest.fake_edgar import FakeEdgarServer, record_fixtures, write_synthetic_fixtures
+from app.loadtest.fake_ollama import FakeOllamaServer
+from app.services.sec_client import SECClient
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="Recorded EDGAR fixture directory")
+    parser.add_argument("--record", help="Comma-separated tickers to record from live SEC into --fixtures, then exit")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N synthetic companies instead of recorded fixtures")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--batch-jobs", type=int, default=0)
+    parser.add_argument("--per-user", type=int, default=5, help="Analyses per user or batch job")
+    parser.add_argument("--form", default="10-K")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of EDGAR requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of EDGAR requests answered 503")
+    parser.add_argument("--sec-rate", type=float, default=settings.sec_rate_limit_per_sec, help="Client-side SEC requests/sec")
+    parser.add_argument("--ollama", action="store_true", help="Also run AI extraction against a fake Ollama")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--ollama-parallel", type=int, default=1)
+    parser.add_argument("--llm-concurrency", type=int, default=settings.llm_max_concurrency)
+    parser.add_argument("--workers", type=int, default=settings.job_max_workers, help="Job queue stage processes")
+    parser.add_argument("--data-dir", help="Working directory for stage caches (default: a fresh temporary one)")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.fixtures:
+            parser.error("--record needs --fixtures")
+        print(record_fixtures(SECClient(), args.record.split(","), args.fixtures, form=args.form))
+        return
+
+    with ExitStack() as stack:
+        fixture_dir = str(Path(args.fixtures).resolve()) if args.fixtures else None
+        if args.synthetic:
+            fixture_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            tickers = write_synthetic_fixtures(fixture_dir, companies=args.synthetic)
+        elif fixture_dir:
+            mapping = json.loads((Path(fixture_dir) / "files" / "company_tickers.json").read_text(encoding="utf-8"))
+            recorded = {p.stem[3:] for p in (Path(fixture_dir) / "submissions").glob("CIK*.json")}
+            tickers = [row["ticker"] for row in mapping.values() if f"{int(row['cik_str']):010d}" in recorded]
+        else:
+            parser.error("pass --fixtures or --synthetic")
+
+        edgar = stack.enter_context(
+            FakeEdgarServer(
+                fixture_dir,
+                latency_seconds=args.latency_ms / 1000,
+                jitter_seconds=args.jitter_ms / 1000,
+                throttle_rate=args.throttle_rate,
+                error_rate=args.error_rate,
+            )
+        )
+        ollama = (
+            stack.enter_context(FakeOllamaServer(tokens_per_second=args.tokens_per_sec, num_parallel=args.ollama_parallel))
+            if args.ollama
+            else None
+        )
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        Path(data_dir).mkdir(parents=True, exist_ok=True)
+        # Before the queue forks its workers, so they resolve the relative data paths here too.
+        os.chdir(data_dir)
+        report = run_load_test(
+            tickers,
+            edgar,
+            users=args.users,
+            analyses_per_user=args.per_user,
+            batch_jobs=args.batch_jobs,
+            form=args.form,
+            ollama_url=ollama.url if ollama else None,
+            sec_rate_limit_per_sec=args.sec_rate,
+            llm_max_concurrency=args.llm_concurrency,
+            workers=args.workers,
+        )
+        report["edgar_server"] = edgar.stats
+        if ollama:
+            report["ollama_server"] = ollama.stats
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
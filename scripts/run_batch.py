@@ -0,0 +1,109 @@
+"""
+Run deterministic analyses for many tickers and write one JSON result per ticker.
+
+    python scripts/run_batch.py --tickers AAPL,MSFT,NVDA --output data/processed/batch
+    python scripts/run_batch.py --tickers-file tickers.txt --form 10-Q --workers 4
+    python scripts/run_batch.py --tickers XOM --profile      # pstats + speedscope + allocation summary
+
+Downloads run on `--workers` threads; parsing runs on a `ParseExecutor` process pool
+(`--parse-workers`, default PARSE_MAX_WORKERS or one per core) so it is not bound to one core.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.analyzer_pipeline import run_deterministic_analysis
+from app.services.artifact_cache import ArtifactCache
+from app.services.boilerplate_index import BoilerplateIndex
+from app.services.concept_plan import ConceptPlanStore
+from app.services.parse_executor import ParseExecutor
+from app.services.sec_client import SECClient
+
+
+def analysis_record(analysis: dict) -> dict:
+    record = {
+        "identity": analysis["identity"].model_dump(mode="json"),
+        "filing": analysis["filing"].model_dump(mode="json"),
+        "financials": analysis["financials"],
+        "financials_source": analysis["financials_source"],
+        "ratios": analysis["ratios"],
+        "summary": analysis["summary"],
+    }
+    if "profile" in analysis:
+        record["profile"] = analysis["profile"]
+    return record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", default="", help="Comma-separated tickers")
+    parser.add_argument("--tickers-file", help="File with one ticker per line")
+    parser.add_argument("--form", default="10-K")
+    parser.add_argument("--output", default="data/processed/batch")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent analyses (they share the SEC rate limit)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Parse processes (default: one per core)")
+    parser.add_argument("--no-cache", action="store_true", help="Skip the artifact cache, e.g. to profile a cold run")
+    parser.add_argument("--profile", action="store_true", help="Profile each analysis into PROFILE_OUTPUT_DIR")
+    args = parser.parse_args()
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    if args.tickers_file:
+        tickers += [line.strip().upper() for line in Path(args.tickers_file).read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not tickers:
+        parser.error("no tickers given")
+    if args.profile and args.workers > 1:
+        parser.error("--profile needs --workers 1 so each profile covers only its own run")
+
+    client = SECClient()
+    cache = None if args.no_cache else ArtifactCache()
+    plans = ConceptPlanStore()
+    # Every parsed filing feeds the corpus-wide boilerplate index the insight stage filters with.
+    boilerplate = BoilerplateIndex()
+    out_dir = Path(args.output)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # A profile should cover the parse, so profiled runs parse in-process.
+    parse_executor = None if args.profile else ParseExecutor(max_workers=args.parse_workers)
+
+    def run_one(ticker: str) -> dict:
+        started = time.perf_counter()
+        try:
+            analysis = run_deterministic_analysis(
+                client,
+                ticker,
+                args.form,
+                artifact_cache=cache,
+                concept_plans=plans,
+                profile=args.profile,
+                parse_executor=parse_executor,
+            )
+        except Exception as exc:  # noqa: BLE001
+            return {"ticker": ticker, "status": "failed", "error": str(exc)}
+        boilerplate.record_filing(analysis["identity"].cik_int, analysis["filing"].accession_number, analysis["section_records"])
+        path = out_dir / f"{ticker}-{args.form}.json"
+        path.write_text(json.dumps(analysis_record(analysis), indent=2), encoding="utf-8")
+        row = {"ticker": ticker, "status": "ok", "seconds": round(time.perf_counter() - started, 3), "output": str(path)}
+        if "profile" in analysis:
+            row["profile"] = analysis["profile"]["files"]
+            row["top_functions"] = analysis["profile"]["top_functions"][:5]
+        return row
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            for row in executor.map(run_one, tickers):
+                print(json.dumps(row))
+    finally:
+        if parse_executor is not None:
+            print(json.dumps({"parse_throughput": parse_executor.throughput()}))
+            parse_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
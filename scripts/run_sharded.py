@@ -0,0 +1,65 @@
+"""
+Sharded batch runs across several machines through one SQLite work queue on a shared disk.
+
+    # coordinator: enqueue the universe once
+    python scripts/run_sharded.py enqueue --run nightly --tickers-file universe.txt --stages analysis,fast_insights,insights
+    # on every node (each gets SEC_RATE_LIMIT_PER_SEC / live nodes)
+    python scripts/run_sharded.py work --run nightly --concurrency 2
+    python scripts/run_sharded.py status --run nightly
+    python scripts/run_sharded.py export --run nightly --output data/processed/nightly.jsonl
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import settings
+from app.services.shard_worker import STAGE_NAMES, ShardWorker, enqueue_run
+from app.services.work_queue import WorkQueue
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["enqueue", "work", "status", "export"])
+    parser.add_argument("--run", required=True, help="Run id shared by the coordinator and workers")
+    parser.add_argument("--queue", default=settings.shard_queue_path, help="SQLite queue file on the shared disk")
+    parser.add_argument("--tickers", default="", help="Comma-separated tickers (enqueue)")
+    parser.add_argument("--tickers-file", help="File with one ticker per line (enqueue)")
+    parser.add_argument("--form", default="10-K")
+    parser.add_argument("--stages", default="analysis", help=f"Comma-separated subset of {','.join(STAGE_NAMES)}")
+    parser.add_argument("--node-id", help="Defaults to hostname-pid")
+    parser.add_argument("--concurrency", type=int, default=1, help="Items in flight on this node (work)")
+    parser.add_argument("--sec-rate", type=float, default=settings.sec_rate_limit_per_sec, help="SEC requests/sec for all nodes together")
+    parser.add_argument("--follow", action="store_true", help="Keep polling for new items instead of exiting when drained")
+    parser.add_argument("--output", help="JSONL file for export (stdout by default)")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue)
+    if args.command == "enqueue":
+        tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+        if args.tickers_file:
+            tickers += [line.strip().upper() for line in Path(args.tickers_file).read_text(encoding="utf-8").splitlines() if line.strip()]
+        if not tickers:
+            parser.error("no tickers given")
+        stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+        added = enqueue_run(queue, args.run, tickers, form=args.form, stages=stages)
+        print(json.dumps({"run": args.run, "enqueued": added, "progress": queue.progress(args.run)}))
+    elif args.command == "work":
+        worker = ShardWorker(queue, node_id=args.node_id, global_sec_rate=args.sec_rate)
+        print(json.dumps(worker.run(run_id=args.run, concurrency=args.concurrency, stop_when_idle=not args.follow)))
+    elif args.command == "status":
+        print(json.dumps({"run": args.run, "progress": queue.progress(args.run), "live_nodes": queue.live_nodes()}))
+    else:
+        lines = [json.dumps(row) for row in queue.results(args.run)]
+        if args.output:
+            Path(args.output).write_text("\n".join(lines) + "\n", encoding="utf-8")
+        else:
+            print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Nightly forensic scoring (Beneish M, Altman Z', Piotroski F, accruals) for every SEC filer.
+
+    python scripts/score_universe.py --end-year 2024                  # fetch frames, save panel, score
+    python scripts/score_universe.py --from-panel --output scores.jsonl  # rescore the saved panel
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import settings
+from app.services.forensic_scores import FORENSIC_YEARS, build_universe_panel, compute_forensic_scores, load_panel, save_panel
+from app.services.sec_client import SECClient
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--end-year", type=int, default=time.localtime().tm_year - 1)
+    parser.add_argument("--years", type=int, default=FORENSIC_YEARS, help="Fiscal years in the panel (scores need 3+)")
+    parser.add_argument("--panel", default=settings.forensic_panel_path)
+    parser.add_argument("--from-panel", action="store_true", help="Score the saved panel instead of fetching frames")
+    parser.add_argument("--output", default="data/processed/forensic_scores.jsonl")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.from_panel:
+        ciks, years, metrics = load_panel(args.panel)
+    else:
+        years = list(range(args.end_year - args.years + 1, args.end_year + 1))
+        ciks, years, metrics = build_universe_panel(SECClient(), years)
+        save_panel(ciks, years, metrics, args.panel)
+    loaded = time.perf_counter()
+    scores = compute_forensic_scores(ciks, years, metrics)
+    scored = time.perf_counter()
+
+    out_path = Path(args.output)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as handle:
+        for row, cik in enumerate(scores.ciks):
+            handle.write(json.dumps({"cik": int(cik), **scores.score_map(row)}) + "\n")
+    print(
+        json.dumps(
+            {
+                "companies": len(scores),
+                "years": years,
+                "load_seconds": round(loaded - started, 3),
+                "score_seconds": round(scored - loaded, 3),
+                "write_seconds": round(time.perf_counter() - scored, 3),
+                "output": str(out_path),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Builds the frames universe snapshot that screening and the peer stage read, and screens it.
+
+    python scripts/universe_snapshot.py refresh --fiscal-year 2024     # frames + SIC codes, saved to UNIVERSE_SNAPSHOT_PATH
+    python scripts/universe_snapshot.py screen "net_margin > p75 within SIC 3571 and debt_to_equity < 1"
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import settings
+from app.services.ratio_engine import RATIO_KEYS
+from app.services.screening_engine import ScreeningEngine
+from app.services.sec_client import SECClient
+from app.services.universe_snapshot import (
+    attach_company_metadata,
+    build_universe_snapshot,
+    load_universe_snapshot,
+    save_universe_snapshot,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["refresh", "screen"])
+    parser.add_argument("expression", nargs="?", help="Screen expression (screen)")
+    parser.add_argument("--path", default=settings.universe_snapshot_path)
+    parser.add_argument("--fiscal-year", type=int, default=time.localtime().tm_year - 1, help="Frames year (refresh)")
+    parser.add_argument("--quarter", type=int, choices=[1, 2, 3, 4], help="Frames quarter; annual when omitted (refresh)")
+    parser.add_argument("--columns", default="", help=f"Comma-separated subset of {','.join(RATIO_KEYS)} (screen)")
+    parser.add_argument("--limit", type=int, default=50, help="Rows to print (screen)")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        started = time.perf_counter()
+        client = SECClient()
+        snapshot = build_universe_snapshot(client, args.fiscal_year, args.quarter)
+        # SIC codes rarely change, so the previous snapshot's are reused.
+        submissions_fetched = attach_company_metadata(client, snapshot, prior=load_universe_snapshot(args.path))
+        path = save_universe_snapshot(snapshot, args.path)
+        print(
+            json.dumps(
+                {
+                    "companies": len(snapshot["financials"]),
+                    "with_sic": sum(1 for sic in snapshot["sic_by_cik"].values() if sic),
+                    "frames_fetched": snapshot["frames_fetched"],
+                    "submissions_fetched": submissions_fetched,
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "output": str(path),
+                }
+            )
+        )
+        return
+
+    if not args.expression:
+        parser.error("screen needs an expression")
+    snapshot = load_universe_snapshot(args.path)
+    if snapshot is None:
+        parser.error(f"no snapshot at {args.path}; run refresh first")
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] or list(RATIO_KEYS)
+    result = ScreeningEngine.from_snapshot(snapshot).query(args.expression, columns=columns)
+    print(result.head(args.limit).to_string())
+    print(f"{len(result)} of {len(snapshot['financials'])} companies match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from starlette.testclient import TestClient
+
+from app.api import AnalysisService, create_app
+from app.models.schemas import CompanyIdentity, FilingMetadata
+from app.services.job_queue import AnalysisJobQueue
+from app.utils.response_cache import ResponseCache
+
+
+IDENTITY = CompanyIdentity(ticker="AAPL", cik_10="0000320193", cik_int=320193, company_name="Apple Inc.")
+FILING = FilingMetadata(
+    form="10-K",
+    filing_date=date(2024, 11, 1),
+    accession_number="0000320193-24-000123",
+    primary_document="aapl-20240928.htm",
+    cik_10="0000320193",
+    cik_int=320193,
+    filing_url="https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/aapl-20240928.htm",
+)
+
+
+class FakeSECClient:
+    def ticker_to_identity(self, ticker):
+        return IDENTITY if ticker == "AAPL" else None
+
+    def get_latest_filing(self, cik_10, preferred_form="10-K"):
+        return FILING
+
+
+def _queue(analysis_stage, extra_stages=()) -> AnalysisJobQueue:
+    return AnalysisJobQueue(
+        executor=ThreadPoolExecutor(max_workers=2),
+        stages=[("analysis", analysis_stage, None, True), *extra_stages],
+        result_ttl_seconds=60,
+    )
+
+
+def _service(job_queue: AnalysisJobQueue) -> AnalysisService:
+    return AnalysisService(sec_client=FakeSECClient(), job_queue=job_queue, limits={"sec": 2})
+
+
+def _analysis(ratio_value: float = 0.25) -> dict:
+    return {
+        "identity": IDENTITY,
+        "filing": FILING,
+        "section_records": {"mda": {"text": "Revenue increased.", "start": 0, "end": 18}},
+        "financials": {"revenue": 100.0, "net_income": 25.0},
+        "financials_source": "companyfacts",
+        "ratios": {"net_margin": {"value": ratio_value, "quality": "ok"}},
+    }
+
+
+def _poll(client, response, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while response.status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.02)
+        response = client.get(response.json()["result"])
+    return response
+
+
+def test_ratios_run_on_the_job_queue_and_are_cached_with_etags() -> None:
+    calls = []
+    release = threading.Event()
+
+    def analysis_stage(request, results):
+        calls.append((request["ticker"], request["preferred_form"]))
+        release.wait(timeout=5)
+        return _analysis()
+
+    queue = _queue(analysis_stage)
+    app = create_app(_service(queue), cache=ResponseCache(ttl_seconds=60))
+    with TestClient(app) as client:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = [future.result() for future in [pool.submit(client.get, "/companies/aapl/ratios") for _ in range(4)]]
+        assert {r.status_code for r in responses} == {202}
+        assert len({r.json()["job_id"] for r in responses}) == 1
+        job = queue.get(responses[0].json()["job_id"])
+        subscribers = job.subscribers
+        for _ in range(3):
+            assert client.get(responses[0].json()["result"]).status_code == 202
+        # Polls look the job up; they neither subscribe again nor start another analysis.
+        assert job.subscribers == subscribers
+        release.set()
+        done = _poll(client, responses[0])
+        assert calls == [("AAPL", "10-K")]
+        assert done.status_code == 200
+        assert done.json()["ratios"]["net_margin"]["value"] == 0.25
+        assert done.json()["filing"]["filing_date"] == "2024-11-01"
+
+        etag = done.headers["etag"]
+        revalidated = client.get("/companies/AAPL/ratios?form=10-K", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert client.get("/companies/AAPL/ratios?form=10-k", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/companies/AAPL/ratios", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+        assert client.get("/companies/AAPL/ratios", headers={"If-None-Match": etag[:-3] + '"'}).status_code == 200
+        assert client.get("/companies/AAPL/sections").json()["sections"]["mda"]["end"] == 18
+        assert calls == [("AAPL", "10-K")]
+
+
+def test_errors_map_to_http_status_codes() -> None:
+    from app.services.analyzer_pipeline import NotFoundError
+
+    def analysis_stage(request, results):
+        if request["ticker"] != "AAPL":
+            raise NotFoundError(f"Ticker not found: {request['ticker']}")
+        return _analysis()
+
+    app = create_app(_service(_queue(analysis_stage)), cache=ResponseCache(ttl_seconds=60))
+    with TestClient(app) as client:
+        assert client.get("/companies/AAPL").json()["cik_int"] == 320193
+        assert client.get("/companies/ZZZZ").status_code == 404
+        assert client.get("/companies/AAPL/ratios?form=8-K").status_code == 400
+        assert client.get("/companies/AAPL/filings/latest").json()["filing"]["accession_number"] == FILING.accession_number
+        assert client.get("/analyses/unknown").status_code == 404
+        assert _poll(client, client.get("/companies/ZZZZ/ratios")).status_code == 404
+        # A job id that expired (or belongs to another request) is a 404, not a new analysis.
+        assert client.get("/companies/AAPL/ratios?job_id=expired").status_code == 404
+
+    def broken(request, results):
+        raise ValueError("could not convert string to float")
+
+    app = create_app(_service(_queue(broken)), cache=ResponseCache(ttl_seconds=60))
+    with TestClient(app, raise_server_exceptions=False) as client:
+        # Only unknown tickers and filings are 404s; other failures are server errors.
+        assert _poll(client, client.get("/companies/AAPL/ratios")).status_code == 500
+
+
+def _analysis_stage(request: dict, results: dict) -> dict:
+    return {"ticker": request["ticker"]}
+
+
+def _insight_stage(request: dict, results: dict) -> dict:
+    time.sleep(0.1)
+    return {"red_flags": [], "confidence": 0.5}
+
+
+def test_insights_run_as_a_job_with_polling_and_sse() -> None:
+    queue = _queue(_analysis_stage, [("insights", _insight_stage, "run_ai", False)])
+    app = create_app(_service(queue), cache=ResponseCache(ttl_seconds=60))
+    with TestClient(app) as client:
+        accepted = client.get("/companies/AAPL/insights")
+        assert accepted.status_code == 202
+        job_id = accepted.json()["job_id"]
+
+        with client.stream("GET", f"/analyses/{job_id}/events") as stream:
+            events = [line for line in stream.iter_lines() if line.startswith("event:")]
+        assert events == ["event: stage", "event: stage", "event: done"]
+
+        done = client.get(accepted.json()["result"])
+        assert done.status_code == 200
+        assert done.json()["insights"]["confidence"] == 0.5
+        assert client.get(f"/analyses/{job_id}").json()["status"] == "done"
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from app.services import artifact_cache as artifact_cache_module
+from app.services.analyzer_pipeline import run_deterministic_analysis
+from app.services.artifact_cache import ArtifactCache, stage_fingerprint
+from tests.test_integration_pipeline import FakeSECClient
+
+
+class CountingSECClient(FakeSECClient):
+    def __init__(self) -> None:
+        self.filing_text_calls = 0
+
+    def get_filing_text(self, filing_url: str) -> str:
+        self.filing_text_calls += 1
+        return super().get_filing_text(filing_url)
+
+
+def test_get_or_compute_round_trips_and_counts(tmp_path: Path) -> None:
+    cache = ArtifactCache(cache_dir=str(tmp_path))
+    value = {"mda": {"text": "Revenue grew.", "start": 3, "end": 16}}
+    assert cache.get_or_compute("acc-1", "sections", lambda: value) == value
+    assert cache.get_or_compute("acc-1", "sections", lambda: {"unused": True}) == value
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_version_bump_invalidates_stage_and_downstream_only(tmp_path: Path, monkeypatch) -> None:
+    cache = ArtifactCache(cache_dir=str(tmp_path))
+    cache.put("acc-1", "filing_text", "text v1")
+    cache.put("acc-1", "sections", {"mda": {}})
+    assert stage_fingerprint("sections") == "filing_text@v1+sections@v1"
+
+    monkeypatch.setitem(artifact_cache_module.STAGE_VERSIONS, "sections", 2)
+    assert cache.get("acc-1", "filing_text") == "text v1"
+    assert cache.get("acc-1", "sections") is None
+
+    monkeypatch.setitem(artifact_cache_module.STAGE_VERSIONS, "sections", 1)
+    monkeypatch.setitem(artifact_cache_module.STAGE_VERSIONS, "filing_text", 2)
+    assert cache.get("acc-1", "filing_text") is None
+    assert cache.get("acc-1", "sections") is None
+
+
+def test_pipeline_skips_filing_download_when_sections_cached(tmp_path: Path) -> None:
+    cache = ArtifactCache(cache_dir=str(tmp_path))
+    client = CountingSECClient()
+    first = run_deterministic_analysis(client, ticker="FAKE", artifact_cache=cache)
+    second = run_deterministic_analysis(client, ticker="FAKE", artifact_cache=cache)
+
+    assert client.filing_text_calls == 1
+    assert first["section_records"] == second["section_records"]
+    assert first["financials"] == second["financials"]
+    assert second["ratios"]["net_margin"]["quality"] == "ok"
+
+
+def test_concurrent_puts_of_same_artifact_do_not_collide(tmp_path: Path) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = ArtifactCache(cache_dir=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: cache.put("acc-1", "sections", {"writer": i}), range(64)))
+    assert cache.get("acc-1", "sections")["writer"] in range(64)
+    assert not list((tmp_path / "sections").glob("*.tmp"))
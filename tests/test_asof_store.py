@@ -0,0 +1,64 @@
+from datetime import date
+
+import numpy as np
+
+from app.services.asof_store import AsOfFactStore, build_month_end_snapshots, load_month_end_snapshot, month_ends
+
+
+def _points(*rows):
+    return {"units": {"USD": [{"end": end, "filed": filed, "val": val} for end, filed, val in rows]}}
+
+
+def _store() -> AsOfFactStore:
+    return AsOfFactStore.from_company_facts(
+        [
+            {
+                "cik": 320193,
+                "facts": {
+                    "us-gaap": {
+                        # FY2019 revenue of 1000 was restated to 950 in the FY2020 10-K.
+                        "Revenues": _points(
+                            ("2019-12-31", "2020-02-15", 1000),
+                            ("2019-12-31", "2021-02-15", 950),
+                            ("2020-12-31", "2021-02-15", 1200),
+                        ),
+                        "NetIncomeLoss": _points(("2019-12-31", "2020-02-15", 100), ("2020-12-31", "2021-02-15", 150)),
+                    }
+                },
+            },
+            {"cik": 789019, "facts": {"us-gaap": {"Revenues": _points(("2020-12-31", "2021-03-01", 500))}}},
+        ]
+    )
+
+
+def test_as_of_query_ignores_later_filings_and_restatements() -> None:
+    store = _store()
+    ciks, financials = store.financials_as_of(date(2020, 6, 30))
+    assert list(ciks) == [320193, 789019]
+    assert financials["revenue"][0] == 1000.0
+    assert np.isnan(financials["revenue"][1])
+
+    _, later = store.financials_as_of(date(2021, 3, 31))
+    assert list(later["revenue"]) == [1200.0, 500.0]
+    assert store.value_as_of(320193, "Revenues", date(2021, 1, 31)) == 1000.0
+    assert store.value_as_of(320193, "Revenues", date(2021, 2, 15)) == 1200.0
+
+    ratios = store.ratio_set_as_of(date(2020, 6, 30))
+    assert ratios.ratio_map(0)["net_margin"]["value"] == 0.1
+
+
+def test_max_age_drops_values_from_stale_periods() -> None:
+    _, financials = _store().financials_as_of(date(2022, 6, 30), max_age_days=400)
+    assert np.isnan(financials["revenue"]).all()
+
+
+def test_month_end_snapshots_round_trip(tmp_path) -> None:
+    store = _store()
+    store = AsOfFactStore.load(str(store.save(str(tmp_path / "facts.npz"))))
+    assert month_ends(date(2020, 11, 15), date(2021, 2, 28)) == [date(2020, 11, 30), date(2020, 12, 31), date(2021, 1, 31), date(2021, 2, 28)]
+
+    paths = build_month_end_snapshots(store, date(2021, 1, 1), date(2021, 3, 31), output_dir=str(tmp_path / "snapshots"))
+    assert [p.stem for p in paths] == ["2021-01-31", "2021-02-28", "2021-03-31"]
+    ciks, financials = load_month_end_snapshot(date(2021, 2, 28), output_dir=str(tmp_path / "snapshots"))
+    assert list(ciks) == [320193, 789019]
+    assert financials["revenue"][0] == 1200.0 and np.isnan(financials["revenue"][1])
@@ -0,0 +1,120 @@
+from pathlib import Path
+
+from app.services.boilerplate_index import BoilerplateIndex
+from app.services.llm_engine import FilingInsightEngine
+
+
+SHARED = (
+    "Our operations could be adversely affected by changes in global economic conditions and financial markets. "
+    "We are subject to complex and evolving laws and regulations regarding privacy and data protection. "
+)
+
+
+def _records(specific: str) -> dict:
+    text = SHARED + specific
+    return {"risk_factors": {"text": text, "start": 0, "end": len(text)}}
+
+
+def _index(tmp_path: Path) -> BoilerplateIndex:
+    index = BoilerplateIndex(path=str(tmp_path / "index.sqlite"), min_companies=3)
+    index.add_section_records(1, _records("Our single foundry partner in Taiwan manufactures all of our chips."))
+    index.add_section_records(2, _records("A recall of our insulin pumps could harm our reputation."))
+    index.add_section_records(3, _records("Mining permits for our Nevada property may not be renewed."))
+    return index
+
+
+def test_lsh_clusters_shared_language_and_reports_commonness(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+    shared_sentence = "We are subject to complex and evolving laws and regulations regarding privacy and data protection."
+    assert index.commonness(shared_sentence) == 3
+    assert index.commonness("A recall of our insulin pumps could harm our reputation.") == 1
+    assert index.commonness("Completely unrelated sentence about weather patterns in Norway.") == 0
+
+    split = index.split_section(_records("A recall of our insulin pumps could harm our reputation.")["risk_factors"]["text"])
+    assert split["specific_text"] == "A recall of our insulin pumps could harm our reputation."
+    assert len(split["boilerplate_clusters"]) == 2
+
+    reloaded = BoilerplateIndex(path=str(tmp_path / "index.sqlite"))
+    assert reloaded.commonness(shared_sentence) == 3
+
+
+class RecordingEngine(FilingInsightEngine):
+    def __init__(self) -> None:
+        super().__init__()
+        self.prompts = []
+
+    def _analyze_section(self, form_type: str, section_name: str, section_text: str) -> dict:
+        self.prompts.append(section_text)
+        return {"risk_factor_highlights": [section_text[:30]], "confidence": 0.5}
+
+
+def test_llm_sees_company_specific_text_and_shares_cluster_insights(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+    engine = RecordingEngine()
+    first, section_insights = engine.extract_without_boilerplate(
+        "10-K", _records("Mining permits for our Nevada property may not be renewed."), index
+    )
+    assert len(engine.prompts) == 3
+    assert first["boilerplate_cluster_count"] == 2
+    # The persisted section insight covers the specific sentence and both shared clusters.
+    assert len(section_insights["risk_factors"]["risk_factor_highlights"]) == 3
+
+    engine.prompts.clear()
+    engine.extract_without_boilerplate("10-K", _records("A recall of our insulin pumps could harm our reputation."), index)
+    assert engine.prompts == ["A recall of our insulin pumps could harm our reputation."]
+
+
+def test_insight_stage_records_filing_and_publishes_cluster_insights(tmp_path: Path, monkeypatch) -> None:
+    from types import SimpleNamespace
+
+    from app.services import job_queue
+    from app.services.artifact_cache import ArtifactCache
+
+    path = str(tmp_path / "index.sqlite")
+    shared = BoilerplateIndex(path=path, min_companies=3)
+    specific = {
+        1: "Our single foundry partner in Taiwan manufactures all of our chips.",
+        2: "A recall of our insulin pumps could harm our reputation.",
+    }
+    for cik, sentence in specific.items():
+        assert shared.record_filing(cik, f"000{cik}", _records(sentence))
+    assert not shared.record_filing(1, "0001", _records(specific[1]))
+
+    engine = RecordingEngine()
+    monkeypatch.setattr(job_queue, "FilingInsightEngine", lambda **_: engine)
+    monkeypatch.setattr(job_queue, "BoilerplateIndex", lambda: BoilerplateIndex(path=path, min_companies=3))
+    monkeypatch.setattr(job_queue, "ArtifactCache", lambda: ArtifactCache(str(tmp_path / "cache")))
+    records = _records("Mining permits for our Nevada property may not be renewed.")
+    analysis = {
+        "identity": SimpleNamespace(cik_int=3),
+        "filing": SimpleNamespace(accession_number="0003", form="10-K"),
+        "section_records": records,
+    }
+    insights = job_queue.insight_stage({}, {"analysis": analysis})
+
+    # The third company makes the shared sentences boilerplate, so they go out once as clusters.
+    assert insights["boilerplate_cluster_count"] == 2
+    assert engine.prompts[0] == "Mining permits for our Nevada property may not be renewed."
+    reloaded = BoilerplateIndex(path=path, min_companies=3)
+    assert reloaded.has_filing("0003")
+    shared_clusters = reloaded.split_section(SHARED)["boilerplate_clusters"]
+    assert len(shared_clusters) == 2 and all(reloaded.cluster_insight(cid) is not None for cid in shared_clusters)
+    cached = ArtifactCache(str(tmp_path / "cache")).get(f"0003:risk_factors:{engine.model}", "section_insights")
+    assert cached is not None
+
+
+def test_writers_share_rows_without_reloading(tmp_path: Path) -> None:
+    path = str(tmp_path / "index.sqlite")
+    first, second = BoilerplateIndex(path=path, min_companies=2), BoilerplateIndex(path=path, min_companies=2)
+    assert first.record_filing(1, "0001", _records("Our single foundry partner in Taiwan manufactures all of our chips."))
+    assert second.record_filing(2, "0002", _records("A recall of our insulin pumps could harm our reputation."))
+    assert not first.record_filing(2, "0002", _records("A recall of our insulin pumps could harm our reputation."))
+
+    cluster_id = first.split_section(SHARED)["boilerplate_clusters"][0]
+    assert first.company_count(cluster_id) == 2
+    first.set_cluster_insight(cluster_id, {"confidence": 0.5})
+    assert second.cluster_insight(cluster_id) is None
+    first.publish_cluster_insights()
+    second.set_cluster_insight(cluster_id, {"confidence": 0.9})
+    second.publish_cluster_insights()
+    assert BoilerplateIndex(path=path).cluster_insight(cluster_id) == {"confidence": 0.5}
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from app.models.compact import RatioQuality, RatioResult, RatioSet
+from app.services.peer_engine import RATIO_KEYS
+from app.services.ratio_engine import compute_ratios
+
+
+def test_ratio_result_round_trip() -> None:
+    payload = {"value": None, "quality": "unstable_denominator"}
+    result = RatioResult.from_dict(payload)
+    assert result.quality is RatioQuality.UNSTABLE_DENOMINATOR
+    assert result.to_dict() == payload
+    assert not hasattr(result, "__dict__")
+    with pytest.raises(AttributeError):
+        result.value = 1.0
+
+
+def test_ratio_set_matches_dict_shape() -> None:
+    ratio_maps = [
+        compute_ratios({"net_income": 10.0, "revenue": 100.0, "equity": 0.0}),
+        compute_ratios({"current_assets": 4.0, "current_liabilities": 2.0}),
+    ]
+    ratio_set = RatioSet.from_ratio_maps([11, 22], ratio_maps, RATIO_KEYS)
+
+    assert len(ratio_set) == 2
+    assert ratio_set.quality.dtype == np.uint8
+    assert ratio_set.to_ratio_maps() == ratio_maps
+    ok = ratio_set.ok_values()
+    assert ok[1, RATIO_KEYS.index("current_ratio")] == 2.0
+    assert np.isnan(ok[0, RATIO_KEYS.index("roe")])
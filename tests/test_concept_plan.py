@@ -0,0 +1,82 @@
+from pathlib import Path
+
+from app.services.concept_plan import (
+    ConceptPlanStore,
+    build_concept_plan,
+    coverage_report,
+    resolve_latest_financials,
+    spliced_series,
+)
+from app.services.xbrl_mapper import extract_latest_financials
+
+
+def _points(*rows):
+    return {"units": {"USD": [{"end": end, "filed": filed, "val": val} for end, filed, val in rows]}}
+
+
+def _facts() -> dict:
+    # Revenue moved from SalesRevenueNet to the ASC 606 concept in 2018; `Revenues` is absent.
+    return {
+        "facts": {
+            "us-gaap": {
+                "SalesRevenueNet": _points(("2016-12-31", "2017-02-01", 800), ("2017-12-31", "2018-02-01", 900)),
+                "RevenueFromContractWithCustomerExcludingAssessedTax": _points(
+                    ("2017-12-31", "2019-02-01", 905),
+                    ("2018-12-31", "2019-02-01", 1000),
+                    ("2019-12-31", "2020-02-01", 1100),
+                ),
+                "NetIncomeLoss": _points(("2019-12-31", "2020-02-01", 90)),
+                "Assets": _points(("2016-12-31", "2017-02-01", 5000)),
+            }
+        }
+    }
+
+
+def test_plan_splices_concepts_and_fixes_stale_latest_value() -> None:
+    facts = _facts()
+    plan = build_concept_plan(facts)
+    segments = plan["metrics"]["revenue"]["segments"]
+    assert [(s["concept"], s["first_end"], s["last_end"]) for s in segments] == [
+        ("SalesRevenueNet", "2016-12-31", "2017-12-31"),
+        ("RevenueFromContractWithCustomerExcludingAssessedTax", "2018-12-31", "2019-12-31"),
+    ]
+    assert [p["value"] for p in spliced_series(facts, plan, "revenue")] == [800, 900, 1000, 1100]
+
+    # The legacy first-concept-wins lookup returns the 2017 value; the plan returns the newest period.
+    assert extract_latest_financials(facts)["revenue"] == 900.0
+    financials = resolve_latest_financials(facts, plan)
+    assert financials["revenue"] == 1100.0
+    assert financials["liabilities"] is None
+
+
+def test_coverage_report_flags_missing_and_stale_metrics() -> None:
+    rows = {row["metric"]: row for row in coverage_report(build_concept_plan(_facts()))}
+    assert rows["revenue"]["status"] == "ok"
+    assert rows["revenue"]["periods"] == 4
+    assert len(rows["revenue"]["concepts"]) == 2
+    assert rows["assets"]["status"] == "stale"
+    assert rows["liabilities"]["status"] == "missing"
+
+
+def test_store_reuses_plan_until_facts_change(tmp_path: Path) -> None:
+    store = ConceptPlanStore(plan_dir=str(tmp_path))
+    facts = _facts()
+    assert store.resolve(320193, facts)["revenue"] == 1100.0
+    assert ConceptPlanStore(plan_dir=str(tmp_path)).get_or_build(320193, facts)["coverage"]
+    assert store.stats == {"hits": 0, "builds": 1}
+
+    store.get_or_build(320193, facts)
+    assert store.stats["hits"] == 1
+    facts["facts"]["us-gaap"]["NetIncomeLoss"]["units"]["USD"].append({"end": "2020-12-31", "filed": "2021-02-01", "val": 95})
+    assert store.resolve(320193, facts)["net_income"] == 95.0
+    assert store.stats["builds"] == 2
+
+
+def test_concurrent_builds_for_same_cik_do_not_collide(tmp_path: Path) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    facts = _facts()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        plans = list(pool.map(lambda _: ConceptPlanStore(plan_dir=str(tmp_path)).get_or_build(320193, facts), range(32)))
+    assert all(plan == plans[0] for plan in plans)
+    assert [path.name for path in tmp_path.iterdir()] == ["320193.json"]
@@ -0,0 +1,48 @@
+from app.services.fast_insights import extract_fast_insights, score_sentence
+from app.services.llm_engine import _normalize_payload
+
+
+MDA = (
+    "Item 7 Management's Discussion and Analysis. Net sales increased 12% year over year to $4.2 billion. "
+    "We expect continued investment in data centers. "
+    "We repaid $200 million of term loans under our credit facility and remain in compliance with all covenants. "
+    "The weather at headquarters was pleasant."
+)
+RISK = (
+    "Item 1A Risk Factors. A small number of customers account for a concentration of revenue, "
+    "and the loss of any could adversely affect our results. "
+    "Our auditors identified a material weakness in internal control over financial reporting."
+)
+
+
+def _records() -> dict:
+    return {
+        "mda": {"text": MDA, "start": 0, "end": len(MDA)},
+        "risk_factors": {"text": RISK, "start": 500, "end": 500 + len(RISK)},
+    }
+
+
+def test_fast_insights_match_llm_schema_and_pick_relevant_sentences() -> None:
+    insights = extract_fast_insights(_records())
+    schema_keys = set(_normalize_payload({}))
+    assert schema_keys <= set(insights)
+    assert insights["source"] == "rules"
+    assert insights["revenue_trends"] == ["Net sales increased 12% year over year to $4.2 billion."]
+    assert insights["red_flags"] == ["Our auditors identified a material weakness in internal control over financial reporting."]
+    assert any("term loans" in s for s in insights["debt_risk_signals"])
+    assert not any("weather" in s for key in schema_keys - {"confidence"} for s in insights[key])
+    assert 0.0 < insights["confidence"] <= 0.5
+
+
+def test_evidence_quotes_map_to_section_spans() -> None:
+    insights = extract_fast_insights(_records())
+    spans = {span["quote"]: span for span in insights["evidence_spans"]}
+    red_flag = insights["red_flags"][0]
+    assert spans[red_flag]["section"] == "risk_factors"
+    assert RISK[spans[red_flag]["start"] - 500 : spans[red_flag]["end"] - 500] == red_flag
+
+
+def test_section_affinity_boosts_scores() -> None:
+    sentence = "Revenue grew 8% compared to fiscal 2023."
+    assert score_sentence(sentence, "revenue_trends", "mda") > score_sentence(sentence, "revenue_trends", "business") > 0
+    assert extract_fast_insights({})["confidence"] == 0.0
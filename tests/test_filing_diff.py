@@ -0,0 +1,115 @@
+from datetime import date
+
+from app.models.schemas import FilingMetadata
+from app.services.filing_diff import diff_section, find_prior_filing, split_units, summarize_changes
+from app.services.llm_engine import FilingInsightEngine
+
+
+PRIOR = (
+    "Item 1A Risk Factors. Our suppliers are concentrated in a small number of regions. "
+    "We depend on a limited number of customers for a majority of our revenue in fiscal 2023. "
+    "Cybersecurity incidents could disrupt our operations."
+)
+CURRENT = (
+    "Item 1A Risk Factors. Our suppliers are concentrated in a small number of regions. "
+    "We depend on a limited number of customers for a majority of our revenue in fiscal 2024. "
+    "New export controls may restrict sales of our products to China."
+)
+
+
+def _filing(accession: str, filed: date) -> FilingMetadata:
+    return FilingMetadata(
+        form="10-K",
+        filing_date=filed,
+        accession_number=accession,
+        primary_document="doc.htm",
+        cik_10="0000000001",
+        cik_int=1,
+        filing_url=f"https://example.com/{accession}",
+    )
+
+
+def test_split_units_returns_sentence_spans() -> None:
+    spans = split_units(PRIOR)
+    assert len(spans) == 4
+    assert PRIOR[spans[-1][0] : spans[-1][1]] == "Cybersecurity incidents could disrupt our operations."
+
+
+def test_diff_section_classifies_new_modified_unchanged() -> None:
+    diff = diff_section(CURRENT, PRIOR)
+    statuses = [unit["status"] for unit in diff["units"]]
+    assert statuses == ["unchanged", "unchanged", "modified", "new"]
+    assert diff["removed"] == ["Cybersecurity incidents could disrupt our operations."]
+    assert "export controls" in diff["changed_text"]
+    assert "suppliers are concentrated" not in diff["changed_text"]
+
+    summary = summarize_changes({"risk_factors": diff})["risk_factors"]
+    assert summary["new"] == 1 and summary["modified"] == 1 and summary["removed"] == 1
+    assert summary["changed_share"] == 0.5
+
+
+def test_find_prior_filing_skips_current_accession() -> None:
+    class FakeClient:
+        def get_filings(self, cik_10, form, limit=5):
+            return [_filing("acc-2025", date(2025, 1, 31)), _filing("acc-2024", date(2024, 1, 31))]
+
+    prior = find_prior_filing(FakeClient(), _filing("acc-2025", date(2025, 1, 31)))
+    assert prior.accession_number == "acc-2024"
+
+
+class RecordingEngine(FilingInsightEngine):
+    def __init__(self) -> None:
+        super().__init__()
+        self.prompts = []
+
+    def _analyze_section(self, form_type: str, section_name: str, section_text: str) -> dict:
+        self.prompts.append((section_name, section_text))
+        return {"red_flags": [f"{section_name} change"], "confidence": 0.8}
+
+
+def test_extract_incremental_only_sends_changed_text() -> None:
+    records = {
+        "risk_factors": {"text": CURRENT, "start": 0, "end": len(CURRENT)},
+        "business": {"text": "Item 1 Business We sell products globally.", "start": 500, "end": 543},
+    }
+    diffs = {
+        "risk_factors": diff_section(CURRENT, PRIOR),
+        "business": diff_section(records["business"]["text"], records["business"]["text"]),
+    }
+    prior_insights = {
+        "risk_factors": {"red_flags": ["Supplier concentration"], "confidence": 0.6},
+        "business": {"revenue_trends": ["Global sales"], "confidence": 0.9},
+    }
+    engine = RecordingEngine()
+    merged, section_insights = engine.extract_incremental("10-K", records, diffs, prior_insights)
+
+    assert [name for name, _ in engine.prompts] == ["risk_factors"]
+    assert "suppliers are concentrated" not in engine.prompts[0][1]
+    assert section_insights["business"]["revenue_trends"] == ["Global sales"]
+    assert merged["red_flags"] == ["risk_factors change", "Supplier concentration"]
+    assert "evidence_spans" in merged
+
+
+def test_extract_incremental_drops_stale_prior_items_and_reextracts_rewrites() -> None:
+    records = {"risk_factors": {"text": CURRENT, "start": 0, "end": len(CURRENT)}}
+    diffs = {"risk_factors": diff_section(CURRENT, PRIOR)}
+    assert diffs["risk_factors"]["removed"] == ["Cybersecurity incidents could disrupt our operations."]
+    assert diffs["risk_factors"]["replaced"][0].endswith("fiscal 2023.")
+    prior_insights = {
+        "risk_factors": {
+            "red_flags": ["Supplier concentration", "Cybersecurity incidents could disrupt operations"],
+            "evidence_quotes": ["Cybersecurity incidents could disrupt our operations", "Our suppliers are concentrated"],
+            "confidence": 0.6,
+        }
+    }
+    engine = RecordingEngine()
+    merged, _ = engine.extract_incremental("10-K", records, diffs, prior_insights)
+    assert merged["red_flags"] == ["risk_factors change", "Supplier concentration"]
+    assert merged["evidence_quotes"] == ["Our suppliers are concentrated"]
+
+    rewritten = "Item 1A Risk Factors. Tariffs raise our costs. Demand for our products is cyclical. Our plants are old."
+    records = {"risk_factors": {"text": rewritten, "start": 0, "end": len(rewritten)}}
+    engine = RecordingEngine()
+    merged, _ = engine.extract_incremental("10-K", records, {"risk_factors": diff_section(rewritten, PRIOR)}, prior_insights)
+    assert engine.prompts == [("risk_factors", rewritten)]
+    assert merged["red_flags"] == ["risk_factors change"]
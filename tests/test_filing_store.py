@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from app.services.filing_parser import extract_sections_with_spans
+from app.services.filing_store import MappedFilingText, filing_text_exists, persist_filing_text
+from app.services.llm_engine import attach_evidence_spans
+
+
+SAMPLE = (
+    "Cover page – “Annual Report”. " * 60
+    + "Item 1 Business We sell products globally. "
+    + "Item 1A Risk Factors Debt covenants may restrict flexibility – see note “7”. "
+    + "Item 7 Management’s Discussion and Analysis Revenue grew year over year. "
+    + "Item 8 Financial Statements"
+)
+
+
+def test_mapped_slices_match_string_slices(tmp_path: Path) -> None:
+    persist_filing_text("0000000001-25-000001", SAMPLE, "10-K", output_dir=str(tmp_path))
+    assert filing_text_exists("0000000001-25-000001", output_dir=str(tmp_path))
+
+    with MappedFilingText("0000000001-25-000001", output_dir=str(tmp_path)) as mapped:
+        assert len(mapped) == len(SAMPLE)
+        for start, end in [(0, 10), (1020, 1100), (1500, len(SAMPLE)), (2047, 2049)]:
+            assert mapped.slice(start, end) == SAMPLE[start:end]
+
+
+def test_section_views_match_owned_section_records(tmp_path: Path) -> None:
+    persist_filing_text("acc-2", SAMPLE, "10-K", output_dir=str(tmp_path))
+    expected = extract_sections_with_spans(SAMPLE, "10-K")
+
+    with MappedFilingText("acc-2", output_dir=str(tmp_path)) as mapped:
+        views = mapped.sections()
+        assert {name: view.to_dict() for name, view in views.items()} == expected
+        assert views["mda"].get("text") == expected["mda"]["text"]
+
+        enriched = attach_evidence_spans({"evidence_quotes": ["Debt covenants may restrict flexibility"]}, views)
+        assert enriched["evidence_spans"][0]["section"] == "risk_factors"
+
+
+def test_pipeline_serves_picklable_views_and_skips_reparse(tmp_path: Path) -> None:
+    import pickle
+
+    from app.services.analyzer_pipeline import run_deterministic_analysis
+    from app.services.artifact_cache import ArtifactCache
+    from app.services.filing_store import SectionView, section_text
+    from tests.test_integration_pipeline import FakeSECClient
+
+    class CountingClient(FakeSECClient):
+        downloads = 0
+
+        def get_filing_text(self, filing_url: str) -> str:
+            CountingClient.downloads += 1
+            return super().get_filing_text(filing_url)
+
+    owned = run_deterministic_analysis(FakeSECClient(), "FAKE")["section_records"]
+    cache, text_dir = ArtifactCache(str(tmp_path / "cache")), str(tmp_path / "text")
+    for _ in range(2):
+        result = run_deterministic_analysis(CountingClient(), "FAKE", artifact_cache=cache, filing_text_dir=text_dir)
+    assert CountingClient.downloads == 1
+    assert all(isinstance(view, SectionView) for view in result["section_records"].values())
+    assert {name: dict(view) for name, view in result["section_records"].items()} == owned
+    assert result["sections"]["mda"] == owned["mda"]["text"]
+
+    # Process-pool stages receive (accession, offsets) and map the same file themselves.
+    restored = pickle.loads(pickle.dumps(result["section_records"]))
+    assert restored["risk_factors"]["text"] == owned["risk_factors"]["text"]
+    assert section_text(restored["mda"], 0, 4) == section_text(owned["mda"], 0, 4) == "Item"
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+import requests
+
+from app.services.forensic_scores import (
+    FORENSIC_CONCEPT_MAP,
+    build_universe_panel,
+    compute_forensic_scores,
+    forensic_scores_from_company_facts,
+    load_panel,
+    save_panel,
+)
+from app.services.summary_engine import build_investment_summary, build_markdown_report
+
+
+# One company over three years; year two is the scored year for the hand-checked values below.
+PANEL = {
+    "revenue": [800.0, 1000.0, 1200.0],
+    "cost_of_revenue": [500.0, 600.0, 700.0],
+    "net_income": [40.0, 60.0, 90.0],
+    "operating_income": [70.0, 100.0, 140.0],
+    "assets": [1800.0, 2000.0, 2200.0],
+    "liabilities": [1000.0, 1100.0, 1150.0],
+    "equity": [800.0, 900.0, 1050.0],
+    "current_assets": [600.0, 700.0, 800.0],
+    "current_liabilities": [400.0, 420.0, 430.0],
+    "receivables": [100.0, 150.0, 160.0],
+    "sga": [150.0, 170.0, 190.0],
+    "depreciation": [45.0, 50.0, 55.0],
+    "ppe_net": [900.0, 950.0, 1000.0],
+    "cash_from_operations": [70.0, 80.0, 120.0],
+    "retained_earnings": [300.0, 360.0, 450.0],
+    "long_term_debt": [500.0, 480.0, 450.0],
+    "cash": [100.0, 120.0, 150.0],
+    "shares_outstanding": [100.0, 100.0, 100.0],
+}
+
+
+def _company_facts() -> dict:
+    def points(metric, unit="USD"):
+        instant = metric not in {"revenue", "cost_of_revenue", "net_income", "operating_income", "sga", "depreciation", "cash_from_operations"}
+        return {
+            "units": {
+                unit: [
+                    {"val": value, "end": f"{year}-12-31", "frame": f"CY{year}Q4I" if instant else f"CY{year}"}
+                    for year, value in zip((2022, 2023, 2024), PANEL[metric])
+                ]
+            }
+        }
+
+    us_gaap = {FORENSIC_CONCEPT_MAP[metric][0]: points(metric) for metric in PANEL if metric != "shares_outstanding"}
+    us_gaap["CommonStockSharesOutstanding"] = points("shares_outstanding", unit="shares")
+    return {"cik": 42, "facts": {"us-gaap": us_gaap}}
+
+
+def test_scores_match_hand_computed_values_and_flag_missing_components() -> None:
+    metrics = {name: np.array([values]) for name, values in PANEL.items()}
+    scores = compute_forensic_scores([42], [2022, 2023, 2024], metrics)
+    year = scores.score_map(0, period=1)
+
+    dsri = (150 / 1000) / (100 / 800)
+    gmi = (300 / 800) / (400 / 1000)
+    aqi = ((2000 - 700 - 950) / 2000) / ((1800 - 600 - 900) / 1800)
+    depi = (45 / 945) / (50 / 1000)
+    sgai = (170 / 1000) / (150 / 800)
+    lvgi = ((420 + 480) / 2000) / ((400 + 500) / 1800)
+    tata = (60 - 80) / 2000
+    m_score = -4.84 + 0.92 * dsri + 0.528 * gmi + 0.404 * aqi + 0.892 * 1.25 + 0.115 * depi - 0.172 * sgai + 4.679 * tata - 0.327 * lvgi
+    z_score = 0.717 * 280 / 2000 + 0.847 * 360 / 2000 + 3.107 * 100 / 2000 + 0.420 * 900 / 1100 + 0.998 * 1000 / 2000
+    assert year["scores"]["beneish_m"]["value"] == pytest.approx(m_score)
+    assert year["scores"]["altman_z"]["value"] == pytest.approx(z_score)
+    assert year["scores"]["accruals_ratio"]["value"] == pytest.approx(-20 / 1900)
+    # Year two has no year-zero ROA to compare with, so the F-score waits for year three.
+    assert year["scores"]["piotroski_f"]["quality"] == "missing_data"
+    assert year["piotroski_signals"]["roa_improved"]["quality"] == "missing_data"
+
+    latest = scores.score_map(0)
+    assert latest["fiscal_year"] == 2024
+    assert latest["scores"]["piotroski_f"]["value"] == 9.0
+    assert latest["scores"]["piotroski_f"]["signal"] == "strong"
+
+    metrics["sga"] = np.array([[150.0, np.nan, 190.0]])
+    broken = compute_forensic_scores([42], [2022, 2023, 2024], metrics).score_map(0, period=1)
+    assert broken["scores"]["beneish_m"] == {"value": None, "quality": "missing_data", "signal": None}
+    assert broken["components"]["sgai"]["quality"] == "missing_data"
+    assert broken["components"]["dsri"]["quality"] == "ok"
+
+
+def test_company_facts_scores_feed_summary_and_report() -> None:
+    forensic = forensic_scores_from_company_facts(_company_facts())
+    assert forensic["fiscal_year"] == 2024
+    assert forensic["scores"]["piotroski_f"]["value"] == 9.0
+
+    summary = build_investment_summary("Acme", "ACME", "10-K", ratios={}, forensic=forensic)
+    assert "Forensic scores (FY2024)" in summary and "Piotroski F-score 9/9 (strong)" in summary
+    report = build_markdown_report("Acme", "ACME", {"form": "10-K"}, ratios={}, summary_text=summary, forensic=forensic)
+    assert "## Forensic Scores (FY2024)" in report
+    assert forensic_scores_from_company_facts({"cik": 1, "facts": {}}) is None
+
+
+class FakeFramesClient:
+    def get_frame(self, concept, period, unit="USD", taxonomy="us-gaap"):
+        if concept == "Revenues":
+            return {"data": [{"cik": 7, "val": 100.0 + int(period[2:6])}]}
+        if concept == "SalesRevenueNet":
+            return {"data": [{"cik": 7, "val": -1.0}, {"cik": 3, "val": 50.0}]}
+        raise requests.HTTPError("404")
+
+
+def test_universe_panel_from_frames_round_trips(tmp_path) -> None:
+    ciks, years, metrics = build_universe_panel(FakeFramesClient(), [2023, 2024])
+    assert ciks.tolist() == [3, 7]
+    assert metrics["revenue"].tolist() == [[50.0, 50.0], [2123.0, 2124.0]]
+    assert np.isnan(metrics["assets"]).all()
+
+    save_panel(ciks, years, metrics, str(tmp_path / "panel.npz"))
+    loaded_ciks, loaded_years, loaded = load_panel(str(tmp_path / "panel.npz"))
+    assert loaded_ciks.tolist() == [3, 7] and loaded_years == [2023, 2024]
+    scores = compute_forensic_scores(loaded_ciks, loaded_years, loaded)
+    assert (scores.quality == 1).all()
+
+
+def test_september_filers_read_instants_at_their_fiscal_year_end() -> None:
+    facts = _company_facts()
+    for concept in facts["facts"]["us-gaap"].values():
+        for unit_points in concept["units"].values():
+            for point in unit_points:
+                year = point["frame"][2:6]
+                point["end"] = f"{year}-09-30"
+                if point["frame"].endswith("Q4I"):
+                    point["frame"] = f"CY{year}Q3I"
+    # December balance sheets from the following 10-Q must not be paired with the fiscal year.
+    facts["facts"]["us-gaap"]["Assets"]["units"]["USD"].append({"val": 99_999.0, "end": "2024-12-31", "frame": "CY2024Q4I"})
+
+    assert forensic_scores_from_company_facts(facts) == forensic_scores_from_company_facts(_company_facts())
+
+
+class FiscalYearFramesClient:
+    def get_frame(self, concept, period, unit="USD", taxonomy="us-gaap"):
+        if concept == "Revenues":
+            return {"data": [{"cik": 7, "val": 1000.0, "end": f"{period[2:6]}-09-27"}, {"cik": 3, "val": 500.0, "end": f"{period[2:6]}-12-31"}]}
+        if concept == "Assets" and period == "CY2024Q3I":
+            return {"data": [{"cik": 7, "val": 2000.0}, {"cik": 3, "val": -1.0}]}
+        if concept == "Assets" and period == "CY2024Q4I":
+            return {"data": [{"cik": 7, "val": -1.0}, {"cik": 3, "val": 800.0}]}
+        raise requests.HTTPError("404")
+
+
+def test_universe_panel_aligns_instants_to_each_fiscal_year_end() -> None:
+    ciks, _, metrics = build_universe_panel(FiscalYearFramesClient(), [2024])
+    assert ciks.tolist() == [3, 7]
+    assert metrics["assets"][:, 0].tolist() == [800.0, 2000.0]
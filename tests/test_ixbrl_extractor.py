@@ -0,0 +1,96 @@
+from datetime import date
+
+from app.services.analyzer_pipeline import run_deterministic_analysis
+from app.services.filing_parser import parse_filing
+from tests.test_integration_pipeline import FakeSECClient
+
+
+IXBRL_FILING = """
+<html><body>
+<div style="display:none"><ix:header><ix:resources>
+<xbrli:context id="fy24"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">1</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:startDate>2024-01-01</xbrli:startDate><xbrli:endDate>2024-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+<xbrli:context id="q424"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">1</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:startDate>2024-10-01</xbrli:startDate><xbrli:endDate>2024-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+<xbrli:context id="fy23"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">1</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:startDate>2023-01-01</xbrli:startDate><xbrli:endDate>2023-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+<xbrli:context id="i24"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">1</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:instant>2024-12-31</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:context id="i24seg"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">1</xbrli:identifier>
+<xbrli:segment><xbrldi:explicitMember dimension="us-gaap:StatementBusinessSegmentsAxis">x:CloudMember</xbrldi:explicitMember></xbrli:segment></xbrli:entity>
+<xbrli:period><xbrli:instant>2024-12-31</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:unit id="usd"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>
+</ix:resources></ix:header></div>
+<p>Period ended <ix:nonNumeric name="dei:DocumentPeriodEndDate" contextRef="fy24">December 31, 2024</ix:nonNumeric></p>
+<p>Item 1 Business We sell products globally.</p>
+<p>Item 7 Management's Discussion and Analysis Revenue was
+<ix:nonFraction name="us-gaap:Revenues" contextRef="fy24" unitRef="usd" scale="6" decimals="-6">1,200</ix:nonFraction> million,
+fourth quarter <ix:nonFraction name="us-gaap:Revenues" contextRef="q424" unitRef="usd" scale="6">350</ix:nonFraction>,
+prior year <ix:nonFraction name="us-gaap:Revenues" contextRef="fy23" unitRef="usd" scale="6">1,000</ix:nonFraction>.
+Net loss <ix:nonFraction name="us-gaap:NetIncomeLoss" contextRef="fy24" unitRef="usd" scale="6" sign="-">(50)</ix:nonFraction>.
+Assets <ix:nonFraction name="us-gaap:Assets" contextRef="i24" unitRef="usd" scale="3">2,500,000</ix:nonFraction>,
+cloud assets <ix:nonFraction name="us-gaap:Assets" contextRef="i24seg" unitRef="usd" scale="3">900,000</ix:nonFraction>.
+Equity <ix:nonFraction name="us-gaap:StockholdersEquity" contextRef="i24" unitRef="usd" scale="6">1,100</ix:nonFraction>.</p>
+<p>Item 8 Financial Statements</p>
+</body></html>
+"""
+
+
+def test_parse_filing_resolves_contexts_scale_and_sign() -> None:
+    text, financials = parse_filing(IXBRL_FILING, "10-K")
+    assert "Revenue was 1,200 million" in text
+    assert financials["revenue"] == 1_200_000_000.0
+    assert financials["net_income"] == -50_000_000.0
+    assert financials["assets"] == 2_500_000_000.0
+    assert financials["equity"] == 1_100_000_000.0
+    assert financials["interest_expense"] is None
+
+
+def test_parse_filing_prefers_quarter_for_10q_and_handles_plain_html() -> None:
+    _, financials = parse_filing(IXBRL_FILING, "10-Q")
+    assert financials["revenue"] == 350_000_000.0
+
+    _, plain = parse_filing("<html><body>Item 1 Business text</body></html>", "10-K")
+    assert all(value is None for value in plain.values())
+
+
+class InlineXBRLClient(FakeSECClient):
+    def __init__(self, interest_points) -> None:
+        self.company_facts_calls = 0
+        self.interest_points = interest_points
+
+    def get_latest_filing(self, cik_10: str, preferred_form: str = "10-K"):
+        return super().get_latest_filing(cik_10, preferred_form).model_copy(update={"report_date": date(2024, 12, 31)})
+
+    def get_filing_text(self, filing_url: str) -> str:
+        return IXBRL_FILING
+
+    def get_company_facts(self, cik_10: str):
+        self.company_facts_calls += 1
+        facts = super().get_company_facts(cik_10)
+        facts["facts"]["us-gaap"]["InterestExpense"] = {"units": {"USD": self.interest_points}}
+        return facts
+
+
+def test_pipeline_prefers_inline_facts_and_fills_gaps_for_the_filing_period_only() -> None:
+    annual = {"start": "2024-01-01", "end": "2024-12-31", "filed": "2025-01-31", "val": 30_000_000}
+    fourth_quarter = {"start": "2024-10-01", "end": "2024-12-31", "filed": "2025-01-31", "val": 8_000_000}
+    later_quarter = {"start": "2025-01-01", "end": "2025-03-31", "filed": "2025-05-01", "val": 9_000_000}
+    client = InlineXBRLClient([annual, fourth_quarter, later_quarter])
+    result = run_deterministic_analysis(client, ticker="FAKE")
+    # The fixture tags everything but interest expense, which companyfacts supplies for the
+    # filing's own (annual) period, not from the newer 10-Q.
+    assert result["financials_source"] == "ixbrl+companyfacts"
+    assert result["financials_period_end"] == "2024-12-31"
+    assert client.company_facts_calls == 1
+    assert result["financials"]["revenue"] == 1_200_000_000.0
+    assert result["financials"]["interest_expense"] == 30_000_000.0
+    assert abs(result["ratios"]["net_margin"]["value"] - (-50 / 1200)) < 1e-12
+
+    # Only a later period reported: the gap stays empty and the ratio is flagged.
+    unfilled = run_deterministic_analysis(InlineXBRLClient([later_quarter]), ticker="FAKE")
+    assert unfilled["financials"]["interest_expense"] is None
+    assert unfilled["ratios"]["interest_coverage"]["quality"] == "missing_data"
+
+    fallback = run_deterministic_analysis(FakeSECClient(), ticker="FAKE")
+    assert fallback["financials_source"] == "companyfacts"
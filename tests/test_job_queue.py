@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.job_queue import AnalysisJobQueue, make_job_key
+from app.services.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+
+CALLS = {"analysis": 0}
+RELEASE = threading.Event()
+
+
+def _slow_analysis_stage(request: dict, results: dict) -> dict:
+    CALLS["analysis"] += 1
+    RELEASE.wait(timeout=5)
+    return {"ticker": request["ticker"]}
+
+
+def _failing_insight_stage(request: dict, results: dict) -> dict:
+    raise RuntimeError("ollama unavailable")
+
+
+def _peer_stage(request: dict, results: dict) -> dict:
+    return {"seen_ticker": results["analysis"]["ticker"]}
+
+
+def _queue() -> AnalysisJobQueue:
+    stages = [
+        ("analysis", _slow_analysis_stage, None, True),
+        ("insights", _failing_insight_stage, "run_ai", False),
+        ("peer", _peer_stage, "run_peer", False),
+    ]
+    return AnalysisJobQueue(executor=ThreadPoolExecutor(max_workers=2), stages=stages, result_ttl_seconds=60)
+
+
+def test_make_job_key_normalizes_ticker_and_options() -> None:
+    assert make_job_key(" aapl", "10-k", {"run_peer": False, "run_ai": True}) == make_job_key(
+        "AAPL", "10-K", {"run_ai": True, "run_peer": False}
+    )
+
+
+def test_duplicate_requests_collapse_onto_one_job() -> None:
+    CALLS["analysis"] = 0
+    RELEASE.clear()
+    queue = _queue()
+    first = queue.submit("AAPL", "10-K", run_ai=True, run_peer=True)
+    second = queue.submit("aapl", "10-K", run_ai=True, run_peer=True)
+    other = queue.submit("AAPL", "10-K", run_ai=False, run_peer=False)
+
+    assert first is second
+    assert other is not first
+    RELEASE.set()
+    assert first.done.wait(timeout=5)
+    assert other.done.wait(timeout=5)
+
+    snapshot = first.snapshot()
+    assert snapshot["status"] == "done"
+    assert snapshot["subscribers"] == 2
+    assert snapshot["results"]["peer"] == {"seen_ticker": "AAPL"}
+    assert "insights" in snapshot["errors"]
+    assert CALLS["analysis"] == 2
+
+    assert queue.submit("AAPL", "10-K", run_ai=True, run_peer=True) is first
+    assert CALLS["analysis"] == 2
+    queue.shutdown()
+
+
+def test_stage_selection_and_partial_results() -> None:
+    RELEASE.set()
+    queue = _queue()
+    job = queue.submit("MSFT", "10-Q", run_ai=False, run_peer=False)
+    assert job.stage_names == ["analysis"]
+    assert job.done.wait(timeout=5)
+    assert job.progress == 1.0
+    assert queue.get(job.job_id) is job
+    queue.shutdown()
+
+
+def test_release_cancels_job_nobody_waits_on() -> None:
+    RELEASE.clear()
+    queue = _queue()
+    job = queue.submit("NVDA", "10-K", run_ai=False, run_peer=True)
+    queue.release(job.job_id)
+    RELEASE.set()
+    assert job.done.wait(timeout=5)
+    assert job.status == "cancelled"
+    assert "peer" not in job.completed_stages
+    assert queue.submit("NVDA", "10-K", run_ai=False, run_peer=True) is not job
+    queue.shutdown()
+
+
+def test_finished_jobs_are_evicted_by_ttl_and_count() -> None:
+    RELEASE.set()
+    stages = [("analysis", _slow_analysis_stage, None, True)]
+    bounded = AnalysisJobQueue(executor=ThreadPoolExecutor(max_workers=2), stages=stages, result_ttl_seconds=60, max_finished_jobs=2)
+    jobs = [bounded.submit(ticker) for ticker in ("AAPL", "MSFT", "NVDA")]
+    for job in jobs:
+        assert job.done.wait(timeout=5)
+    # Only the two most recently finished jobs are kept.
+    assert sum(bounded.get(job.job_id) is not None for job in jobs) == 2
+    assert len(bounded._jobs_by_key) == 2
+
+    expiring = AnalysisJobQueue(executor=ThreadPoolExecutor(max_workers=2), stages=stages, result_ttl_seconds=0)
+    job = expiring.submit("AAPL")
+    assert job.done.wait(timeout=5)
+    assert expiring.get(job.job_id) is None
+    assert expiring.submit("AAPL") is not job
+
+
+def test_abandoned_interactive_job_cancels_its_llm_work() -> None:
+    class RecordingScheduler:
+        def __init__(self) -> None:
+            self.cancelled = []
+
+        def cancel_owner(self, owner: str) -> int:
+            self.cancelled.append(owner)
+            return 1
+
+    RELEASE.clear()
+    scheduler = RecordingScheduler()
+    stages = [("analysis", _slow_analysis_stage, None, True), ("peer", _peer_stage, "run_peer", False)]
+    queue = AnalysisJobQueue(
+        executor=ThreadPoolExecutor(max_workers=2),
+        stages=stages,
+        result_ttl_seconds=60,
+        llm_scheduler=scheduler,
+        abandon_after_seconds=0.2,
+    )
+    polled = queue.submit("AAPL", run_peer=True)
+    idle = queue.submit("MSFT", run_peer=True)
+    batch = queue.submit("NVDA", run_peer=True, llm_priority=PRIORITY_BATCH)
+    assert idle.llm_deadline_at < batch.llm_deadline_at
+    assert polled.request.get("llm_priority", PRIORITY_INTERACTIVE) == PRIORITY_INTERACTIVE
+
+    for _ in range(10):
+        time.sleep(0.05)
+        assert queue.get(polled.job_id) is polled
+    assert idle.cancel_requested and scheduler.cancelled == [idle.job_id]
+    assert not polled.cancel_requested and not batch.cancel_requested
+    RELEASE.set()
+    assert idle.done.wait(timeout=5) and idle.status == "cancelled"
+    assert polled.done.wait(timeout=5) and polled.status == "done"
+    assert batch.done.wait(timeout=5) and batch.status == "done"
+    queue.shutdown()
@@ -0,0 +1,56 @@
+import pytest
+
+from app.services.llm_backends import FakeBackend, LlamaCppBackend, get_llm_backend
+from app.services.llm_engine import FilingInsightEngine
+from app.services.llm_scheduler import LLMScheduler
+
+
+SECTIONS = {
+    "business": "We design chips. Sales are global.",
+    "risk_factors": "Supply may be constrained. Customers are concentrated.",
+    "mda": "Revenue grew 12%. Margins expanded.",
+}
+
+
+def test_engine_batches_sections_through_backend() -> None:
+    backend = FakeBackend(batch_size=2)
+    engine = FilingInsightEngine(scheduler=LLMScheduler(max_concurrency=1), backend=backend)
+    insights = engine.extract_from_sections("10-K", SECTIONS)
+
+    assert sorted(backend.batches) == [1, 2]
+    assert insights["management_commentary"][:2] == ["We design chips.", "Sales are global."]
+    assert "Revenue grew 12%." in insights["evidence_quotes"]
+    engine.scheduler.shutdown()
+
+
+def test_fake_backend_reports_token_counts() -> None:
+    result = FakeBackend().generate([{"role": "user", "content": "Text:\nDebt rose. Cash fell."}])
+    assert result["completion_tokens"] > 0
+    assert result["prompt_tokens"] == 5
+
+
+def test_backend_selection_errors() -> None:
+    with pytest.raises(ValueError):
+        get_llm_backend("gpt-cloud")
+    with pytest.raises((RuntimeError, ValueError)):
+        LlamaCppBackend(model_path="")
+
+
+def test_ollama_backend_sends_a_call_s_prompts_concurrently() -> None:
+    import time
+
+    from ollama import Client
+
+    from app.loadtest.fake_ollama import FakeOllamaServer
+    from app.services.llm_backends import LLMBackend, OllamaBackend
+
+    with pytest.raises(TypeError):
+        LLMBackend()
+    # Each reply takes 0.3 s; with two server slots, two prompts finish together.
+    with FakeOllamaServer(tokens_per_second=400, completion_tokens=120, num_parallel=2) as ollama:
+        backend = OllamaBackend(client=Client(host=ollama.url), model="fake")
+        started = time.perf_counter()
+        results = backend.generate_many([[{"role": "user", "content": "a"}], [{"role": "user", "content": "b"}]])
+        elapsed = time.perf_counter() - started
+    assert len(results) == 2 and all(result["completion_tokens"] == 120 for result in results)
+    assert elapsed < 0.55
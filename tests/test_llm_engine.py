@@ -1,4 +1,17 @@
-from app.services.llm_engine import _extract_json_block, _normalize_payload, attach_evidence_spans, merge_insights
+import time
+
+from app.config import settings
+from app.services.llm_engine import (
+    SYSTEM_PROMPT,
+    FilingInsightEngine,
+    _extract_json_block,
+    _normalize_payload,
+    attach_evidence_spans,
+    merge_insights,
+    warm_up_model,
+)
+from app.services.llm_backends import OllamaBackend
+from app.services.llm_scheduler import LLMScheduler
 
 
 def test_extract_json_block_handles_wrapped_text() -> None:
@@ -47,3 +60,51 @@ def test_attach_evidence_spans_maps_quotes_to_sections() -> None:
     enriched = attach_evidence_spans(insights, section_records)
     assert enriched["evidence_spans"][0]["section"] == "risk_factors"
     assert enriched["evidence_spans"][0]["start"] is not None
+
+
+class FakeChatClient:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.fail:
+            raise ConnectionError("ollama down")
+        return {"message": {"content": "{\"red_flags\": [\"Going concern\"], \"confidence\": 0.4}"}, "eval_count": 9}
+
+
+def test_section_messages_share_a_stable_system_prefix() -> None:
+    client = FakeChatClient()
+    engine = FilingInsightEngine(scheduler=LLMScheduler(max_concurrency=1), backend=OllamaBackend(client=client))
+    first = engine._messages("10-K", "mda", "Revenue grew.")
+    second = engine._messages("10-Q", "risk_factors", "Debt covenants tightened.")
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert "Revenue grew." in first[1]["content"]
+
+    insight = engine.extract_from_sections("10-K", {"mda": "Doubt about going concern."})
+    assert insight["red_flags"] == ["Going concern"]
+    assert client.calls[0]["keep_alive"] == settings.ollama_keep_alive
+    engine.scheduler.shutdown()
+
+
+def test_warm_up_reports_failure_without_raising() -> None:
+    assert warm_up_model(backend=OllamaBackend(client=FakeChatClient(fail=True)))["ok"] is False
+    client = FakeChatClient()
+    result = warm_up_model(backend=OllamaBackend(client=client))
+    assert result["ok"] is True
+    assert client.calls[0]["options"]["num_predict"] == 1
+    assert client.calls[0]["messages"][0]["content"] == SYSTEM_PROMPT
+
+
+def test_engine_submits_with_the_job_deadline() -> None:
+    class RecordingScheduler(LLMScheduler):
+        def submit(self, key, fn, **kwargs):
+            self.deadlines = getattr(self, "deadlines", []) + [kwargs.get("deadline_seconds")]
+            return super().submit(key, fn, **kwargs)
+
+    scheduler = RecordingScheduler(max_concurrency=1)
+    engine = FilingInsightEngine(scheduler=scheduler, backend=OllamaBackend(client=FakeChatClient()), deadline_at=time.time() + 60)
+    engine.extract_from_sections("10-K", {"mda": "Revenue grew."})
+    assert 0 < scheduler.deadlines[0] <= 60
+    scheduler.shutdown()
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from app.services.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler
+
+
+def _blocker(scheduler: LLMScheduler, gate: threading.Event, started: threading.Event):
+    def run():
+        started.set()
+        gate.wait(timeout=5)
+        return "blocker"
+
+    return scheduler.submit("blocker", run, priority=PRIORITY_INTERACTIVE)
+
+
+def test_interactive_requests_run_before_queued_batch_work() -> None:
+    scheduler = LLMScheduler(max_concurrency=1, reserved_interactive_slots=0)
+    gate, started = threading.Event(), threading.Event()
+    order = []
+    blocker = _blocker(scheduler, gate, started)
+    assert started.wait(timeout=5)
+
+    futures = [
+        scheduler.submit("batch-late", lambda: order.append("batch-late"), priority=PRIORITY_BATCH, deadline_seconds=60),
+        scheduler.submit("batch-soon", lambda: order.append("batch-soon"), priority=PRIORITY_BATCH, deadline_seconds=1),
+        scheduler.submit("interactive", lambda: order.append("interactive"), priority=PRIORITY_INTERACTIVE),
+    ]
+    assert scheduler.stats()["queue_depth"] == {"interactive": 1, "batch": 2}
+    gate.set()
+    for future in [blocker, *futures]:
+        future.result(timeout=5)
+
+    assert order == ["interactive", "batch-soon", "batch-late"]
+    stats = scheduler.stats()
+    assert stats["completed"] == 4
+    assert stats["wait"]["batch"]["samples"] == 2
+    assert stats["wait"]["interactive"]["p95_seconds"] is not None
+    scheduler.shutdown()
+
+
+def test_identical_requests_share_one_execution_and_promote_priority() -> None:
+    scheduler = LLMScheduler(max_concurrency=1, reserved_interactive_slots=0)
+    gate, started = threading.Event(), threading.Event()
+    calls = []
+    blocker = _blocker(scheduler, gate, started)
+    assert started.wait(timeout=5)
+
+    scheduler.submit("other", lambda: calls.append("other"), priority=PRIORITY_BATCH)
+    first = scheduler.submit("same-prompt", lambda: calls.append("same") or "ok", priority=PRIORITY_BATCH)
+    second = scheduler.submit("same-prompt", lambda: calls.append("dup") or "dup", priority=PRIORITY_INTERACTIVE)
+    assert first is second
+    gate.set()
+    blocker.result(timeout=5)
+    assert second.result(timeout=5) == "ok"
+
+    scheduler.shutdown()
+    assert calls[0] == "same"
+    assert "dup" not in calls
+    assert scheduler.stats()["deduplicated"] == 1
+
+
+def test_cancel_owner_drops_pending_work_unless_shared() -> None:
+    scheduler = LLMScheduler(max_concurrency=1, reserved_interactive_slots=0)
+    gate, started = threading.Event(), threading.Event()
+    blocker = _blocker(scheduler, gate, started)
+    assert started.wait(timeout=5)
+
+    abandoned = scheduler.submit("a", lambda: "a", owner="session-1")
+    shared = scheduler.submit("b", lambda: "b", owner="session-1")
+    scheduler.submit("b", lambda: "b", owner="session-2")
+
+    assert scheduler.cancel_owner("session-1") == 1
+    gate.set()
+    blocker.result(timeout=5)
+    assert abandoned.cancelled()
+    assert shared.result(timeout=5) == "b"
+    assert scheduler.stats()["cancelled"] == 1
+    scheduler.shutdown()
+
+
+def test_submit_rejects_unknown_priority() -> None:
+    scheduler = LLMScheduler(max_concurrency=1)
+    with pytest.raises(ValueError):
+        scheduler.submit("x", lambda: None, priority=7)
+    scheduler.shutdown()
@@ -0,0 +1,50 @@
+import requests
+
+from app.loadtest.driver import latency_summary, run_load_test
+from app.loadtest.fake_edgar import FakeEdgarServer, write_synthetic_fixtures
+from app.loadtest.fake_ollama import FakeOllamaServer
+
+
+def test_fake_edgar_replays_fixtures_and_injects_failures(tmp_path) -> None:
+    tickers = write_synthetic_fixtures(str(tmp_path), companies=2, filing_kb=4)
+    assert tickers == ["SYN000", "SYN001"]
+
+    with FakeEdgarServer(str(tmp_path)) as edgar:
+        mapping = requests.get(f"{edgar.url}/files/company_tickers.json", timeout=5).json()
+        assert mapping["1"]["ticker"] == "SYN001"
+        assert requests.get(f"{edgar.url}/../../etc/passwd", timeout=5).status_code == 404
+
+    with FakeEdgarServer(str(tmp_path), throttle_rate=1.0) as edgar:
+        assert requests.get(f"{edgar.url}/files/company_tickers.json", timeout=5).status_code == 429
+        assert edgar.stats["throttled"] == 1
+
+
+def test_load_test_drives_the_job_queue(tmp_path, monkeypatch) -> None:
+    tickers = write_synthetic_fixtures(str(tmp_path / "edgar"), companies=3, filing_kb=8)
+    # Stage caches land in the working directory, which the forked stage workers inherit.
+    monkeypatch.chdir(tmp_path)
+    with FakeEdgarServer(str(tmp_path / "edgar")) as edgar, FakeOllamaServer(tokens_per_second=5000, num_parallel=2) as ollama:
+        report = run_load_test(
+            tickers,
+            edgar,
+            users=2,
+            analyses_per_user=2,
+            batch_jobs=1,
+            ollama_url=ollama.url,
+            sec_rate_limit_per_sec=200,
+            workers=2,
+        )
+
+    assert report["errors"] == 0, report["error_samples"]
+    assert report["analyses"] == 6
+    assert 1 <= report["jobs"] <= 6
+    assert set(report["latency_by_kind"]) == {"interactive", "batch"}
+    # Ticker mapping, submissions, filing document and companyfacts per job, at most.
+    assert 0 < report["sec"]["requests_per_job"] <= 4
+    assert report["sec"]["workers_reporting"] == 2
+    assert report["sec"]["executed"] >= report["sec"]["http_requests"] > 0
+    assert report["sec"]["limiter_calls"] >= report["sec"]["http_requests"]
+    assert report["sec"]["limiter_wait_seconds"] >= 0
+    assert report["llm"]["completed"] >= 1 and ollama.stats["requests"] == report["llm"]["completed"]
+    assert (tmp_path / "data" / "processed" / "filings").is_dir()
+    assert latency_summary([]) == {"p50": None, "p95": None, "p99": None, "max": None}
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+
+from app.services.filing_parser import parse_filing
+from app.services.parse_executor import ParseExecutor
+
+
+def _filing(n: int) -> str:
+    return (
+        "<html><body><p>Cover page.</p>"
+        f"<p>Item 1 Business Company {n} sells widgets worldwide.</p>"
+        "<p>Item 1A Risk Factors Supply chain disruption may hurt margins.</p>"
+        "<p>Item 7 Management's Discussion and Analysis Revenue grew.</p>"
+        "<p>Item 8 Financial Statements</p></body></html>"
+    )
+
+
+def test_parse_executor_returns_mmap_handles_and_worker_stats(tmp_path: Path) -> None:
+    out_dir = tmp_path / "text"
+    with ParseExecutor(max_workers=2, max_tasks_per_child=2, output_dir=str(out_dir), spool_dir=str(tmp_path / "raw")) as executor:
+        futures = {f"acc-{n}": executor.submit(f"acc-{n}", "10-K", raw_filing=_filing(n)) for n in range(4)}
+        results = {accession: future.result(timeout=60) for accession, future in futures.items()}
+
+        for n in range(4):
+            expected_text, _ = parse_filing(_filing(n), "10-K")
+            result = results[f"acc-{n}"]
+            assert "text" not in result
+            assert result["chars"] == len(expected_text)
+            with executor.open_text(f"acc-{n}") as mapped:
+                assert mapped.slice(0, len(mapped)) == expected_text
+                assert "risk_factors" in mapped.sections()
+
+        report = executor.throughput()
+    assert report["tasks"] == 4
+    assert sum(stats["tasks"] for stats in report["workers"].values()) == 4
+
+
+def test_submit_requires_raw_input(tmp_path: Path) -> None:
+    with ParseExecutor(max_workers=1, output_dir=str(tmp_path), spool_dir=str(tmp_path / "raw")) as executor:
+        with pytest.raises(ValueError):
+            executor.submit("acc-x", "10-K")
+
+
+def test_spool_files_are_removed_and_finished_futures_dropped(tmp_path: Path) -> None:
+    spool = tmp_path / "raw"
+    with ParseExecutor(max_workers=1, output_dir=str(tmp_path / "text"), spool_dir=str(spool)) as executor:
+        for n in range(3):
+            executor.submit("acc-same", "10-K", raw_filing=_filing(n)).result(timeout=60)
+        assert len(executor._pending) == 1
+        assert list(spool.iterdir()) == []
+        assert executor.throughput()["tasks"] == 3
+        assert executor._pending == []
+
+
+def test_pipeline_parses_through_executor(tmp_path: Path) -> None:
+    from app.services.analyzer_pipeline import run_deterministic_analysis
+    from app.services.filing_store import SectionView
+    from tests.test_integration_pipeline import FakeSECClient
+
+    owned = run_deterministic_analysis(FakeSECClient(), "FAKE")
+    with ParseExecutor(max_workers=1, output_dir=str(tmp_path / "text"), spool_dir=str(tmp_path / "raw")) as executor:
+        result = run_deterministic_analysis(FakeSECClient(), "FAKE", parse_executor=executor)
+        assert executor.throughput()["tasks"] == 1
+    assert isinstance(result["section_records"]["mda"], SectionView)
+    assert {name: dict(view) for name, view in result["section_records"].items()} == owned["section_records"]
+    assert result["financials"] == owned["financials"]
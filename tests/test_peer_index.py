@@ -0,0 +1,93 @@
+import numpy as np
+
+from app.services.peer_engine import PeerBenchmarkEngine, weighted_peer_ratio_medians
+from app.services.peer_index import PeerIndex, company_features, sic_distance
+
+
+def _financials(assets: float, margin: float) -> dict:
+    revenue = assets * 0.8
+    return {
+        "assets": assets,
+        "revenue": revenue,
+        "net_income": revenue * margin,
+        "operating_income": revenue * margin * 1.5,
+        "liabilities": assets * 0.5,
+    }
+
+
+def _index(tmp_path, count: int = 200) -> PeerIndex:
+    rng = np.random.default_rng(7)
+    index = PeerIndex(path=str(tmp_path / "peer_index.npz"))
+    for cik in range(1, count + 1):
+        index.upsert(cik, _financials(10 ** rng.uniform(6, 11), rng.uniform(-0.2, 0.3)), sic=str(rng.integers(1000, 9999)))
+    index.rebuild()
+    return index
+
+
+def test_nearest_matches_brute_force_and_tracks_updates(tmp_path) -> None:
+    index = _index(tmp_path)
+    ciks = list(index.companies)
+    points = index._embed(np.array([index.companies[c][0] for c in ciks]))
+    distances = ((points - points[0]) ** 2).sum(axis=1)
+    distances[0] = np.inf
+    expected = [ciks[i] for i in np.argsort(distances)[:5]]
+    assert [peer["cik"] for peer in index.nearest(cik=ciks[0], k=5)] == expected
+
+    # An update lands in the pending set: the old position is masked and the new one is scanned.
+    rebuilds = index.stats["rebuilds"]
+    assert index.upsert(expected[-1], dict(zip(["assets", "revenue"], [1e15, 1e15])))
+    assert not index.upsert(expected[-1], dict(zip(["assets", "revenue"], [1e15, 1e15])))
+    assert expected[-1] not in [peer["cik"] for peer in index.nearest(cik=ciks[0], k=5)]
+    assert index.stats["rebuilds"] == rebuilds
+
+    index.save()
+    reloaded = PeerIndex(path=str(index.path))
+    assert [p["cik"] for p in reloaded.nearest(cik=ciks[0], k=4)] == [p["cik"] for p in index.nearest(cik=ciks[0], k=4)]
+
+
+def test_sic_distance_reranks_candidates(tmp_path) -> None:
+    assert sic_distance("3571", "3571") == 0.0
+    assert sic_distance("3571", "3572") == 0.25
+    assert sic_distance("3571", "6021") == 1.0
+    assert company_features({"net_income": 5.0}) is None
+
+    index = PeerIndex(path=str(tmp_path / "peer_index.npz"))
+    index.upsert(1, _financials(1e9, 0.10), sic="3571")
+    index.upsert(2, _financials(1.05e9, 0.10), sic="6021")
+    index.upsert(3, _financials(1.3e9, 0.10), sic="3572")
+    index.rebuild()
+    assert [p["cik"] for p in index.nearest(cik=1, k=2)] == [2, 3]
+    assert [p["cik"] for p in index.nearest(cik=1, k=2, sic_weight=20.0)] == [3, 2]
+
+
+class FakeSECClient:
+    def get_ticker_mapping(self):
+        return [{"cik_str": 2, "ticker": "bbb", "title": "B Corp"}]
+
+
+def test_engine_nearest_peers_and_weighted_medians(tmp_path) -> None:
+    index = PeerIndex(path=str(tmp_path / "peer_index.npz"))
+    index.upsert(2, _financials(1.1e9, 0.1), sic="3571")
+    index.rebuild()
+    engine = PeerBenchmarkEngine(FakeSECClient(), peer_index=index)
+    peers = engine.find_nearest_peers(1, _financials(1e9, 0.1), target_sic="3571", max_peers=3)
+    assert [(peer.ticker, peer.cik_10) for peer, _ in peers] == [("BBB", "0000000002")]
+    assert 1 in index.companies
+
+    ratios = [{"roa": {"value": v, "quality": "ok"}} for v in (0.01, 0.05, 0.20)]
+    medians = weighted_peer_ratio_medians(ratios, [1.0, 1.0, 10.0])
+    assert medians["roa"] == 0.20
+    assert weighted_peer_ratio_medians(ratios, [1.0, 1.0, 1.0])["roa"] == 0.05
+    assert medians["net_margin"] is None
+
+
+def test_torn_index_file_loads_empty_and_save_replaces_it(tmp_path) -> None:
+    path = tmp_path / "index.npz"
+    path.write_bytes(b"PK\x03\x04 truncated")
+    index = PeerIndex(path=str(path))
+    assert len(index) == 0
+
+    index.upsert(1, _financials(1e9, 0.1), "3571")
+    index.save()
+    assert len(PeerIndex(path=str(path))) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["index.npz"]
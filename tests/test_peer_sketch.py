@@ -0,0 +1,132 @@
+import random
+from pathlib import Path
+from statistics import median
+
+from app.services.peer_engine import PeerBenchmarkEngine, aggregate_peer_ratio_medians
+from app.services.peer_sketch import KLLSketch, PeerSketchStore
+
+
+def _ratios(net_margin: float) -> dict:
+    return {"net_margin": {"value": net_margin, "quality": "ok"}, "roe": {"value": None, "quality": "missing_data"}}
+
+
+def test_small_group_matches_exact_median() -> None:
+    sketch = KLLSketch(k=200)
+    values = [0.1, 0.4, 0.2, 0.3]
+    for value in values:
+        sketch.update(value)
+    assert sketch.is_exact()
+    assert abs(sketch.quantile(0.5) - median(values)) < 1e-12
+
+
+def test_large_stream_stays_within_rank_error_bound() -> None:
+    rng = random.Random(7)
+    values = [rng.random() for _ in range(20000)]
+    left, right = KLLSketch(k=200, seed=1), KLLSketch(k=200, seed=2)
+    for idx, value in enumerate(values):
+        (left if idx % 2 else right).update(value)
+    left.merge(right)
+
+    assert left.n == 20000
+    assert sum(len(items) for items in left.compactors) < 1000
+    ordered = sorted(values)
+    for q in (0.1, 0.5, 0.9):
+        estimate = left.quantile(q)
+        rank = sum(1 for v in ordered if v <= estimate) / len(ordered)
+        assert abs(rank - q) < 0.0165
+
+
+def test_store_updates_merges_prefixes_and_persists(tmp_path: Path) -> None:
+    path = tmp_path / "sketches.json"
+    store = PeerSketchStore(path=str(path), k=200)
+    store.update_company(1, "3571", _ratios(0.10))
+    store.update_company(2, "3571", _ratios(0.30))
+    store.update_company(3, "3572", _ratios(0.50))
+    assert store.peer_medians("3571")["net_margin"] == 0.2
+    assert store.peer_medians("357")["net_margin"] == 0.3
+    assert store.peer_medians("3571")["roe"] is None
+
+    store.update_company(2, "3571", _ratios(0.20))
+    assert abs(store.peer_medians("3571")["net_margin"] - 0.15) < 1e-12
+    store.save()
+
+    reloaded = PeerSketchStore(path=str(path))
+    assert abs(reloaded.percentile("3571", "net_margin", 0.5) - 0.15) < 1e-12
+    assert reloaded.company_count("357") == 3
+
+
+def test_peer_engine_serves_benchmark_from_sketches(tmp_path: Path) -> None:
+    store = PeerSketchStore(path=str(tmp_path / "sketches.json"))
+    peer_ratios = [_ratios(0.1), _ratios(0.2), _ratios(0.6)]
+    for cik, ratios in enumerate(peer_ratios, start=1):
+        store.update_company(cik, "7372", ratios)
+
+    engine = PeerBenchmarkEngine(sec_client=None, sketch_store=store)
+    benchmark = engine.benchmark_from_sketches("7372")
+    assert benchmark["peer_count_used"] == 3
+    assert benchmark["peer_medians"]["net_margin"] == aggregate_peer_ratio_medians(peer_ratios)["net_margin"]
+    assert engine.benchmark_from_sketches("1000") is None
+
+
+def test_store_survives_torn_file_and_merges_concurrent_saves(tmp_path: Path) -> None:
+    path = tmp_path / "sketches.json"
+    path.write_text('{"k": 200, "companies": {"1": ', encoding="utf-8")
+    first = PeerSketchStore(path=str(path))
+    assert first.companies == {}
+
+    second = PeerSketchStore(path=str(path))
+    first.update_company(1, "3571", _ratios(0.10))
+    second.update_company(2, "3571", _ratios(0.30))
+    first.save()
+    second.save()
+
+    merged = PeerSketchStore(path=str(path))
+    assert merged.company_count("3571") == 2
+    assert abs(merged.peer_medians("3571")["net_margin"] - 0.2) < 1e-12
+
+
+def test_peer_stage_serves_sketched_sic_without_peer_fetches(tmp_path: Path, monkeypatch) -> None:
+    from app.models.schemas import CompanyIdentity
+    from app.services import job_queue
+    from app.services.peer_index import PeerIndex
+
+    store = PeerSketchStore(path=str(tmp_path / "sketches.json"))
+    for cik in range(1, 26):
+        store.update_company(cik, "7372", _ratios(cik / 100))
+    store.save()
+
+    class SubmissionsOnlyClient:
+        def get_submissions(self, cik_10):
+            return {"sic": "7372"}
+
+        def get_company_facts(self, cik_10):
+            raise AssertionError("peer companyfacts must not be fetched")
+
+    monkeypatch.setattr(job_queue, "_worker_sec_client", SubmissionsOnlyClient)
+    monkeypatch.setattr(job_queue, "PeerSketchStore", lambda: PeerSketchStore(path=str(tmp_path / "sketches.json")))
+    monkeypatch.setattr(job_queue, "PeerIndex", lambda: PeerIndex(path=str(tmp_path / "index.npz")))
+    monkeypatch.setattr(job_queue, "load_universe_snapshot", lambda: None)
+    identity = CompanyIdentity(ticker="ACME", cik_10="0000000099", cik_int=99, company_name="Acme")
+    analysis = {"identity": identity, "financials": {"revenue": 100.0, "assets": 200.0}, "ratios": _ratios(0.5)}
+
+    result = job_queue.peer_stage({"peer_mode": "sic"}, {"analysis": analysis})
+    assert result["peer_mode"] == "sketch" and result["peer_count_used"] == 25
+    assert result["peer_comparison"]["net_margin"]["peer_median"] == 0.13
+    assert PeerSketchStore(path=str(tmp_path / "sketches.json")).company_count("7372") == 26
+
+
+def test_nearest_neighbour_peers_do_not_feed_the_target_sic_sketch(tmp_path: Path) -> None:
+    from app.models.schemas import CompanyIdentity
+
+    class FactsClient:
+        def get_company_facts(self, cik_10):
+            return {"facts": {}}
+
+    store = PeerSketchStore(path=str(tmp_path / "sketches.json"))
+    engine = PeerBenchmarkEngine(sec_client=FactsClient(), sketch_store=store)
+    peers = [CompanyIdentity(ticker=f"P{cik}", cik_10=f"{cik:010d}", cik_int=cik, company_name=None) for cik in (1, 2)]
+
+    engine.build_peer_benchmark(peers, target_sic="7372", peer_distances={1: 0.1, 2: 0.2})
+    assert store.company_count("7372") == 0
+    engine.build_peer_benchmark(peers, target_sic="7372")
+    assert store.company_count("7372") == 2
@@ -0,0 +1,67 @@
+import json
+import time
+
+from app.services.analyzer_pipeline import run_deterministic_analysis
+from app.utils.profiling import ProfileCapture
+from tests.test_integration_pipeline import FakeSECClient
+
+
+def _busy() -> list:
+    deadline = time.perf_counter() + 0.05
+    chunks = []
+    while time.perf_counter() < deadline:
+        chunks.append(bytearray(4096))
+    return chunks
+
+
+def test_profile_capture_writes_pstats_speedscope_and_summary(tmp_path) -> None:
+    with ProfileCapture("unit test/run", output_dir=str(tmp_path)) as capture:
+        _busy()
+
+    summary = capture.summary
+    assert summary["label"] == "unit_test_run"
+    assert summary["samples"] > 0
+    assert any("_busy" in row["function"] for row in summary["top_functions"])
+    assert any("test_profiling.py" in row["site"] for row in summary["top_allocations"])
+
+    speedscope = json.loads(open(summary["files"]["speedscope"], encoding="utf-8").read())
+    frame_names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+    assert "_busy" in frame_names
+    assert len(speedscope["profiles"][0]["samples"]) == len(speedscope["profiles"][0]["weights"])
+    assert (tmp_path / summary["files"]["pstats"].split("/")[-1]).exists()
+
+
+def test_pipeline_profile_switch(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.utils.profiling.settings", type("S", (), {"profile_output_dir": str(tmp_path)})())
+    plain = run_deterministic_analysis(FakeSECClient(), ticker="FAKE")
+    assert "profile" not in plain
+
+    profiled = run_deterministic_analysis(FakeSECClient(), ticker="FAKE", profile=True)
+    assert profiled["ratios"] == plain["ratios"]
+    assert profiled["profile"]["label"] == "FAKE-10-K"
+    assert len(list(tmp_path.glob("FAKE-10-K-*.pstats"))) == 1
+
+
+def test_overlapping_captures_share_tracemalloc(tmp_path) -> None:
+    import tracemalloc
+
+    outer = ProfileCapture("overlap", output_dir=str(tmp_path))
+    inner = ProfileCapture("overlap", output_dir=str(tmp_path))
+    with outer:
+        with inner:
+            _busy()
+        # The inner capture must not stop tracing that the outer one still relies on.
+        assert tracemalloc.is_tracing()
+        _busy()
+    assert not tracemalloc.is_tracing()
+    assert inner.summary["files"]["pstats"] != outer.summary["files"]["pstats"]
+    assert len(list(tmp_path.glob("overlap-*.pstats"))) == 2
+
+
+def test_dotted_labels_keep_unique_file_names(tmp_path) -> None:
+    for _ in range(2):
+        with ProfileCapture("BRK.B-10-K", output_dir=str(tmp_path)) as capture:
+            _busy()
+    assert capture.summary["files"]["pstats"].split("/")[-1].startswith("BRK.B-10-K-")
+    assert len(list(tmp_path.glob("BRK.B-10-K-*.pstats"))) == 2
+    assert len(list(tmp_path.glob("BRK.B-10-K-*.summary.json"))) == 2
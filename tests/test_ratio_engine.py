@@ -1,4 +1,8 @@
-from app.services.ratio_engine import compute_ratios
+import numpy as np
+import pytest
+
+from app.models.compact import RatioQuality
+from app.services.ratio_engine import RATIO_KEYS, RatioPlan, compute_ratio_set, compute_ratios
 
 
 def test_compute_ratios_basic() -> None:
@@ -42,3 +46,43 @@ def test_compute_ratios_missing_and_unstable() -> None:
     assert ratios["net_margin"]["quality"] == "missing_data"
     assert ratios["roa"]["quality"] == "unstable_denominator"
     assert ratios["interest_coverage"]["quality"] == "missing_data"
+
+
+def test_snapshot_ratio_keys_come_from_registry() -> None:
+    assert RATIO_KEYS == [
+        "current_ratio",
+        "debt_to_equity",
+        "net_margin",
+        "roa",
+        "roe",
+        "operating_margin",
+        "interest_coverage",
+    ]
+    ratio_set = compute_ratio_set([1, 2], [{"net_income": 10.0, "revenue": 100.0}, {"equity": 0.0, "liabilities": 5.0}])
+    assert ratio_set.ratio_map(0) == compute_ratios({"net_income": 10.0, "revenue": 100.0})
+    assert ratio_set.result(1, "debt_to_equity").quality == RatioQuality.UNSTABLE_DENOMINATOR
+
+
+def test_plan_evaluates_period_functions_over_panel() -> None:
+    revenue = np.array([[10.0, 10.0, 10.0, 10.0, 12.0, 13.0], [5.0, np.nan, 5.0, 5.0, 5.0, 5.0]])
+    net_income = np.ones_like(revenue)
+    plan = RatioPlan(["ttm_net_margin", "revenue_growth_yoy", "revenue_growth_qoq"])
+    values, quality = plan.evaluate({"revenue": revenue, "net_income": net_income})
+
+    assert values.shape == quality.shape == (2, 6, 3)
+    assert values[0, 3, 0] == pytest.approx(4 / 40)
+    assert values[0, 5, 0] == pytest.approx(4 / 45)
+    assert values[0, 4, 1] == pytest.approx(0.2)
+    assert quality[0, 0, 2] == RatioQuality.MISSING_DATA
+    # A missing quarter leaves every TTM window that contains it missing.
+    assert list(quality[1, 3:5, 0]) == [RatioQuality.MISSING_DATA] * 2
+    assert quality[1, 5, 0] == RatioQuality.OK
+
+
+def test_plan_rejects_unknown_ratios_and_expressions() -> None:
+    with pytest.raises(ValueError):
+        RatioPlan(["not_a_ratio"])
+    with pytest.raises(ValueError):
+        RatioPlan(definitions={"bad": ("revenue ** 2", "assets")})
+    with pytest.raises(ValueError):
+        RatioPlan(definitions={"bad": ("median(revenue)", "assets")})
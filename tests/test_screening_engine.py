@@ -0,0 +1,71 @@
+import pytest
+
+from app.models.compact import RatioSet
+from app.services.peer_engine import RATIO_KEYS
+from app.services.screening_engine import (
+    ScreeningEngine,
+    build_ratio_frame,
+    parse_screen_expression,
+    ratio_set_to_frame,
+)
+
+
+def _row(cik: int, ticker: str, sic: str, net_margin: float, debt_to_equity: float) -> dict:
+    return {
+        "cik": cik,
+        "ticker": ticker,
+        "sic": sic,
+        "ratios": {
+            "net_margin": {"value": net_margin, "quality": "ok"},
+            "debt_to_equity": {"value": debt_to_equity, "quality": "ok"},
+            "current_ratio": {"value": None, "quality": "missing_data"},
+        },
+    }
+
+
+def _universe() -> list:
+    return [
+        _row(1, "AAA", "3571", 0.05, 0.5),
+        _row(2, "BBB", "3571", 0.10, 2.0),
+        _row(3, "CCC", "3571", 0.20, 0.8),
+        _row(4, "DDD", "3571", 0.30, 1.5),
+        _row(5, "EEE", "7372", 0.40, 0.2),
+    ]
+
+
+def test_build_ratio_frame_masks_non_ok_quality() -> None:
+    frame = build_ratio_frame(_universe())
+    assert frame.loc[1, "net_margin"] == 0.05
+    assert frame["current_ratio"].isna().all()
+
+
+def test_group_statistics_percentile_zscore_and_rank() -> None:
+    engine = ScreeningEngine.from_rows(_universe())
+    frame = engine.frame
+    assert frame.loc[4, "net_margin_pct"] == 1.0
+    assert frame.loc[4, "net_margin_rank"] == 1
+    assert frame.loc[5, "net_margin_pct"] == 1.0
+    assert abs(frame.loc[frame["sic"] == "3571", "net_margin_z"].mean()) < 1e-12
+    assert engine.group_summary("3571")["net_margin"]["count"] == 4
+
+
+def test_query_with_percentile_and_sic_filter() -> None:
+    engine = ScreeningEngine.from_rows(_universe())
+    result = engine.query("net_margin > p50 within SIC 3571 and debt_to_equity < 1")
+    assert list(result["ticker"]) == ["CCC"]
+
+    result = engine.query("net_margin >= 0.3")
+    assert sorted(result["ticker"]) == ["DDD", "EEE"]
+
+
+def test_parse_screen_expression_rejects_unknown_ratio() -> None:
+    assert parse_screen_expression("roe > p90")[0]["value"] == 0.9
+    with pytest.raises(ValueError):
+        parse_screen_expression("ebitda > 3")
+
+
+def test_ratio_set_frame_matches_row_frame() -> None:
+    rows = _universe()
+    ratio_set = RatioSet.from_ratio_maps([r["cik"] for r in rows], [r["ratios"] for r in rows], RATIO_KEYS)
+    frame = ratio_set_to_frame(ratio_set, [r["ticker"] for r in rows], [r["sic"] for r in rows])
+    assert frame.equals(build_ratio_frame(rows))
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import sec_client as sec_client_module
+from app.services.sec_client import SECClient
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_execution() -> None:
+    flights = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"ok": True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("url", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"ok": True}] * 5
+    assert flights.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_async_tasks_share_one_execution_and_errors() -> None:
+    flights = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(*[flights.do_async("url", fetch) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flights.stats()["coalesced"] == 2
+
+    with pytest.raises(RuntimeError):
+        flights.do("url", fetch)
+    assert len(calls) == 2
+
+
+class _SlowSession:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        time.sleep(0.1)
+        return self
+
+    def raise_for_status(self) -> None:
+        return None
+
+    def json(self):
+        return {"sic": "3571"}
+
+
+def test_sec_clients_coalesce_identical_urls(monkeypatch) -> None:
+    monkeypatch.setattr(sec_client_module, "SEC_FLIGHTS", SingleFlight())
+    session = _SlowSession()
+    clients = [SECClient() for _ in range(3)]
+    for client in clients:
+        client.session = session
+
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(c.get_submissions("0000000001"))) for c in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert session.calls == 1
+    assert results == [{"sic": "3571"}] * 3
+    assert SECClient.request_metrics()["coalesced"] == 2
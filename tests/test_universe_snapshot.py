@@ -0,0 +1,90 @@
+import requests
+
+from app.models.schemas import CompanyIdentity
+from app.services.peer_engine import PeerBenchmarkEngine
+from app.services.screening_engine import ScreeningEngine
+from app.services.universe_snapshot import (
+    attach_company_metadata,
+    build_universe_snapshot,
+    frame_period,
+    load_universe_snapshot,
+    save_universe_snapshot,
+    snapshot_ratio_rows,
+)
+
+
+FRAMES = {
+    ("Revenues", "CY2024"): [{"cik": 1, "entityName": "One Corp", "val": 1000}],
+    ("SalesRevenueNet", "CY2024"): [{"cik": 1, "val": 999}, {"cik": 2, "entityName": "Two Inc", "val": 500}],
+    ("NetIncomeLoss", "CY2024"): [{"cik": 1, "val": 100}, {"cik": 2, "val": 25}],
+    ("Assets", "CY2024Q4I"): [{"cik": 1, "val": 2000}, {"cik": 2, "val": 1000}],
+    ("StockholdersEquity", "CY2024Q4I"): [{"cik": 1, "val": 800}, {"cik": 2, "val": 0}],
+}
+
+
+class FakeFramesClient:
+    def __init__(self) -> None:
+        self.requested = []
+        self.submissions = []
+
+    def get_ticker_mapping(self):
+        return [{"cik_str": 1, "ticker": "one"}, {"cik_str": 2, "ticker": "two"}]
+
+    def get_submissions(self, cik_10: str):
+        self.submissions.append(cik_10)
+        return {"sic": "3571"}
+
+    def get_company_facts(self, cik_10: str):
+        raise AssertionError("snapshot peers must not fetch companyfacts")
+
+    def get_frame(self, concept: str, period: str, unit: str = "USD", taxonomy: str = "us-gaap"):
+        self.requested.append((concept, period))
+        if (concept, period) not in FRAMES:
+            raise requests.HTTPError("404")
+        return {"data": FRAMES[(concept, period)]}
+
+
+def test_frame_period_for_instant_and_duration_metrics() -> None:
+    assert frame_period("revenue", 2024) == "CY2024"
+    assert frame_period("revenue", 2024, quarter=2) == "CY2024Q2"
+    assert frame_period("assets", 2024) == "CY2024Q4I"
+    assert frame_period("assets", 2024, quarter=2) == "CY2024Q2I"
+
+
+def test_build_universe_snapshot_respects_concept_fallback_order() -> None:
+    client = FakeFramesClient()
+    snapshot = build_universe_snapshot(client, fiscal_year=2024)
+
+    assert snapshot["financials"][1]["revenue"] == 1000.0
+    assert snapshot["financials"][2]["revenue"] == 500.0
+    assert snapshot["financials"][2]["liabilities"] is None
+    assert snapshot["entity_names"] == {1: "One Corp", 2: "Two Inc"}
+    assert snapshot["frames_fetched"] == len(FRAMES)
+    assert len(client.requested) == 13
+
+
+def test_snapshot_stores_sic_and_feeds_peer_and_screening_paths(tmp_path) -> None:
+    client = FakeFramesClient()
+    snapshot = build_universe_snapshot(client, fiscal_year=2024)
+    assert attach_company_metadata(client, snapshot, max_workers=2) == 2
+    path = str(tmp_path / "snapshot.json")
+    save_universe_snapshot(snapshot, path)
+    loaded = load_universe_snapshot(path)
+    assert loaded["sic_by_cik"] == {1: "3571", 2: "3571"} and loaded["ticker_by_cik"] == {1: "ONE", 2: "TWO"}
+
+    # A refresh reuses the stored SIC codes instead of fetching submissions again.
+    refreshed = build_universe_snapshot(client, fiscal_year=2024)
+    assert attach_company_metadata(client, refreshed, prior=loaded) == 0
+
+    engine = PeerBenchmarkEngine(sec_client=client, universe_snapshot=loaded)
+    peers = engine.find_snapshot_peers("3571", target_cik_int=3, target_financials={"assets": 1100.0}, max_peers=5)
+    assert [peer.ticker for peer in peers] == ["TWO", "ONE"]
+    benchmark = engine.build_peer_benchmark(peers, target_sic="3571")
+    assert benchmark["peer_count_used"] == 2
+    assert abs(benchmark["peer_medians"]["net_margin"] - 0.075) < 1e-12
+    assert engine.find_snapshot_peers("1000", target_cik_int=3) == []
+
+    result = ScreeningEngine.from_snapshot(loaded).query("roa > 0.04 within SIC 3571")
+    assert list(result["ticker"]) == ["ONE"]
+    rows = snapshot_ratio_rows(loaded)
+    assert ScreeningEngine.from_rows(rows).query("roa > 0.04")["ticker"].tolist() == ["ONE"]
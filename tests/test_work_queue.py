@@ -0,0 +1,85 @@
+import time
+
+from app.services.analyzer_pipeline import run_deterministic_analysis
+from app.services.shard_worker import ShardWorker, enqueue_run
+from app.services.work_queue import WorkQueue
+from tests.test_integration_pipeline import FakeSECClient
+
+
+def test_lease_is_exclusive_and_expired_leases_are_reclaimed(tmp_path) -> None:
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.2)
+    assert queue.enqueue("run", [("aapl", "10-K", ["analysis"]), ("MSFT", "10-K", ["analysis"])]) == 2
+    assert queue.enqueue("run", [("AAPL", "10-K", ["analysis"])]) == 0
+
+    first = queue.lease("node-a", run_id="run")
+    second = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.2).lease("node-b", run_id="run")
+    assert {first.ticker, second.ticker} == {"AAPL", "MSFT"}
+    assert queue.lease("node-c", run_id="run") is None
+    assert queue.heartbeat(first.item_id, "node-a")
+
+    time.sleep(0.3)
+    reclaimed = queue.lease("node-c", run_id="run")
+    assert reclaimed is not None
+    assert not queue.heartbeat(reclaimed.item_id, "node-a" if reclaimed.item_id == first.item_id else "node-b")
+    assert queue.complete(reclaimed, "node-c", {"ok": True})
+    assert queue.progress("run")["done"] == 1
+
+
+def test_failed_item_is_retried_on_another_node_then_gives_up(tmp_path) -> None:
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), max_attempts=2)
+    queue.enqueue("run", [("BAD", "10-K", ["analysis"]), ("GOOD", "10-K", ["analysis"])])
+
+    bad = queue.lease("node-a", run_id="run")
+    assert queue.fail(bad, "node-a", "boom", retry_delay_seconds=0) == "queued"
+    # node-a prefers the item it has not failed; node-b picks the retry up.
+    assert queue.lease("node-a", run_id="run").ticker == "GOOD"
+    retry = queue.lease("node-b", run_id="run")
+    assert retry.ticker == "BAD" and retry.attempts == 1
+    assert queue.fail(retry, "node-b", "boom again", retry_delay_seconds=0) == "failed"
+    assert queue.progress("run") == {"queued": 0, "leased": 1, "done": 0, "failed": 1}
+
+
+def test_workers_drain_a_run_and_split_the_sec_budget(tmp_path) -> None:
+    def fake_analysis(request, results):
+        return run_deterministic_analysis(FakeSECClient(), ticker="FAKE", preferred_form=request["preferred_form"])
+
+    def failing_peers(request, results):
+        raise RuntimeError("no peers")
+
+    stages = [("analysis", fake_analysis, None, True), ("peer", failing_peers, "run_peer", False)]
+    path = str(tmp_path / "queue.sqlite")
+    assert enqueue_run(WorkQueue(path), "run", [f"T{i}" for i in range(6)], stages=["peer"]) == 6
+
+    workers = [ShardWorker(WorkQueue(path), node_id=f"node-{i}", global_sec_rate=10.0, stages=stages) for i in range(2)]
+    workers[1].queue.touch_node("node-1")
+    assert workers[0].sec_rate_share() == 5.0
+
+    reports = [worker.run(run_id="run") for worker in workers]
+    assert sum(report["completed"] for report in reports) == 6
+    results = WorkQueue(path).results("run")
+    assert [row["ticker"] for row in results] == [f"T{i}" for i in range(6)]
+    assert results[0]["ratios"] and results[0]["errors"] == {"peer": "no peers"}
+
+
+def test_fail_after_lost_lease_is_not_recorded(tmp_path) -> None:
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.1, max_attempts=5)
+    queue.enqueue("run", [("AAPL", "10-K", ["analysis"])])
+    stale = queue.lease("node-a", run_id="run")
+    time.sleep(0.2)
+    current = queue.lease("node-b", run_id="run")
+
+    assert queue.fail(stale, "node-a", "late failure", retry_delay_seconds=0) == "lost"
+    assert queue.progress("run")["leased"] == 1
+    assert queue.complete(current, "node-b", {"ok": True})
+
+
+def test_expired_lease_reclaims_count_toward_max_attempts(tmp_path) -> None:
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.1, max_attempts=2)
+    queue.enqueue("run", [("CRASH", "10-K", ["analysis"])])
+    assert queue.lease("node-a", run_id="run").attempts == 0
+    time.sleep(0.2)
+    assert queue.lease("node-b", run_id="run").attempts == 1
+    time.sleep(0.2)
+    # The second expiry exhausts the attempts: the item is failed instead of leased again.
+    assert queue.lease("node-c", run_id="run") is None
+    assert queue.progress("run") == {"queued": 0, "leased": 0, "done": 0, "failed": 1}